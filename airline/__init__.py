@@ -0,0 +1 @@
+# Airline Management System - data layer shared by the Streamlit app
@@ -0,0 +1,55 @@
+# Airports
+#
+# flights.departure_airport / arrival_airport hold airport codes from the
+# airports table, which also carries each airport's IANA time zone.
+import json
+import os
+import threading
+
+from airline.timeutil import local_text, to_epoch
+
+AIRPORTS_PATH = os.path.join(os.path.dirname(__file__), "airports.json")
+
+_tz_cache = {}
+_tz_lock = threading.Lock()
+
+
+def load_airport_seeds(path=AIRPORTS_PATH):
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def list_airports(conn):
+    return conn.execute("SELECT code, name, city, country, tz FROM airports ORDER BY code").fetchall()
+
+
+def airport_tz(conn, code):
+    # Time zones practically never change, so they are cached per process.
+    # Unknown codes fall back to UTC uncached, so an airport added later is
+    # picked up on the next lookup.
+    with _tz_lock:
+        if code in _tz_cache:
+            return _tz_cache[code]
+    row = conn.execute("SELECT tz FROM airports WHERE code = ?", (code,)).fetchone()
+    if row is None:
+        return "UTC"
+    with _tz_lock:
+        _tz_cache[code] = row["tz"]
+    return row["tz"]
+
+
+def flight_times(conn, dep_airport, arr_airport, dep_local, arr_local):
+    """Column values for a flight's local departure/arrival datetimes.
+
+    Raises ValueError unless the flight arrives after it departs.
+    """
+    departure_ts = to_epoch(dep_local, airport_tz(conn, dep_airport))
+    arrival_ts = to_epoch(arr_local, airport_tz(conn, arr_airport))
+    if arrival_ts <= departure_ts:
+        raise ValueError("Arrival must be after departure")
+    return {
+        "departure_time": local_text(dep_local),
+        "arrival_time": local_text(arr_local),
+        "departure_ts": departure_ts,
+        "arrival_ts": arrival_ts,
+    }
@@ -0,0 +1,292 @@
+# Operations Analytics
+#
+# Aggregates for the operations dashboard.  Each one is a single GROUP BY in
+# SQL, so only the grouped rows ever reach Python:
+#   - load factor (booked seats / capacity) per day, route and flight, from
+#     the booked_count every flight already keeps (migration 3 triggers),
+#     over a departure_ts range served by idx_flights_departure;
+#   - flight status per day: delayed and cancelled against the total;
+#   - booking curves (bookings by days before departure) from booking_curve,
+#     a rollup per flight and day kept current by triggers (migration 17),
+#     so the dashboard never reads the bookings table itself.
+# Archived flights count too, so a range can look back as well as ahead.
+# Cancelled flights are left out of load factors; their bookings are gone.
+# airline.services.AnalyticsService caches each result for ANALYTICS_TTL, in
+# an LRU of at most ANALYTICS_CACHE_SIZE results.
+#
+#     python -m airline.analytics rebuild airline.db
+#     python -m airline.analytics bench [--flights 20000] [--bookings 1000000]
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from dataclasses import dataclass
+
+ANALYTICS_TTL = 60
+ANALYTICS_CACHE_SIZE = 64
+ROUTE_LIMIT = 15
+FLIGHT_LIMIT = 20
+CURVE_DAYS = 60
+
+_FLIGHT_COLUMNS = ("flight_id, flight_number, departure_airport, arrival_airport, departure_time, "
+                   "departure_ts, capacity, booked_count, status")
+
+# Live and archived flights departing in [:start, :end), optionally touching
+# :airport; the range is repeated in each branch so both use their index
+_FLIGHTS = f"""(
+    SELECT {_FLIGHT_COLUMNS} FROM flights
+    WHERE departure_ts >= :start AND departure_ts < :end
+      AND (:airport IS NULL OR :airport IN (departure_airport, arrival_airport))
+    UNION ALL
+    SELECT {_FLIGHT_COLUMNS} FROM flights_history
+    WHERE departure_ts >= :start AND departure_ts < :end
+      AND (:airport IS NULL OR :airport IN (departure_airport, arrival_airport))
+)"""
+
+# Seats count only on flights that still operate
+_LOAD = """
+    COUNT(*) AS flights,
+    COALESCE(SUM(CASE WHEN status IS NOT 'Cancelled' THEN capacity END), 0) AS capacity,
+    COALESCE(SUM(CASE WHEN status IS NOT 'Cancelled' THEN booked_count END), 0) AS booked
+"""
+
+DAY_STATS = f"""
+    SELECT date(departure_ts, 'unixepoch') AS day, {_LOAD},
+           SUM(status = 'Delayed') AS delayed, SUM(status = 'Cancelled') AS cancelled
+    FROM {_FLIGHTS}
+    GROUP BY day
+    ORDER BY day
+"""
+
+ROUTE_STATS = f"""
+    SELECT departure_airport AS origin, arrival_airport AS destination, {_LOAD}
+    FROM {_FLIGHTS}
+    GROUP BY origin, destination
+    ORDER BY flights DESC, booked DESC
+    LIMIT :limit
+"""
+
+FLIGHT_LOAD = f"""
+    SELECT flight_id, flight_number, departure_airport AS origin, arrival_airport AS destination,
+           departure_time, capacity, booked_count AS booked, status
+    FROM {_FLIGHTS}
+    WHERE status IS NOT 'Cancelled' AND capacity > 0
+    ORDER BY booked_count * 1.0 / capacity {{order}}, departure_ts
+    LIMIT :limit
+"""
+
+BOOKING_CURVE = f"""
+    SELECT MIN(c.days_before, :max_days) AS days_before,
+           SUM(c.bookings) AS bookings, SUM(c.cancellations) AS cancellations
+    FROM {_FLIGHTS} f
+    JOIN booking_curve c ON c.flight_id = f.flight_id
+    GROUP BY 1
+    ORDER BY 1 DESC
+"""
+
+
+def days_before_sql(flights, booking):
+    # Whole days from booking to departure; booking_date is UTC text
+    return f"MAX(({flights}.departure_ts - CAST(strftime('%s', {booking}.booking_date) AS INTEGER)) / 86400, 0)"
+
+
+def _load_factor(booked, capacity):
+    return booked / capacity if capacity else 0.0
+
+
+@dataclass(frozen=True)
+class DayStats:
+    day: str              # UTC departure day, YYYY-MM-DD
+    flights: int
+    capacity: int
+    booked: int
+    delayed: int
+    cancelled: int
+
+    @property
+    def load_factor(self):
+        return _load_factor(self.booked, self.capacity)
+
+
+@dataclass(frozen=True)
+class RouteStats:
+    origin: str
+    destination: str
+    flights: int
+    capacity: int
+    booked: int
+
+    @property
+    def load_factor(self):
+        return _load_factor(self.booked, self.capacity)
+
+    @property
+    def route(self):
+        return f"{self.origin}→{self.destination}"
+
+
+@dataclass(frozen=True)
+class FlightLoad:
+    flight_id: int
+    flight_number: str
+    origin: str
+    destination: str
+    departure_time: str
+    capacity: int
+    booked: int
+    status: str
+
+    @property
+    def load_factor(self):
+        return _load_factor(self.booked, self.capacity)
+
+
+@dataclass(frozen=True)
+class CurvePoint:
+    days_before: int      # CURVE_DAYS stands for "that many or more"
+    bookings: int
+    cancellations: int
+
+
+def _params(start, end, airport, **extra):
+    return {"start": start, "end": end, "airport": airport or None, **extra}
+
+
+def day_stats(conn, start, end, airport=None):
+    return [DayStats(*row) for row in conn.execute(DAY_STATS, _params(start, end, airport))]
+
+
+def route_stats(conn, start, end, airport=None, limit=ROUTE_LIMIT):
+    return [RouteStats(*row) for row in conn.execute(ROUTE_STATS, _params(start, end, airport, limit=limit))]
+
+
+def flight_load(conn, start, end, airport=None, limit=FLIGHT_LIMIT, emptiest=False):
+    sql = FLIGHT_LOAD.format(order="ASC" if emptiest else "DESC")
+    return [FlightLoad(*row) for row in conn.execute(sql, _params(start, end, airport, limit=limit))]
+
+
+def booking_curve(conn, start, end, airport=None, max_days=CURVE_DAYS):
+    """Bookings made n days before departure, furthest out first."""
+    return [CurvePoint(*row) for row in conn.execute(BOOKING_CURVE, _params(start, end, airport, max_days=max_days))]
+
+
+def rebuild_booking_curve(conn):
+    """Recompute booking_curve from scratch (the triggers keep it current)."""
+    conn.execute("DELETE FROM booking_curve")
+    conn.execute(f"""
+        INSERT INTO booking_curve (flight_id, days_before, bookings, cancellations)
+        SELECT flight_id, days_before, COUNT(*), SUM(status = 'Cancelled') FROM (
+            SELECT b.flight_id, {days_before_sql("f", "b")} AS days_before, b.status
+            FROM bookings b JOIN flights f ON f.flight_id = b.flight_id
+            WHERE b.booking_date IS NOT NULL
+            UNION ALL
+            SELECT b.flight_id, {days_before_sql("f", "b")}, b.status
+            FROM bookings_history b JOIN flights_history f ON f.flight_id = b.flight_id
+            WHERE b.booking_date IS NOT NULL
+        )
+        GROUP BY flight_id, days_before
+    """)
+
+
+# Benchmark
+
+def _naive_curve(conn, start, end, max_days=CURVE_DAYS):
+    # The same curve straight from the bookings table, for comparison
+    return conn.execute(f"""
+        SELECT MIN({days_before_sql("f", "b")}, ?) AS days_before, COUNT(*), SUM(b.status = 'Cancelled')
+        FROM bookings b JOIN flights f ON f.flight_id = b.flight_id
+        WHERE f.departure_ts >= ? AND f.departure_ts < ?
+        GROUP BY 1 ORDER BY 1 DESC
+    """, (max_days, start, end)).fetchall()
+
+
+def _timed(label, fn, repeat=5):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    print(f"{label}: {len(result)} row(s) in {best * 1000:.1f} ms")
+    return result
+
+
+def benchmark(flights=20_000, bookings=1_000_000, days=90, seed=7):
+    from airline.db import ConnectionPool
+    from airline.migrations import migrate
+    from airline.routing import synthetic_schedule
+
+    rng = random.Random(seed)
+    codes, legs = synthetic_schedule(flights, airports=60, days=days, seed=seed)
+    capacity = max(bookings // flights * 2, 10)
+    with tempfile.TemporaryDirectory() as tmp:
+        pool = ConnectionPool(os.path.join(tmp, "bench.db"), max_size=1)
+        migrate(pool)
+        start = time.perf_counter()
+        with pool.transaction() as conn:
+            conn.executemany("INSERT INTO airports (code, name) VALUES (?, ?)", [(c, c) for c in codes])
+            conn.executemany("""
+                INSERT INTO flights (flight_id, flight_number, departure_airport, arrival_airport, departure_time,
+                                     arrival_time, departure_ts, arrival_ts, capacity, status)
+                VALUES (?, ?, ?, ?, '', '', ?, ?, ?, ?)
+            """, [(leg.flight_id, leg.flight_number, leg.origin, leg.destination, leg.departure_ts,
+                   leg.arrival_ts, capacity, rng.choices(["Scheduled", "Delayed", "Cancelled"], [90, 8, 2])[0])
+                  for leg in legs])
+            seats = {}
+
+            def booking(i):
+                leg = rng.choice(legs)
+                seat = seats[leg.flight_id] = seats.get(leg.flight_id, 0) + 1
+                # Most bookings land in the last weeks before departure
+                booked = leg.departure_ts - int(rng.expovariate(1 / (14 * 86400)))
+                return (leg.flight_id, time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime(booked)), str(seat),
+                        "Cancelled" if rng.random() < 0.05 else "Confirmed")
+
+            conn.executemany("INSERT OR IGNORE INTO bookings (flight_id, booking_date, seat_number, status) "
+                             "VALUES (?, ?, ?, ?)", (booking(i) for i in range(bookings)))
+        print(f"{flights} flights over {days} days, {bookings} bookings loaded through the triggers "
+              f"in {time.perf_counter() - start:.1f} s")
+
+        window = (0, 30 * 86400)
+        with pool.connection() as conn:
+            _timed("day stats (30 days)", lambda: day_stats(conn, *window))
+            _timed("route stats", lambda: route_stats(conn, *window))
+            _timed("fullest flights", lambda: flight_load(conn, *window))
+            _timed("booking curve from rollup", lambda: booking_curve(conn, *window))
+            _timed("booking curve from bookings", lambda: _naive_curve(conn, *window))
+            _timed("day stats at one airport", lambda: day_stats(conn, *window, airport=codes[0]))
+            matches = booking_curve(conn, *window) == [CurvePoint(*row) for row in _naive_curve(conn, *window)]
+            print(f"rollup matches bookings: {matches}")
+        pool.close()
+
+
+def main(argv=None):
+    from airline.db import ConnectionPool
+
+    parser = argparse.ArgumentParser(description="Operations analytics rollups and benchmark")
+    commands = parser.add_subparsers(dest="command", required=True)
+    rebuild = commands.add_parser("rebuild", help="recompute the booking_curve rollup")
+    rebuild.add_argument("database")
+    bench = commands.add_parser("bench", help="benchmark the dashboard queries on a synthetic database")
+    bench.add_argument("--flights", type=int, default=20_000)
+    bench.add_argument("--bookings", type=int, default=1_000_000)
+    bench.add_argument("--days", type=int, default=90)
+    args = parser.parse_args(argv)
+
+    if args.command == "bench":
+        benchmark(args.flights, args.bookings, args.days)
+        return 0
+    pool = ConnectionPool(args.database, max_size=1)
+    try:
+        with pool.transaction(immediate=True) as conn:
+            rebuild_booking_curve(conn)
+            rows = conn.execute("SELECT COUNT(*) FROM booking_curve").fetchone()[0]
+        print(f"booking_curve rebuilt: {rows} row(s)")
+    finally:
+        pool.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
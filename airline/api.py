@@ -0,0 +1,291 @@
+# HTTP API
+#
+# A small JSON API over airline.services for check-in kiosks and partner
+# systems.  It is a plain ASGI application with no framework dependency; the
+# service calls are blocking SQLite work, so each one runs in a worker thread
+# (asyncio.to_thread) and the event loop keeps accepting requests meanwhile.
+# Serve it with any ASGI server, for example:
+#
+#     AIRLINE_DB=airline.db uvicorn airline.api:app --workers 2
+#
+#     GET  /airports?q=dhaka                   airport typeahead
+#     GET  /flights/search?q=DAC               upcoming flights matching q
+#     GET  /flights/{id}                       one flight with seat counts
+#     GET  /flights/{id}/seats                 seats still free to book
+#     GET  /itineraries?from=DAC&to=CXB&date=2025-03-01
+#     POST /sessions                           session token for Basic credentials
+#     DELETE /sessions                         sign the bearer token out
+#     GET  /bookings                           the caller's bookings
+#     POST /bookings  {"flight_id": 1, "seats": ["3A", "3B"]}
+#
+# /bookings takes HTTP Basic auth with a passenger account, or a bearer token
+# from POST /sessions.  Either way the password is verified once per session
+# (airline.auth); repeat requests are a lookup in the sessions table, which
+# every worker shares.  Basic credentials map to a per-process token, so each
+# worker verifies them once.
+import asyncio
+import base64
+import datetime
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+from urllib.parse import parse_qs
+
+from airline.auth import credential_token
+from airline.db import ConnectionPool
+from airline.importer import restore_deferred
+from airline.migrations import migrate
+from airline.models import to_dict
+from airline.services import AirlineServices
+
+MAX_BODY = 64 * 1024
+
+
+class HTTPError(Exception):
+    def __init__(self, status, message, headers=()):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+        self.headers = list(headers)
+
+
+def _query(scope):
+    return {k: v[-1] for k, v in parse_qs(scope.get("query_string", b"").decode("latin-1")).items()}
+
+
+def _require(params, name):
+    value = params.get(name, "").strip()
+    if not value:
+        raise HTTPError(400, f"Missing query parameter {name!r}")
+    return value
+
+
+async def _read_body(receive):
+    chunks, size = [], 0
+    while True:
+        message = await receive()
+        chunk = message.get("body", b"")
+        size += len(chunk)
+        if size > MAX_BODY:
+            raise HTTPError(413, "Request body too large")
+        chunks.append(chunk)
+        if not message.get("more_body"):
+            return b"".join(chunks)
+
+
+def _itinerary(it):
+    return {"departure_ts": it.departure_ts, "arrival_ts": it.arrival_ts, "duration": it.duration,
+            "stops": it.stops, "legs": [to_dict(leg) for leg in it.legs]}
+
+
+def _authorization(scope):
+    header = dict(scope.get("headers", ())).get(b"authorization", b"")
+    scheme, _, credentials = header.decode("latin-1").partition(" ")
+    return scheme.lower(), credentials.strip()
+
+
+def _basic_credentials(credentials):
+    try:
+        username, _, password = base64.b64decode(credentials, validate=True).decode("utf-8").partition(":")
+    except ValueError:
+        return None, None
+    return username, password
+
+
+class AirlineAPI:
+    """ASGI app; pass services to share an existing AirlineServices."""
+
+    def __init__(self, database=None, services=None):
+        self.database = database
+        self.services = services
+        self._owns_pool = False
+        self._start_lock = threading.Lock()
+        self._routes = [
+            ("GET", re.compile(r"/airports"), self.airports),
+            ("GET", re.compile(r"/flights/search"), self.search_flights),
+            ("GET", re.compile(r"/flights/(\d+)"), self.flight),
+            ("GET", re.compile(r"/flights/(\d+)/seats"), self.seats),
+            ("GET", re.compile(r"/itineraries"), self.itineraries),
+            ("POST", re.compile(r"/sessions"), self.create_session),
+            ("DELETE", re.compile(r"/sessions"), self.delete_session),
+            ("GET", re.compile(r"/bookings"), self.list_bookings),
+            ("POST", re.compile(r"/bookings"), self.create_booking),
+        ]
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            await self._lifespan(receive, send)
+        elif scope["type"] == "http":
+            await self._http(scope, receive, send)
+
+    # Lifecycle
+
+    def _start(self):
+        with self._start_lock:
+            if self.services is None:
+                pool = ConnectionPool(self.database)
+                migrate(pool)
+                restore_deferred(pool)
+                self.services = AirlineServices(pool)
+                self._owns_pool = True
+
+    def _stop(self):
+        if self._owns_pool:
+            self.services.pool.close()
+            self.services = None
+            self._owns_pool = False
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                try:
+                    await asyncio.to_thread(self._start)
+                except Exception as e:
+                    await send({"type": "lifespan.startup.failed", "message": str(e)})
+                    return
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                await asyncio.to_thread(self._stop)
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    # Dispatch
+
+    async def _http(self, scope, receive, send):
+        headers = []
+        try:
+            if self.services is None:
+                # Servers without lifespan support start us on first request
+                await asyncio.to_thread(self._start)
+            status, body = await self._dispatch(scope, receive)
+        except HTTPError as e:
+            status, body, headers = e.status, {"error": e.message}, e.headers
+        except ValueError as e:
+            # Invalid input rejected by the services (seatmap.LayoutError included)
+            status, body = 400, {"error": str(e)}
+        except sqlite3.Error:
+            status, body = 503, {"error": "Database unavailable"}
+        payload = json.dumps(body, ensure_ascii=False).encode("utf-8")
+        await send({
+            "type": "http.response.start",
+            "status": status,
+            "headers": [(b"content-type", b"application/json"),
+                        (b"content-length", str(len(payload)).encode())] + headers,
+        })
+        await send({"type": "http.response.body", "body": payload})
+
+    async def _dispatch(self, scope, receive):
+        path = scope["path"].rstrip("/") or "/"
+        allowed = set()
+        for method, pattern, handler in self._routes:
+            match = pattern.fullmatch(path)
+            if match is None:
+                continue
+            if method != scope["method"]:
+                allowed.add(method)
+                continue
+            return await handler(scope, receive, *(int(arg) for arg in match.groups()))
+        if allowed:
+            raise HTTPError(405, "Method not allowed", [(b"allow", ", ".join(sorted(allowed)).encode())])
+        raise HTTPError(404, "Not found")
+
+    async def _call(self, fn, *args, **kwargs):
+        return await asyncio.to_thread(fn, *args, **kwargs)
+
+    async def _user(self, scope):
+        """(User, session token) of the caller; 401 without valid credentials."""
+        scheme, credentials = _authorization(scope)
+        user = token = None
+        if scheme == "bearer":
+            token = credentials
+            user = await self._call(self.services.users.session, token)
+        elif scheme == "basic":
+            username, password = _basic_credentials(credentials)
+            if username:
+                token = credential_token(username, password, "passenger")
+                user = await self._call(self.services.users.authenticate, username, password, "passenger")
+        if user is None:
+            raise HTTPError(401, "Authentication required", [(b"www-authenticate", b'Basic realm="airline"')])
+        return user, token
+
+    # Handlers: each returns (status, JSON-able body)
+
+    async def airports(self, scope, receive):
+        airports = await self._call(self.services.flights.search_airports, _query(scope).get("q", ""))
+        return 200, [to_dict(a) for a in airports]
+
+    async def search_flights(self, scope, receive):
+        flights = await self._call(self.services.flights.search, _query(scope).get("q", ""))
+        return 200, [to_dict(f) for f in flights]
+
+    async def flight(self, scope, receive, flight_id):
+        flight = await self._call(self.services.flights.get, flight_id)
+        if flight is None:
+            raise HTTPError(404, f"Flight {flight_id} not found")
+        return 200, {**to_dict(flight), "remaining": flight.remaining}
+
+    async def seats(self, scope, receive, flight_id):
+        flight = await self._call(self.services.flights.get, flight_id)
+        if flight is None:
+            raise HTTPError(404, f"Flight {flight_id} not found")
+        layout, booked, held = await self._call(self.services.bookings.seat_map, flight_id, flight.layout_id)
+        return 200, {"flight_id": flight_id, "layout": layout.key, "remaining": flight.remaining,
+                     "free": layout.labels(~(booked | held) & layout.full_mask)}
+
+    async def itineraries(self, scope, receive):
+        params = _query(scope)
+        origin, destination = _require(params, "from").upper(), _require(params, "to").upper()
+        try:
+            day = datetime.date.fromisoformat(_require(params, "date"))
+        except ValueError:
+            raise HTTPError(400, "date must be YYYY-MM-DD")
+        found = await self._call(self.services.flights.itineraries, origin, destination, day)
+        return 200, [_itinerary(it) for it in found]
+
+    async def create_session(self, scope, receive):
+        scheme, credentials = _authorization(scope)
+        username, password = _basic_credentials(credentials) if scheme == "basic" else (None, None)
+        result = None
+        if username:
+            result = await self._call(self.services.users.login, username, password, "passenger")
+        if result is None:
+            raise HTTPError(401, "Invalid credentials", [(b"www-authenticate", b'Basic realm="airline"')])
+        user, token = result
+        return 201, {"token": token, "user": to_dict(user)}
+
+    async def delete_session(self, scope, receive):
+        scheme, token = _authorization(scope)
+        if scheme == "bearer":
+            await self._call(self.services.users.logout, token)
+        return 200, {}
+
+    async def list_bookings(self, scope, receive):
+        user, _ = await self._user(scope)
+        bookings = await self._call(self.services.bookings.for_user, user.user_id)
+        return 200, [to_dict(b) for b in bookings]
+
+    async def create_booking(self, scope, receive):
+        user, token = await self._user(scope)
+        try:
+            request = json.loads(await _read_body(receive) or b"{}")
+            flight_id = int(request["flight_id"])
+            seats = [str(seat) for seat in request["seats"]]
+        except (ValueError, KeyError, TypeError):
+            raise HTTPError(400, 'Expected {"flight_id": <int>, "seats": [<label>, ...]}')
+        if await self._call(self.services.flights.get, flight_id) is None:
+            raise HTTPError(404, f"Flight {flight_id} not found")
+        # Seat holds are keyed by a digest of the session, never the token itself
+        holder = hashlib.sha256(token.encode("utf-8")).hexdigest()
+        result = await self._call(self.services.bookings.reserve, user.user_id, flight_id, seats, holder)
+        if result.conflicts:
+            return 409, {"error": "Seats no longer available", "conflicts": list(result.conflicts)}
+        if not result.ok:
+            return 422, {"error": result.error}
+        return 201, {"flight_id": flight_id, "booked": list(result.booked)}
+
+
+app = AirlineAPI(os.environ.get("AIRLINE_DB", "airline.db"))
@@ -0,0 +1,169 @@
+# Flight Archive
+#
+# Flights that have landed are moved, together with their bookings and crew,
+# from the live tables into flights_history / bookings_history /
+# crew_history.  The live tables then only hold current and future flights,
+# which keeps the pages every search and booking touches small enough to
+# stay in the page cache.  Read helpers query the live set unless asked to
+# include the archive.
+#
+# Run periodically (e.g. from cron) with:
+#     python -m airline.archive airline.db [--before "2025-01-01 00:00:00"]  (UTC)
+import argparse
+import sys
+import time
+from dataclasses import dataclass
+
+from airline.db import ConnectionPool
+from airline.queries import FLIGHT_CREW, USER_BOOKINGS
+from airline.refdata import invalidate_flights
+from airline.timeutil import now_epoch, parse_local, to_epoch
+
+BATCH_SIZE = 500
+
+FLIGHT_COLUMNS = ("flight_id, flight_number, departure_airport, arrival_airport, departure_time, "
+                  "arrival_time, departure_ts, arrival_ts, capacity, status, booked_count, layout_id")
+BOOKING_COLUMNS = "booking_id, user_id, flight_id, booking_date, seat_number, status"
+CREW_COLUMNS = "crew_id, flight_id, member_id, crew_name, role, contact_info"
+
+
+@dataclass(frozen=True)
+class ArchiveResult:
+    flights: int
+    bookings: int
+    crew: int
+    elapsed: float
+
+    def summary(self):
+        return (f"Archived {self.flights} flight(s), {self.bookings} booking(s) and "
+                f"{self.crew} crew assignment(s) in {self.elapsed * 1000:.1f} ms")
+
+
+def _move(conn, flight_ids):
+    """Copy flights and their children to history, then delete them (one transaction)."""
+    ids = ", ".join("?" * len(flight_ids))
+    conn.execute(f"""
+        INSERT OR REPLACE INTO flights_history ({FLIGHT_COLUMNS})
+        SELECT {FLIGHT_COLUMNS} FROM flights WHERE flight_id IN ({ids})
+    """, flight_ids)
+    conn.execute(f"""
+        INSERT OR REPLACE INTO bookings_history ({BOOKING_COLUMNS})
+        SELECT {BOOKING_COLUMNS} FROM bookings WHERE flight_id IN ({ids})
+    """, flight_ids)
+    conn.execute(f"""
+        INSERT OR REPLACE INTO crew_history ({CREW_COLUMNS})
+        SELECT {CREW_COLUMNS} FROM crew WHERE flight_id IN ({ids})
+    """, flight_ids)
+    conn.execute(f"DELETE FROM seat_holds WHERE flight_id IN ({ids})", flight_ids)
+    bookings = conn.execute(f"DELETE FROM bookings WHERE flight_id IN ({ids})", flight_ids).rowcount
+    crew = conn.execute(f"DELETE FROM crew WHERE flight_id IN ({ids})", flight_ids).rowcount
+    flights = conn.execute(f"DELETE FROM flights WHERE flight_id IN ({ids})", flight_ids).rowcount
+    return flights, bookings, crew
+
+
+def archive_flight(pool, flight_id):
+    start = time.perf_counter()
+    with pool.transaction(immediate=True) as conn:
+        flights, bookings, crew = _move(conn, [flight_id])
+    invalidate_flights()
+    return ArchiveResult(flights, bookings, crew, time.perf_counter() - start)
+
+
+def archive_departed(pool, before=None, batch_size=BATCH_SIZE):
+    """Archive every flight arriving before the epoch `before` (default: now).
+
+    Works in batches of batch_size flights, one short transaction each, so
+    bookings are never blocked for the length of a large backlog.
+    """
+    if before is None:
+        before = now_epoch()
+    start = time.perf_counter()
+    totals = [0, 0, 0]
+    while True:
+        with pool.transaction(immediate=True) as conn:
+            flight_ids = [
+                row["flight_id"]
+                for row in conn.execute(
+                    "SELECT flight_id FROM flights WHERE arrival_ts < ? LIMIT ?",
+                    (before, batch_size),
+                )
+            ]
+            if not flight_ids:
+                break
+            for i, count in enumerate(_move(conn, flight_ids)):
+                totals[i] += count
+    if totals[0]:
+        invalidate_flights()
+    return ArchiveResult(*totals, time.perf_counter() - start)
+
+
+# Read APIs: live rows by default, live + history on request
+
+def list_flights(conn, include_archived=False, newest_first=False):
+    order = "DESC" if newest_first else "ASC"
+    if not include_archived:
+        return conn.execute(f"SELECT *, 0 AS archived FROM flights ORDER BY departure_ts {order}").fetchall()
+    return conn.execute(f"""
+        SELECT {FLIGHT_COLUMNS}, 0 AS archived FROM flights
+        UNION ALL
+        SELECT {FLIGHT_COLUMNS}, 1 AS archived FROM flights_history
+        ORDER BY departure_ts {order}
+    """).fetchall()
+
+
+def get_flight(conn, flight_id, include_archived=False):
+    row = conn.execute("SELECT *, 0 AS archived FROM flights WHERE flight_id = ?", (flight_id,)).fetchone()
+    if row is None and include_archived:
+        row = conn.execute("SELECT *, 1 AS archived FROM flights_history WHERE flight_id = ?",
+                           (flight_id,)).fetchone()
+    return row
+
+
+def flight_crew(conn, flight_id, include_archived=False):
+    if not include_archived:
+        return conn.execute(FLIGHT_CREW, (flight_id,)).fetchall()
+    return conn.execute(
+        FLIGHT_CREW + " UNION ALL SELECT " + CREW_COLUMNS + " FROM crew_history WHERE flight_id = ?",
+        (flight_id, flight_id),
+    ).fetchall()
+
+
+def user_bookings(conn, user_id, include_archived=False):
+    if not include_archived:
+        return conn.execute(USER_BOOKINGS, (user_id,)).fetchall()
+    return conn.execute("""
+        SELECT b.booking_id, f.flight_number, f.departure_airport, f.arrival_airport,
+               f.departure_time, b.seat_number, b.booking_date, b.status
+        FROM bookings b
+        JOIN flights f ON b.flight_id = f.flight_id
+        WHERE b.user_id = ?
+        UNION ALL
+        SELECT b.booking_id, f.flight_number, f.departure_airport, f.arrival_airport,
+               f.departure_time, b.seat_number, b.booking_date, b.status
+        FROM bookings_history b
+        JOIN flights_history f ON b.flight_id = f.flight_id
+        WHERE b.user_id = ?
+        ORDER BY booking_date DESC
+    """, (user_id, user_id)).fetchall()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Move departed flights into history tables")
+    parser.add_argument("database", nargs="?", default="airline.db")
+    parser.add_argument("--before", help="archive flights arriving before this time "
+                                         "(UTC, YYYY-MM-DD HH:MM:SS, default: now)")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    args = parser.parse_args(argv)
+
+    pool = ConnectionPool(args.database, max_size=1)
+    try:
+        before = to_epoch(parse_local(args.before, "UTC"), "UTC") if args.before else None
+        result = archive_departed(pool, before=before, batch_size=args.batch_size)
+    finally:
+        pool.close()
+    print(result.summary())
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,295 @@
+# Passwords and Sessions
+#
+# Passwords are stored as salted scrypt hashes (hashlib, no extra
+# dependency) in a self-describing format,
+#
+#     scrypt$<n>$<r>$<p>$<salt, base64>$<key, base64>
+#
+# so the cost can be raised at any time: a login that verifies against older
+# parameters, or against a legacy plaintext row from before hashing, rewrites
+# the stored value at the current cost (rehash on login).
+#
+# scrypt is slow on purpose (tens of milliseconds and 16 MB per hash at the
+# default cost), so the login path is built around it:
+#   - hashing runs on one small shared thread pool, which caps how many
+#     hashes run at once (and their memory) however many sessions log in;
+#   - an unknown username still costs one hash, so response times do not
+#     reveal which accounts exist;
+#   - a verified login opens a session in SessionStore, and later Streamlit
+#     reruns and API calls resolve its token with one primary-key lookup
+#     instead of verifying the password again.  Sessions live in the
+#     database (only a SHA-256 digest of each token is stored), so every
+#     process serving the same file, e.g. several API workers, shares them.
+#
+# Measure login latency and throughput with:
+#     python -m airline.auth bench [--logins 500] [--threads 8] [--n 16384]
+# Hash any remaining plaintext rows up front with:
+#     python -m airline.auth rehash airline.db
+import argparse
+import base64
+import functools
+import hashlib
+import hmac
+import os
+import secrets
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+
+from airline.db import ConnectionPool
+from airline.models import User, from_row
+
+HASH_WORKERS = min(4, os.cpu_count() or 1)
+SALT_BYTES = 16
+KEY_BYTES = 32
+SESSION_TTL = 12 * 3600
+SCHEME = "scrypt"
+
+
+@dataclass(frozen=True)
+class ScryptCost:
+    n: int = 2 ** 14
+    r: int = 8
+    p: int = 1
+
+    @property
+    def maxmem(self):
+        # scrypt needs 128 * r * (n + p + 2) bytes; OpenSSL's default cap is 32 MB
+        return 2 * 128 * self.r * (self.n + self.p + 2)
+
+
+DEFAULT_COST = ScryptCost()
+
+
+def _b64(data):
+    return base64.b64encode(data).decode("ascii")
+
+
+def _scrypt(password, salt, cost, length=KEY_BYTES):
+    return hashlib.scrypt(password.encode("utf-8"), salt=salt, n=cost.n, r=cost.r, p=cost.p,
+                          maxmem=cost.maxmem, dklen=length)
+
+
+def hash_password(password, cost=DEFAULT_COST):
+    salt = os.urandom(SALT_BYTES)
+    key = _scrypt(password, salt, cost)
+    return "$".join([SCHEME, str(cost.n), str(cost.r), str(cost.p), _b64(salt), _b64(key)])
+
+
+def _parse(stored):
+    """(cost, salt, key) of a hash, or None for a legacy plaintext value."""
+    parts = stored.split("$")
+    if len(parts) != 6 or parts[0] != SCHEME:
+        return None
+    try:
+        cost = ScryptCost(int(parts[1]), int(parts[2]), int(parts[3]))
+        return cost, base64.b64decode(parts[4]), base64.b64decode(parts[5])
+    except ValueError:
+        return None
+
+
+def verify_password(password, stored):
+    parsed = _parse(stored)
+    if parsed is None:
+        return hmac.compare_digest(password.encode("utf-8"), stored.encode("utf-8"))
+    cost, salt, key = parsed
+    return hmac.compare_digest(_scrypt(password, salt, cost, len(key)), key)
+
+
+def needs_rehash(stored, cost=DEFAULT_COST):
+    parsed = _parse(stored)
+    return parsed is None or parsed[0] != cost
+
+
+@functools.lru_cache(maxsize=4)
+def dummy_hash(cost=DEFAULT_COST):
+    """A hash to verify against when the username does not exist."""
+    return hash_password(secrets.token_hex(16), cost)
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def hash_executor():
+    """The process-wide pool that every hash and verify runs on."""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(HASH_WORKERS, thread_name_prefix="password-hash")
+        return _executor
+
+
+def run_hashing(fn, *args):
+    return hash_executor().submit(fn, *args).result()
+
+
+# Sessions
+
+_CREDENTIAL_KEY = os.urandom(32)
+
+
+def credential_token(username, password, role):
+    """Stable session token for a credential triple, so clients that send a
+    password with every request (HTTP Basic) are verified once per process.
+    Keyed with a per-process secret; never sent anywhere, and only its
+    digest is stored."""
+    message = "\0".join((role, username, password)).encode("utf-8")
+    return hmac.new(_CREDENTIAL_KEY, message, hashlib.sha256).hexdigest()
+
+
+SESSION_USER = """
+    SELECT u.user_id, u.username, u.email, u.role, u.created_at
+    FROM sessions s
+    JOIN users u ON u.user_id = s.user_id
+    WHERE s.token_hash = ? AND s.expires_at > ?
+"""
+
+
+def _digest(token):
+    return hashlib.sha256(token.encode("utf-8")).digest()
+
+
+class SessionStore:
+    """token -> verified User, kept in the sessions table (migration 14)
+    and valid for ttl seconds after the login."""
+
+    def __init__(self, pool, ttl=SESSION_TTL):
+        self.pool = pool
+        self.ttl = ttl
+
+    def __len__(self):
+        with self.pool.connection() as conn:
+            return conn.execute("SELECT COUNT(*) FROM sessions WHERE expires_at > ?", (time.time(),)).fetchone()[0]
+
+    def issue(self, user, token=None):
+        token = token or secrets.token_urlsafe(32)
+        now = time.time()
+        with self.pool.transaction() as conn:
+            # Expired sessions are swept by the next login
+            conn.execute("DELETE FROM sessions WHERE expires_at <= ?", (now,))
+            conn.execute("INSERT OR REPLACE INTO sessions (token_hash, user_id, expires_at) VALUES (?, ?, ?)",
+                         (_digest(token), user.user_id, now + self.ttl))
+        return token
+
+    def get(self, token):
+        if not token:
+            return None
+        with self.pool.connection() as conn:
+            row = conn.execute(SESSION_USER, (_digest(token), time.time())).fetchone()
+        return from_row(User, row) if row else None
+
+    def revoke(self, token):
+        if not token:
+            return
+        with self.pool.transaction() as conn:
+            conn.execute("DELETE FROM sessions WHERE token_hash = ?", (_digest(token),))
+
+    def revoke_user(self, user_id, keep=None):
+        """Drop every session of user_id except keep (after a password change)."""
+        with self.pool.transaction() as conn:
+            conn.execute("DELETE FROM sessions WHERE user_id = ? AND token_hash IS NOT ?",
+                         (user_id, _digest(keep) if keep else None))
+
+
+# Maintenance and benchmark
+
+def rehash_plaintext(pool, cost=DEFAULT_COST):
+    """Hash every row still holding a plaintext password; returns the count."""
+    with pool.connection() as conn:
+        rows = conn.execute(f"SELECT user_id, password FROM users WHERE password NOT LIKE '{SCHEME}$%'").fetchall()
+    legacy = [row for row in rows if _parse(row["password"]) is None]
+    hashed = list(hash_executor().map(lambda row: hash_password(row["password"], cost), legacy))
+    with pool.transaction(immediate=True) as conn:
+        # Only rows nobody changed meanwhile
+        return sum(conn.execute("UPDATE users SET password = ? WHERE user_id = ? AND password = ?",
+                                (new, row["user_id"], row["password"])).rowcount
+                   for row, new in zip(legacy, hashed))
+
+
+def _percentiles(samples):
+    q = statistics.quantiles(samples, n=100, method="inclusive")
+    return f"p50 {q[49] * 1000:.3f} ms, p99 {q[98] * 1000:.3f} ms, max {max(samples) * 1000:.3f} ms"
+
+
+def _timed(fn, jobs, threads):
+    samples = []
+
+    def run(job):
+        start = time.perf_counter()
+        fn(*job)
+        samples.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(threads) as sessions:
+        list(sessions.map(run, jobs))
+    return samples, time.perf_counter() - start
+
+
+def benchmark(users=100, logins=500, threads=8, cost=DEFAULT_COST):
+    from airline.migrations import migrate
+    from airline.services import UserService
+
+    with tempfile.TemporaryDirectory() as tmp:
+        pool = ConnectionPool(os.path.join(tmp, "bench.db"), max_size=threads)
+        migrate(pool)
+        service = UserService(pool, cost)
+        names = [f"bench{i}" for i in range(users)]
+        with pool.transaction() as conn:
+            # Half the accounts hashed, half legacy plaintext to be rehashed
+            conn.executemany("INSERT INTO users (username, password, email, role) VALUES (?, ?, ?, 'passenger')",
+                             [(name, hash_password(name, cost) if i % 2 else name, f"{name}@example.com")
+                              for i, name in enumerate(names)])
+        print(f"cost n={cost.n} r={cost.r} p={cost.p}; {HASH_WORKERS} hash worker(s), {threads} concurrent sessions")
+
+        samples, elapsed = _timed(service.login, [(name, name, "passenger") for name in names], threads)
+        print(f"first logins (half rehashing plaintext): {len(samples)} in {elapsed:.2f} s; {_percentiles(samples)}")
+
+        jobs = [(names[i % users], names[i % users], "passenger") for i in range(logins)]
+        samples, elapsed = _timed(service.login, jobs, threads)
+        print(f"full-verify logins: {len(samples) / elapsed:,.0f}/s; {_percentiles(samples)}")
+
+        samples, elapsed = _timed(service.login, [(f"nobody{i}", "x", "passenger") for i in range(logins // 4)],
+                                  threads)
+        print(f"unknown users: {_percentiles(samples)}")
+
+        tokens = [service.login(name, name, "passenger")[1] for name in names]
+        jobs = [(tokens[i % users],) for i in range(logins * 10)]
+        samples, elapsed = _timed(service.session, jobs, threads)
+        print(f"session lookups: {len(samples) / elapsed:,.0f}/s; {_percentiles(samples)}")
+        pool.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Password hashing maintenance and benchmark")
+    commands = parser.add_subparsers(dest="command", required=True)
+    rehash = commands.add_parser("rehash", help="hash every remaining plaintext password")
+    rehash.add_argument("database")
+    bench = commands.add_parser("bench", help="benchmark the login path on a scratch database")
+    bench.add_argument("--users", type=int, default=100)
+    bench.add_argument("--logins", type=int, default=500)
+    bench.add_argument("--threads", type=int, default=8)
+    for command in (rehash, bench):
+        command.add_argument("--n", type=int, default=DEFAULT_COST.n, help="scrypt CPU/memory cost")
+        command.add_argument("--r", type=int, default=DEFAULT_COST.r, help="scrypt block size")
+        command.add_argument("--p", type=int, default=DEFAULT_COST.p, help="scrypt parallelism")
+    args = parser.parse_args(argv)
+    cost = ScryptCost(args.n, args.r, args.p)
+
+    if args.command == "bench":
+        benchmark(args.users, args.logins, args.threads, cost)
+        return 0
+    pool = ConnectionPool(args.database, max_size=1)
+    try:
+        print(f"{rehash_plaintext(pool, cost)} password(s) hashed")
+    finally:
+        pool.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,92 @@
+# Booking Engine
+#
+# reserve_seats() books a set of seats all-or-nothing.  The whole operation
+# runs under BEGIN IMMEDIATE, so concurrent bookers queue on SQLite's write
+# lock (bounded by busy_timeout) instead of racing a read-then-write check.
+# Seat conflicts are detected by the unique index on (flight_id, seat_number)
+# over confirmed bookings rather than a pre-read of booked seats.  Seats
+# leased to another session through airline.holds count as conflicts as well.
+import sqlite3
+from dataclasses import dataclass
+
+from airline.holds import held_seats
+from airline.seatmap import get_layout
+
+
+@dataclass(frozen=True)
+class BookingResult:
+    booked: tuple = ()
+    conflicts: tuple = ()
+    error: str = None
+
+    @property
+    def ok(self):
+        return bool(self.booked) and not self.conflicts and self.error is None
+
+
+def reserve_seats(pool, user_id, flight_id, seats, holder=None):
+    """Book every seat in seats for user_id, or none of them.
+
+    holder identifies the caller's seat holds: those seats are booked and
+    their leases released, while seats held by anyone else are conflicts.
+
+    Returns a BookingResult listing the seats booked, or the exact seats that
+    were lost to other bookings, or an error for capacity/flight/user problems.
+    Raises ValueError for seat labels that are not in the flight's layout.
+    """
+    seats = list(dict.fromkeys(seats))
+    if not seats:
+        return BookingResult(error="No seats selected")
+
+    with pool.transaction(immediate=True) as conn:
+        flight = conn.execute(
+            "SELECT capacity, booked_count, status, layout_id FROM flights WHERE flight_id = ?",
+            (flight_id,),
+        ).fetchone()
+        if flight is None:
+            return BookingResult(error="Flight not found")
+        if flight["status"] == "Cancelled":
+            return BookingResult(error="Flight has been cancelled")
+        layout = get_layout(conn, flight["layout_id"])
+        unknown = [seat for seat in seats if seat not in layout.index]
+        if unknown:
+            raise ValueError(f"No such seat(s) on this flight: {', '.join(unknown)}")
+        remaining = flight["capacity"] - flight["booked_count"]
+        if len(seats) > remaining:
+            return BookingResult(error=f"Only {max(remaining, 0)} seat(s) left on this flight")
+
+        held = held_seats(conn, flight_id, exclude_holder=holder)
+        if held.intersection(seats):
+            return BookingResult(conflicts=tuple(s for s in seats if s in held))
+
+        conn.execute("SAVEPOINT reserve_seats")
+        try:
+            conn.executemany(
+                "INSERT INTO bookings (user_id, flight_id, seat_number) VALUES (?, ?, ?)",
+                [(user_id, flight_id, seat) for seat in seats],
+            )
+        except sqlite3.IntegrityError as e:
+            # Undo the rows inserted before the conflicting one, then report
+            # every requested seat that is taken (we still hold the write lock).
+            conn.execute("ROLLBACK TO reserve_seats")
+            conn.execute("RELEASE reserve_seats")
+            placeholders = ", ".join("?" * len(seats))
+            taken = {
+                row["seat_number"]
+                for row in conn.execute(
+                    f"SELECT seat_number FROM bookings WHERE flight_id = ? AND status = 'Confirmed' AND seat_number IN ({placeholders})",
+                    (flight_id, *seats),
+                )
+            }
+            if not taken:
+                # Not a seat clash: a foreign key failed, e.g. for an unknown user
+                if conn.execute("SELECT 1 FROM users WHERE user_id = ?", (user_id,)).fetchone() is None:
+                    return BookingResult(error="User not found")
+                return BookingResult(error=f"Booking rejected: {e}")
+            return BookingResult(conflicts=tuple(s for s in seats if s in taken))
+        conn.execute("RELEASE reserve_seats")
+        conn.execute(
+            f"DELETE FROM seat_holds WHERE flight_id = ? AND seat_number IN ({', '.join('?' * len(seats))})",
+            (flight_id, *seats),
+        )
+    return BookingResult(booked=tuple(seats))
@@ -0,0 +1,132 @@
+# Booking Administration
+#
+# The admin booking list is read one page at a time with keyset (seek)
+# pagination on (booking_date, booking_id): each page starts strictly after
+# the last row of the previous one, so page N costs the same as page 1 no
+# matter how many bookings exist.  All filters are applied in SQL.
+#
+# Bulk operations run as a single transaction each: id sets go through one
+# executemany, flight/filter operations are one set-based statement.
+# Cancelling keeps the row with status 'Cancelled' and frees the seat.
+import datetime
+import time
+from dataclasses import dataclass
+
+PAGE_SIZE = 50
+
+
+@dataclass(frozen=True)
+class BookingFilter:
+    flight_id: int = None
+    username: str = None
+    status: str = None
+    date_from: datetime.date = None   # booking_date, inclusive
+    date_to: datetime.date = None     # booking_date, inclusive
+
+    def where(self):
+        clauses, params = [], []
+        if self.flight_id is not None:
+            clauses.append("b.flight_id = ?")
+            params.append(self.flight_id)
+        if self.username:
+            clauses.append("b.user_id = (SELECT user_id FROM users WHERE username = ?)")
+            params.append(self.username)
+        if self.status:
+            clauses.append("b.status = ?")
+            params.append(self.status)
+        if self.date_from:
+            clauses.append("b.booking_date >= ?")
+            params.append(self.date_from.isoformat())
+        if self.date_to:
+            clauses.append("b.booking_date < ?")
+            params.append((self.date_to + datetime.timedelta(days=1)).isoformat())
+        return (" AND ".join(clauses) or "1"), params
+
+
+def count_query(filters=BookingFilter()):
+    where, params = filters.where()
+    return f"SELECT COUNT(*) FROM bookings b WHERE {where}", params
+
+
+def page_query(filters=BookingFilter(), after=None, limit=PAGE_SIZE):
+    """(sql, params) of one newest-first page; after is the (booking_date,
+    booking_id) of the last row on the previous page."""
+    where, params = filters.where()
+    if after is not None:
+        where += " AND (b.booking_date, b.booking_id) < (?, ?)"
+        params.extend(after)
+    return f"""
+        SELECT b.booking_id, u.username, f.flight_number, f.departure_airport,
+               f.arrival_airport, f.departure_time, b.seat_number, b.status, b.booking_date
+        FROM bookings b
+        JOIN users u ON b.user_id = u.user_id
+        JOIN flights f ON b.flight_id = f.flight_id
+        WHERE {where}
+        ORDER BY b.booking_date DESC, b.booking_id DESC
+        LIMIT ?
+    """, (*params, limit)
+
+
+def count_bookings(conn, filters=BookingFilter()):
+    return conn.execute(*count_query(filters)).fetchone()[0]
+
+
+def page_bookings(conn, filters=BookingFilter(), after=None, limit=PAGE_SIZE):
+    return conn.execute(*page_query(filters, after, limit)).fetchall()
+
+
+def page_cursor(row):
+    return row["booking_date"], row["booking_id"]
+
+
+@dataclass(frozen=True)
+class BulkResult:
+    action: str
+    matched: int
+    changed: int
+    elapsed: float
+
+    def summary(self):
+        return (f"{self.action}: {self.changed} of {self.matched} booking(s) changed "
+                f"in {self.elapsed * 1000:.1f} ms")
+
+
+def _by_ids(pool, action, sql, booking_ids):
+    ids = list(dict.fromkeys(booking_ids))
+    start = time.perf_counter()
+    with pool.transaction(immediate=True) as conn:
+        changed = conn.executemany(sql, [(booking_id,) for booking_id in ids]).rowcount if ids else 0
+    return BulkResult(action, len(ids), changed, time.perf_counter() - start)
+
+
+def _by_filter(pool, action, sql, filters):
+    where, params = filters.where()
+    start = time.perf_counter()
+    with pool.transaction(immediate=True) as conn:
+        matched = conn.execute(f"SELECT COUNT(*) FROM bookings b WHERE {where}", params).fetchone()[0]
+        changed = conn.execute(sql.format(where=where), params).rowcount
+    return BulkResult(action, matched, changed, time.perf_counter() - start)
+
+
+def cancel_bookings(pool, booking_ids):
+    return _by_ids(
+        pool, "Cancel",
+        "UPDATE bookings SET status = 'Cancelled' WHERE booking_id = ? AND status != 'Cancelled'",
+        booking_ids,
+    )
+
+
+def delete_bookings(pool, booking_ids):
+    return _by_ids(pool, "Delete", "DELETE FROM bookings WHERE booking_id = ?", booking_ids)
+
+
+def cancel_matching(pool, filters):
+    return _by_filter(
+        pool, "Cancel",
+        "UPDATE bookings AS b SET status = 'Cancelled' WHERE {where} AND b.status != 'Cancelled'",
+        filters,
+    )
+
+
+def delete_matching(pool, filters):
+    return _by_filter(pool, "Delete", "DELETE FROM bookings AS b WHERE {where}", filters)
@@ -0,0 +1,604 @@
+# Crew Scheduling
+#
+# Crew are people (crew_members); a row in crew assigns one member to one
+# flight in a role.  Whether an assignment is legal depends on the member's
+# other flights, so the scheduler keeps an interval index: per member, the
+# block times (departure_ts to arrival_ts) of their flights sorted by
+# departure with a parallel list of departures for bisect.  Checking one
+# more flight looks at the neighbouring intervals only, never at the roster.
+#
+# The rules (DutyRules, all in seconds):
+#   - overlap: nobody is on two flights at once, and consecutive flights
+#     leave at least min_turn on the ground;
+#   - duty: flights with at most max_sit between them form one duty period,
+#     running from report_before the first departure to release_after the
+#     last arrival, and no duty period may exceed max_duty;
+#   - rest: between two duty periods a member is off for at least min_rest.
+#
+# plan_assignments() staffs a day's flights greedily in departure order: each
+# open position of the crew complement goes to the least-flown member of the
+# role who is at the departure airport (where their last flight landed, or
+# their home base) and breaks no rule.  Members sit in per-airport pools that
+# follow them through the day, so a flight only considers the crew on hand.
+#
+#     python -m airline.crew check airline.db [--date 2025-05-24]
+#     python -m airline.crew assign airline.db --date 2025-05-24 [--dry-run]
+#     python -m airline.crew bench [--flights 5000] [--members 8000]
+import argparse
+import bisect
+import datetime
+import heapq
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from collections import Counter
+from dataclasses import dataclass
+
+CREW_COMPLEMENT = {"Pilot": 1, "Co-Pilot": 1, "Flight Attendant": 2}
+
+SECTOR_COLUMNS = ("c.member_id, f.flight_id, f.departure_airport AS origin, f.arrival_airport AS destination, "
+                  "f.departure_ts, f.arrival_ts")
+
+CREW_PAGE_SIZE = 25
+
+# Archived flights still count: yesterday's last landing decides today's rest
+SCHEDULE_SQL = f"""
+    SELECT {SECTOR_COLUMNS} FROM crew c JOIN flights f ON f.flight_id = c.flight_id
+    WHERE f.departure_ts >= ? AND f.departure_ts < ? AND c.member_id IS NOT NULL
+      AND f.status IS NOT 'Cancelled'
+    UNION ALL
+    SELECT {SECTOR_COLUMNS} FROM crew_history c JOIN flights_history f ON f.flight_id = c.flight_id
+    WHERE f.departure_ts >= ? AND f.departure_ts < ? AND c.member_id IS NOT NULL
+      AND f.status IS NOT 'Cancelled'
+"""
+
+MEMBER_SCHEDULE_SQL = SCHEDULE_SQL.replace("c.member_id IS NOT NULL", "c.member_id = ?")
+
+
+@dataclass(frozen=True)
+class DutyRules:
+    min_turn: int = 30 * 60
+    report_before: int = 60 * 60
+    release_after: int = 30 * 60
+    max_sit: int = 4 * 3600
+    max_duty: int = 13 * 3600
+    min_rest: int = 10 * 3600
+
+    @property
+    def context(self):
+        """How far either side of a window other flights can still matter."""
+        return self.max_duty + self.min_rest + self.report_before + self.release_after
+
+
+DEFAULT_RULES = DutyRules()
+
+
+@dataclass(frozen=True)
+class Sector:
+    flight_id: int
+    origin: str
+    destination: str
+    departure_ts: int
+    arrival_ts: int
+
+
+@dataclass(frozen=True)
+class Violation:
+    member_id: int
+    kind: str             # "overlap", "duty" or "rest"
+    flight_ids: tuple
+    detail: str
+
+
+@dataclass(frozen=True)
+class AssignResult:
+    crew_id: int = None
+    violations: tuple = ()
+
+    @property
+    def ok(self):
+        return self.crew_id is not None
+
+
+@dataclass(frozen=True)
+class FlightCrewResult:
+    saved: bool
+    added: int = 0
+    updated: int = 0
+    removed: int = 0
+    violations: tuple = ()
+
+    def summary(self):
+        return f"Added {self.added}, updated {self.updated} and removed {self.removed} crew assignment(s)"
+
+
+def _sector(row):
+    return Sector(row["flight_id"], row["origin"], row["destination"], row["departure_ts"], row["arrival_ts"])
+
+
+def _hours(seconds):
+    return f"{seconds / 3600:.1f} h"
+
+
+class _Intervals:
+    """One member's sectors sorted by departure, plus the departures for bisect."""
+
+    __slots__ = ("starts", "sectors", "longest", "block")
+
+    def __init__(self):
+        self.starts = []
+        self.sectors = []
+        self.longest = 0
+        self.block = 0
+
+    def add(self, sector):
+        i = bisect.bisect_right(self.starts, sector.departure_ts)
+        self.starts.insert(i, sector.departure_ts)
+        self.sectors.insert(i, sector)
+        self.longest = max(self.longest, sector.arrival_ts - sector.departure_ts)
+        self.block += sector.arrival_ts - sector.departure_ts
+
+    def remove(self, flight_id):
+        for i, sector in enumerate(self.sectors):
+            if sector.flight_id == flight_id:
+                del self.starts[i]
+                del self.sectors[i]
+                self.block -= sector.arrival_ts - sector.departure_ts
+                return sector
+        return None
+
+    def overlapping(self, start, end):
+        """Sectors in the air at some point of [start, end)."""
+        # Nothing departing before start - longest can still be airborne at start
+        lo = bisect.bisect_left(self.starts, start - self.longest)
+        hi = bisect.bisect_left(self.starts, end)
+        return [s for s in self.sectors[lo:hi] if s.arrival_ts > start]
+
+
+class CrewSchedule:
+    """Interval index of member_id -> sectors, with the duty rules."""
+
+    def __init__(self, rules=DEFAULT_RULES):
+        self.rules = rules
+        self._members = {}
+
+    @classmethod
+    def from_db(cls, conn, start, end, rules=DEFAULT_RULES, member_id=None):
+        """Assignments that can affect flights departing in [start, end)."""
+        schedule = cls(rules)
+        window = (start - rules.context, end + rules.context) * 2
+        if member_id is None:
+            rows = conn.execute(SCHEDULE_SQL, window)
+        else:
+            rows = conn.execute(MEMBER_SCHEDULE_SQL, (window[0], window[1], member_id,
+                                                      window[2], window[3], member_id))
+        for row in rows:
+            schedule.add(row["member_id"], _sector(row))
+        return schedule
+
+    def __len__(self):
+        return sum(len(table.sectors) for table in self._members.values())
+
+    def add(self, member_id, sector):
+        table = self._members.get(member_id)
+        if table is None:
+            table = self._members[member_id] = _Intervals()
+        table.add(sector)
+
+    def remove(self, member_id, flight_id):
+        table = self._members.get(member_id)
+        return table.remove(flight_id) if table else None
+
+    def sectors(self, member_id):
+        table = self._members.get(member_id)
+        return tuple(table.sectors) if table else ()
+
+    def block_time(self, member_id):
+        table = self._members.get(member_id)
+        return table.block if table else 0
+
+    def location(self, member_id, at, default=None):
+        """Where the member's last flight departing before `at` lands, else default."""
+        table = self._members.get(member_id)
+        i = bisect.bisect_left(table.starts, at) if table else 0
+        return table.sectors[i - 1].destination if i else default
+
+    def check(self, member_id, sector):
+        """Violations that assigning sector to member_id would cause."""
+        rules = self.rules
+        table = self._members.get(member_id)
+        if table is None:
+            return []
+        clash = table.overlapping(sector.departure_ts - rules.min_turn, sector.arrival_ts + rules.min_turn)
+        if any(s.flight_id == sector.flight_id for s in clash):
+            return [Violation(member_id, "overlap", (sector.flight_id,), "already assigned to this flight")]
+        if clash:
+            return [Violation(member_id, "overlap", (sector.flight_id, *(s.flight_id for s in clash)),
+                              f"less than {rules.min_turn // 60} min between flights")]
+
+        # The duty period the sector would join, chained both ways over
+        # ground gaps of at most max_sit
+        sectors = table.sectors
+        before = bisect.bisect_right(table.starts, sector.departure_ts) - 1
+        after = before + 1
+        first = last = sector
+        while before >= 0 and first.departure_ts - sectors[before].arrival_ts <= rules.max_sit:
+            first = sectors[before]
+            before -= 1
+        while after < len(sectors) and sectors[after].departure_ts - last.arrival_ts <= rules.max_sit:
+            last = sectors[after]
+            after += 1
+
+        violations = []
+        duty = last.arrival_ts + rules.release_after - (first.departure_ts - rules.report_before)
+        if duty > rules.max_duty:
+            violations.append(Violation(member_id, "duty", (sector.flight_id,),
+                                        f"duty of {_hours(duty)} exceeds {_hours(rules.max_duty)}"))
+        if before >= 0:
+            rest = self._rest(sectors[before], first)
+            if rest < rules.min_rest:
+                violations.append(Violation(member_id, "rest", (sector.flight_id, sectors[before].flight_id),
+                                            f"{_hours(rest)} rest before duty, {_hours(rules.min_rest)} required"))
+        if after < len(sectors):
+            rest = self._rest(last, sectors[after])
+            if rest < rules.min_rest:
+                violations.append(Violation(member_id, "rest", (sector.flight_id, sectors[after].flight_id),
+                                            f"{_hours(rest)} rest after duty, {_hours(rules.min_rest)} required"))
+        return violations
+
+    def _rest(self, previous, following):
+        return (following.departure_ts - self.rules.report_before) - (previous.arrival_ts + self.rules.release_after)
+
+    def violations(self, member_ids=None):
+        """Every rule broken by the current assignments, one sweep per member."""
+        rules = self.rules
+        found = []
+        for member_id in self._members if member_ids is None else member_ids:
+            table = self._members.get(member_id)
+            if not table or not table.sectors:
+                continue
+            first = reach = table.sectors[0]
+            for sector in table.sectors[1:]:
+                gap = sector.departure_ts - reach.arrival_ts
+                if gap < rules.min_turn:
+                    found.append(Violation(member_id, "overlap", (reach.flight_id, sector.flight_id),
+                                           f"less than {rules.min_turn // 60} min between flights"))
+                elif gap > rules.max_sit:
+                    found.extend(self._duty_violation(member_id, first, reach))
+                    rest = self._rest(reach, sector)
+                    if rest < rules.min_rest:
+                        found.append(Violation(member_id, "rest", (reach.flight_id, sector.flight_id),
+                                               f"{_hours(rest)} rest, {_hours(rules.min_rest)} required"))
+                    first = sector
+                if sector.arrival_ts >= reach.arrival_ts:
+                    reach = sector
+            found.extend(self._duty_violation(member_id, first, reach))
+        return found
+
+    def _duty_violation(self, member_id, first, last):
+        duty = last.arrival_ts + self.rules.release_after - (first.departure_ts - self.rules.report_before)
+        if duty <= self.rules.max_duty:
+            return []
+        return [Violation(member_id, "duty", (first.flight_id, last.flight_id),
+                          f"duty of {_hours(duty)} exceeds {_hours(self.rules.max_duty)}")]
+
+
+# Auto-assignment
+
+@dataclass(frozen=True)
+class AssignmentPlan:
+    assignments: tuple    # (flight_id, member_id, role)
+    unfilled: tuple       # (flight_id, role, positions still open)
+    elapsed: float
+
+    def summary(self):
+        open_positions = sum(missing for _, _, missing in self.unfilled)
+        return (f"Assigned {len(self.assignments)} position(s), {open_positions} left open "
+                f"on {len({f for f, _, _ in self.unfilled})} flight(s) in {self.elapsed * 1000:.1f} ms")
+
+
+def plan_assignments(schedule, sectors, members, staffed=None, complement=CREW_COMPLEMENT):
+    """Greedily staff sectors (in departure order) from members.
+
+    members are CrewMember objects; staffed maps flight_id -> Counter of roles
+    already assigned.  Assignments are added to schedule as they are made.
+    """
+    start = time.perf_counter()
+    rules = schedule.rules
+    staffed = staffed or {}
+    sectors = sorted(sectors, key=lambda s: (s.departure_ts, s.flight_id))
+    if not sectors:
+        return AssignmentPlan((), (), time.perf_counter() - start)
+    day_start = sectors[0].departure_ts
+
+    # (role, airport) -> heap of (block time, member_id, version) for the
+    # crew on hand there, least flown first; airport None means anywhere.
+    # Placing a member again bumps their version, which retires old entries.
+    pools, where, role_of, version = {}, {}, {}, {}
+    moves = []      # (departure_ts, member_id, destination) of flights already on the roster
+    waiting = []    # (ts, member_id): off the pools until ts (airborne, resting)
+
+    def place(member_id):
+        version[member_id] = version.get(member_id, 0) + 1
+        heapq.heappush(pools.setdefault((role_of[member_id], where[member_id]), []),
+                       (schedule.block_time(member_id), member_id, version[member_id]))
+
+    def wait(member_id, until):
+        version[member_id] = version.get(member_id, 0) + 1
+        heapq.heappush(waiting, (until, member_id))
+
+    for member in members:
+        if member.role not in complement:
+            continue
+        role_of[member.member_id] = member.role
+        where[member.member_id] = schedule.location(member.member_id, day_start, member.home_base)
+        place(member.member_id)
+        for sector in schedule.sectors(member.member_id):
+            if sector.departure_ts >= day_start:
+                moves.append((sector.departure_ts, member.member_id, sector.destination))
+    heapq.heapify(moves)
+
+    def candidates(role, airport):
+        """Valid pool entries for role at airport or anywhere, least flown first."""
+        heaps = [h for h in (pools.get((role, airport)), pools.get((role, None))) if h]
+        while True:
+            for heap in heaps:
+                while heap and heap[0][2] != version[heap[0][1]]:
+                    heapq.heappop(heap)
+            heaps = [h for h in heaps if h]
+            if not heaps:
+                return
+            yield heapq.heappop(min(heaps, key=lambda h: h[0]))[1]
+
+    assignments, unfilled = [], []
+    for sector in sectors:
+        while moves and moves[0][0] < sector.departure_ts:
+            _, member_id, airport = heapq.heappop(moves)
+            where[member_id] = airport
+            place(member_id)
+        while waiting and waiting[0][0] <= sector.departure_ts:
+            place(heapq.heappop(waiting)[1])
+
+        have = staffed.get(sector.flight_id, Counter())
+        for role, needed in complement.items():
+            missing = needed - have.get(role, 0)
+            rejected = []
+            for member_id in candidates(role, sector.origin) if missing > 0 else ():
+                violations = schedule.check(member_id, sector)
+                if violations:
+                    rejected.append((member_id, violations))
+                    continue
+                schedule.add(member_id, sector)
+                assignments.append((sector.flight_id, member_id, role))
+                # Back in a pool once they have landed and turned around
+                where[member_id] = sector.destination
+                wait(member_id, sector.arrival_ts + rules.min_turn)
+                missing -= 1
+                if not missing:
+                    break
+            for member_id, violations in rejected:
+                # Busy until their current flight lands; out of duty time
+                # until they have rested
+                last = schedule.sectors(member_id)[-1]
+                if all(v.kind == "overlap" for v in violations):
+                    until = last.arrival_ts + rules.min_turn
+                else:
+                    until = last.arrival_ts + rules.release_after + rules.min_rest + rules.report_before
+                wait(member_id, max(until, sector.departure_ts + 1))
+            if missing > 0:
+                unfilled.append((sector.flight_id, role, missing))
+    return AssignmentPlan(tuple(assignments), tuple(unfilled), time.perf_counter() - start)
+
+
+def day_sectors(conn, start, end):
+    """Live, non-cancelled flights departing in [start, end)."""
+    rows = conn.execute("""
+        SELECT flight_id, departure_airport AS origin, arrival_airport AS destination, departure_ts, arrival_ts
+        FROM flights
+        WHERE departure_ts >= ? AND departure_ts < ? AND status IS NOT 'Cancelled'
+    """, (start, end))
+    return [_sector(row) for row in rows]
+
+
+def staffed_roles(conn, start, end):
+    """flight_id -> Counter of roles already on flights departing in [start, end)."""
+    staffed = {}
+    for row in conn.execute("""
+        SELECT c.flight_id, c.role, COUNT(*) AS n
+        FROM flights f JOIN crew c ON c.flight_id = f.flight_id
+        WHERE f.departure_ts >= ? AND f.departure_ts < ?
+        GROUP BY c.flight_id, c.role
+    """, (start, end)):
+        staffed.setdefault(row["flight_id"], Counter())[row["role"]] = row["n"]
+    return staffed
+
+
+@dataclass(frozen=True)
+class CrewFilter:
+    flight_id: int = None
+    member_id: int = None
+    role: str = None
+    day: datetime.date = None       # UTC departure day
+
+    def where(self):
+        clauses, params = [], []
+        if self.flight_id is not None:
+            clauses.append("c.flight_id = ?")
+            params.append(self.flight_id)
+        if self.member_id is not None:
+            clauses.append("c.member_id = ?")
+            params.append(self.member_id)
+        if self.role:
+            clauses.append("c.role = ?")
+            params.append(self.role)
+        if self.day:
+            clauses.append("f.departure_ts >= ? AND f.departure_ts < ?")
+            params.extend(utc_day(self.day))
+        return (" AND ".join(clauses) or "1"), params
+
+
+def count_query(filters=CrewFilter()):
+    where, params = filters.where()
+    return f"""
+        SELECT COUNT(*) FROM crew c
+        JOIN flights f ON f.flight_id = c.flight_id
+        WHERE {where}
+    """, params
+
+
+def page_query(filters=CrewFilter(), after=None, limit=CREW_PAGE_SIZE):
+    """(sql, params) of one page of live assignments in departure order;
+    after is the (departure_ts, crew_id) of the last row on the previous page."""
+    where, params = filters.where()
+    if after is not None:
+        where += " AND (f.departure_ts, c.crew_id) > (?, ?)"
+        params.extend(after)
+    return f"""
+        SELECT c.crew_id, c.flight_id, c.member_id, c.crew_name, c.role, c.contact_info,
+               f.flight_number, f.departure_time, f.departure_ts
+        FROM crew c
+        JOIN flights f ON f.flight_id = c.flight_id
+        WHERE {where}
+        ORDER BY f.departure_ts, c.crew_id
+        LIMIT ?
+    """, (*params, limit)
+
+
+def count_crew(conn, filters=CrewFilter()):
+    return conn.execute(*count_query(filters)).fetchone()[0]
+
+
+def page_crew(conn, filters=CrewFilter(), after=None, limit=CREW_PAGE_SIZE):
+    return conn.execute(*page_query(filters, after, limit)).fetchall()
+
+
+def utc_day(day):
+    start = int(datetime.datetime.combine(day, datetime.time(), datetime.timezone.utc).timestamp())
+    return start, start + 86400
+
+
+# Benchmark
+
+def _percentiles(samples):
+    q = statistics.quantiles(samples, n=100, method="inclusive")
+    return f"p50 {q[49] * 1e6:.1f} µs, p99 {q[98] * 1e6:.1f} µs, max {max(samples) * 1e6:.1f} µs"
+
+
+def _naive_check(assigned, member_id, sector, rules):
+    # What a check costs without the index: every assignment of everyone
+    return [s for m, s in assigned
+            if m == member_id and s.departure_ts < sector.arrival_ts + rules.min_turn
+            and s.arrival_ts + rules.min_turn > sector.departure_ts]
+
+
+def benchmark(flights=5000, members=8000, airports=60, checks=2000, seed=7):
+    from airline.db import ConnectionPool
+    from airline.migrations import migrate
+    from airline.routing import synthetic_schedule
+    from airline.services import CrewService
+
+    rng = random.Random(seed)
+    codes, legs = synthetic_schedule(flights, airports=airports, days=1, seed=seed)
+    day = datetime.date(2030, 1, 1)
+    day_start, _ = utc_day(day)
+    roles = list(CREW_COMPLEMENT)
+    weights = [1 / (i + 1) ** 0.8 for i in range(airports)]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        pool = ConnectionPool(os.path.join(tmp, "bench.db"), max_size=2)
+        migrate(pool)
+        with pool.transaction() as conn:
+            conn.executemany("INSERT INTO airports (code, name) VALUES (?, ?)", [(c, c) for c in codes])
+            conn.executemany("""
+                INSERT INTO flights (flight_id, flight_number, departure_airport, arrival_airport, departure_time,
+                                     arrival_time, departure_ts, arrival_ts, capacity)
+                VALUES (?, ?, ?, ?, '', '', ?, ?, 180)
+            """, [(leg.flight_id, leg.flight_number, leg.origin, leg.destination,
+                   day_start + leg.departure_ts, day_start + leg.arrival_ts) for leg in legs])
+            # Roles in complement proportions, based where the traffic is
+            conn.executemany("INSERT INTO crew_members (name, role, home_base) VALUES (?, ?, ?)",
+                             [(f"Crew {i}", rng.choices(roles, [CREW_COMPLEMENT[r] for r in roles])[0],
+                               rng.choices(codes, weights)[0]) for i in range(members)])
+        service = CrewService(pool)
+        print(f"{flights} flights over {airports} airports in one day, {members} crew members")
+
+        start = time.perf_counter()
+        plan = service.auto_assign(day)
+        print(f"auto-assign: {plan.summary()}; {(time.perf_counter() - start) * 1000:.1f} ms "
+              f"including load and write")
+
+        start = time.perf_counter()
+        violations = service.conflicts(day)
+        print(f"conflict sweep: {len(violations)} violation(s) in {(time.perf_counter() - start) * 1000:.1f} ms")
+
+        with pool.connection() as conn:
+            start_ts, end_ts = utc_day(day)
+            schedule = CrewSchedule.from_db(conn, start_ts, end_ts)
+            sectors = day_sectors(conn, start_ts, end_ts)
+        member_ids = list({m for _, m, _ in plan.assignments}) or [1]
+        assigned = [(m, s) for m in member_ids for s in schedule.sectors(m)]
+        jobs = [(rng.choice(member_ids), rng.choice(sectors)) for _ in range(checks)]
+
+        samples = []
+        for member_id, sector in jobs:
+            start = time.perf_counter()
+            schedule.check(member_id, sector)
+            samples.append(time.perf_counter() - start)
+        print(f"indexed check ({len(schedule)} assignments): {_percentiles(samples)}")
+        samples = []
+        for member_id, sector in jobs[:checks // 10]:
+            start = time.perf_counter()
+            _naive_check(assigned, member_id, sector, schedule.rules)
+            samples.append(time.perf_counter() - start)
+        print(f"full-scan overlap check: {_percentiles(samples)}")
+        pool.close()
+
+
+def main(argv=None):
+    from airline.db import ConnectionPool
+    from airline.services import CrewService
+
+    parser = argparse.ArgumentParser(description="Crew scheduling: conflicts, auto-assignment and benchmark")
+    commands = parser.add_subparsers(dest="command", required=True)
+    check = commands.add_parser("check", help="list overlap, duty and rest violations")
+    assign = commands.add_parser("assign", help="staff a day's flights from the crew pool")
+    for command in (check, assign):
+        command.add_argument("database")
+        command.add_argument("--date", type=datetime.date.fromisoformat, default=None,
+                             help="UTC day (check: default every live flight)")
+    assign.add_argument("--dry-run", action="store_true")
+    bench = commands.add_parser("bench", help="benchmark on a synthetic day of flights")
+    bench.add_argument("--flights", type=int, default=5000)
+    bench.add_argument("--members", type=int, default=8000)
+    bench.add_argument("--airports", type=int, default=60)
+    bench.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args(argv)
+
+    if args.command == "bench":
+        benchmark(args.flights, args.members, args.airports, seed=args.seed)
+        return 0
+    if args.command == "assign" and args.date is None:
+        parser.error("assign needs --date")
+    pool = ConnectionPool(args.database, max_size=1)
+    try:
+        service = CrewService(pool)
+        if args.command == "assign":
+            plan = service.auto_assign(args.date, dry_run=args.dry_run)
+            print(plan.summary())
+            for flight_id, role, missing in plan.unfilled:
+                print(f"  flight {flight_id}: {missing} {role} position(s) open")
+            return 0
+        violations = service.conflicts(args.date)
+        for v in violations:
+            print(f"member {v.member_id}: {v.kind} on flight(s) {', '.join(map(str, v.flight_ids))}: {v.detail}")
+        print(f"{len(violations)} violation(s)")
+        return 1 if violations else 0
+    finally:
+        pool.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,168 @@
+# Pooled SQLite Connections
+#
+# One ConnectionPool is created per server process and shared by every
+# session thread.  Connections are opened lazily, configured once with the
+# pragmas below and then reused, so a Streamlit rerun no longer pays for
+# sqlite3.connect()/close() on every helper call.
+import queue
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+
+DEFAULT_PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "cache_size": -16000,      # KiB (negative) -> ~16 MB page cache per connection
+    "mmap_size": 134217728,    # 128 MB memory-mapped I/O
+    "busy_timeout": 5000,      # ms to wait on a locked database before failing
+    "temp_store": "MEMORY",
+    "foreign_keys": "ON",
+}
+
+
+class PoolTimeout(sqlite3.OperationalError):
+    pass
+
+
+@dataclass(frozen=True)
+class PoolMetrics:
+    checkouts: int
+    wait_time: float
+    max_wait: float
+    open_connections: int
+    idle_connections: int
+    in_use: int
+
+    @property
+    def avg_wait(self):
+        return self.wait_time / self.checkouts if self.checkouts else 0.0
+
+
+class ConnectionPool:
+    def __init__(self, database, max_size=8, timeout=10.0, pragmas=None):
+        self.database = database
+        self.max_size = max_size
+        self.timeout = timeout
+        self.pragmas = dict(DEFAULT_PRAGMAS if pragmas is None else pragmas)
+        self._idle = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._open = 0
+        self._checkouts = 0
+        self._wait_time = 0.0
+        self._max_wait = 0.0
+        self._closed = False
+
+    def _connect(self):
+        # Autocommit mode: transactions are opened explicitly by transaction()
+        conn = sqlite3.connect(
+            self.database,
+            timeout=self.timeout,
+            isolation_level=None,
+            check_same_thread=False,
+        )
+        conn.row_factory = sqlite3.Row
+        for name, value in self.pragmas.items():
+            conn.execute(f"PRAGMA {name} = {value}")
+        return conn
+
+    def _acquire(self):
+        if self._closed:
+            raise sqlite3.ProgrammingError("Connection pool is closed")
+        start = time.perf_counter()
+        try:
+            conn = self._idle.get_nowait()
+        except queue.Empty:
+            conn = None
+            with self._lock:
+                if self._open < self.max_size:
+                    self._open += 1
+                    create = True
+                else:
+                    create = False
+            if create:
+                try:
+                    conn = self._connect()
+                except Exception:
+                    with self._lock:
+                        self._open -= 1
+                    raise
+            else:
+                try:
+                    conn = self._idle.get(timeout=self.timeout)
+                except queue.Empty:
+                    raise PoolTimeout(
+                        f"No database connection available after {self.timeout}s"
+                    ) from None
+        waited = time.perf_counter() - start
+        with self._lock:
+            self._checkouts += 1
+            self._wait_time += waited
+            self._max_wait = max(self._max_wait, waited)
+        return conn
+
+    def _release(self, conn):
+        try:
+            if conn.in_transaction:
+                # A caller bailed out mid-transaction; never hand a dirty
+                # connection to the next session.
+                conn.rollback()
+        except sqlite3.Error:
+            self._discard(conn)
+            return
+        if self._closed:
+            self._discard(conn)
+        else:
+            self._idle.put(conn)
+
+    def _discard(self, conn):
+        try:
+            conn.close()
+        except sqlite3.Error:
+            pass
+        finally:
+            with self._lock:
+                self._open -= 1
+
+    @contextmanager
+    def connection(self):
+        conn = self._acquire()
+        try:
+            yield conn
+        finally:
+            self._release(conn)
+
+    @contextmanager
+    def transaction(self, immediate=False):
+        with self.connection() as conn:
+            conn.execute("BEGIN IMMEDIATE" if immediate else "BEGIN")
+            try:
+                yield conn
+            except BaseException:
+                if conn.in_transaction:
+                    conn.rollback()
+                raise
+            else:
+                if conn.in_transaction:
+                    conn.commit()
+
+    def metrics(self):
+        with self._lock:
+            return PoolMetrics(
+                checkouts=self._checkouts,
+                wait_time=self._wait_time,
+                max_wait=self._max_wait,
+                open_connections=self._open,
+                idle_connections=self._idle.qsize(),
+                in_use=self._open - self._idle.qsize(),
+            )
+
+    def close(self):
+        self._closed = True
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            self._discard(conn)
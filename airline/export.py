@@ -0,0 +1,221 @@
+# Data Export
+#
+# Bookings, per-flight passenger manifests and crew rosters as CSV, JSON
+# Lines or (when pyarrow is installed) Parquet.  Rows are pulled from the
+# cursor EXPORT_BATCH at a time and written out batch by batch, so an export
+# never holds the whole result set in memory, whether it goes to a file, to
+# stdout or to a download.
+#
+#     python -m airline.export airline.db manifest --flight 12 --format csv -o manifest.csv
+#     python -m airline.export airline.db bookings --status Confirmed --format jsonl
+#     python -m airline.export airline.db crew --format parquet -o roster.parquet
+import argparse
+import csv
+import io
+import json
+import sys
+import tempfile
+
+from airline.bookings import BookingFilter
+from airline.db import ConnectionPool
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pq = None
+
+EXPORT_BATCH = 1000
+
+FORMATS = ["csv", "jsonl"] + (["parquet"] if pq is not None else [])
+MIME_TYPES = {"csv": "text/csv", "jsonl": "application/x-ndjson", "parquet": "application/vnd.apache.parquet"}
+
+
+class ExportError(ValueError):
+    pass
+
+
+# Datasets: each returns (sql, params)
+
+def bookings_query(filters=BookingFilter()):
+    where, params = filters.where()
+    return f"""
+        SELECT b.booking_id, b.booking_date, b.status, b.seat_number, u.username, u.email,
+               f.flight_id, f.flight_number, f.departure_airport, f.arrival_airport,
+               f.departure_time, f.arrival_time
+        FROM bookings b
+        JOIN users u ON b.user_id = u.user_id
+        JOIN flights f ON b.flight_id = f.flight_id
+        WHERE {where}
+        ORDER BY b.booking_date DESC, b.booking_id DESC
+    """, params
+
+
+def manifest_query(flight_id, include_archived=False):
+    """Confirmed passengers of one flight in seat order."""
+    live = """
+        SELECT b.seat_number, u.username, u.email, b.booking_id, b.booking_date
+        FROM bookings b
+        JOIN users u ON b.user_id = u.user_id
+        WHERE b.flight_id = ? AND b.status = 'Confirmed'
+    """
+    if not include_archived:
+        return live + " ORDER BY b.seat_number", [flight_id]
+    # Compound selects sort by result column position
+    return live + " UNION ALL " + live.replace("bookings b", "bookings_history b") + \
+        " ORDER BY 1", [flight_id, flight_id]
+
+
+def roster_query(flight_id=None, include_archived=False):
+    """Crew assignments, for one flight or (flight_id None) every flight."""
+    where, params = ("WHERE c.flight_id = ?", [flight_id]) if flight_id is not None else ("", [])
+    live = f"""
+        SELECT f.flight_id, f.flight_number, f.departure_airport, f.arrival_airport, f.departure_time,
+               f.departure_ts, c.crew_name, c.role, c.contact_info
+        FROM crew c
+        JOIN flights f ON c.flight_id = f.flight_id
+        {where}
+    """
+    if not include_archived:
+        return live + " ORDER BY f.departure_ts, c.crew_id", params
+    history = live.replace("crew c", "crew_history c").replace("flights f", "flights_history f")
+    # Column 5 is local departure text; 6 is the UTC departure_ts it must sort by
+    return f"{live} UNION ALL {history} ORDER BY 6, 1", params * 2
+
+
+# Streaming
+
+def iter_batches(cursor, batch_size=EXPORT_BATCH):
+    """Yield lists of row tuples straight off the cursor."""
+    while True:
+        rows = cursor.fetchmany(batch_size)
+        if not rows:
+            break
+        yield [tuple(row) for row in rows]
+
+
+def csv_chunks(columns, batches):
+    """CSV text, one chunk per batch; the header comes first even when empty."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    for rows in batches:
+        writer.writerows(rows)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def jsonl_chunks(columns, batches):
+    for rows in batches:
+        yield "".join(json.dumps(dict(zip(columns, row)), ensure_ascii=False) + "\n" for row in rows)
+
+
+def write_parquet(columns, batches, out):
+    if pq is None:
+        raise ExportError("Parquet export needs pyarrow (pip install pyarrow)")
+    writer = None
+    try:
+        for rows in batches:
+            table = pa.Table.from_pylist([dict(zip(columns, row)) for row in rows],
+                                         schema=writer.schema if writer else None)
+            if writer is None:
+                # All-NULL columns in the first batch would pin the null type
+                schema = pa.schema([f.with_type(pa.string()) if pa.types.is_null(f.type) else f
+                                    for f in table.schema])
+                table = table.cast(schema)
+                writer = pq.ParquetWriter(out, schema)
+            writer.write_table(table)
+        if writer is None:
+            pq.write_table(pa.table({c: pa.array([], pa.string()) for c in columns}), out)
+    finally:
+        if writer is not None:
+            writer.close()
+
+
+def export(pool, query, fmt, out, batch_size=EXPORT_BATCH):
+    """Write the (sql, params) query to out: a text file for csv/jsonl, a
+    binary file or path for parquet.  Returns the number of rows written."""
+    if fmt not in ("csv", "jsonl", "parquet"):
+        raise ExportError(f"Unsupported format {fmt!r}")
+    sql, params = query
+    count = 0
+    with pool.connection() as conn:
+        cursor = conn.execute(sql, params)
+        columns = [d[0] for d in cursor.description]
+
+        def batches():
+            nonlocal count
+            for rows in iter_batches(cursor, batch_size):
+                count += len(rows)
+                yield rows
+
+        if fmt == "parquet":
+            write_parquet(columns, batches(), out)
+        else:
+            chunks = csv_chunks if fmt == "csv" else jsonl_chunks
+            for chunk in chunks(columns, batches()):
+                out.write(chunk)
+    return count
+
+
+def export_bytes(pool, query, fmt, batch_size=EXPORT_BATCH):
+    """Rendered export for a download button; spools to disk past 8 MB while
+    rendering, but the result is in memory, as st.download_button needs it,
+    so only call this once the user asked for the file."""
+    with tempfile.SpooledTemporaryFile(max_size=8 * 1024 * 1024) as f:
+        if fmt == "parquet":
+            export(pool, query, fmt, f, batch_size)
+        else:
+            text = io.TextIOWrapper(f, encoding="utf-8", newline="")
+            export(pool, query, fmt, text, batch_size)
+            text.flush()
+            text.detach()
+        f.seek(0)
+        return f.read()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export bookings, manifests and crew rosters")
+    parser.add_argument("database")
+    parser.add_argument("dataset", choices=["bookings", "manifest", "crew"])
+    parser.add_argument("--flight", type=int, help="flight id (required for manifest)")
+    parser.add_argument("--status", help="bookings only: filter by status")
+    parser.add_argument("--include-archived", action="store_true", help="manifest/crew: include history")
+    parser.add_argument("--format", choices=["csv", "jsonl", "parquet"], default="csv")
+    parser.add_argument("-o", "--output", help="output file (default: stdout; required for parquet)")
+    args = parser.parse_args(argv)
+
+    if args.dataset == "manifest":
+        if args.flight is None:
+            parser.error("manifest needs --flight")
+        query = manifest_query(args.flight, args.include_archived)
+    elif args.dataset == "crew":
+        query = roster_query(args.flight, args.include_archived)
+    else:
+        query = bookings_query(BookingFilter(flight_id=args.flight, status=args.status))
+    if args.format == "parquet" and not args.output:
+        parser.error("parquet needs --output")
+
+    pool = ConnectionPool(args.database, max_size=1)
+    try:
+        if args.format == "parquet":
+            count = export(pool, query, "parquet", args.output)
+        elif args.output:
+            with open(args.output, "w", newline="", encoding="utf-8") as out:
+                count = export(pool, query, args.format, out)
+        else:
+            count = export(pool, query, args.format, sys.stdout)
+    except ExportError as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 1
+    finally:
+        pool.close()
+    print(f"{count} row(s) exported", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
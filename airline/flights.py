@@ -0,0 +1,119 @@
+# Flight Lifecycle
+#
+# Cancelling or deleting a flight touches its bookings, crew and seat holds
+# in the same transaction, with set-based statements rather than per-row
+# loops.  Pooled connections enforce foreign keys, so a flight can only be
+# deleted once nothing references it.
+#
+# Remove rows left behind by deletes made before this existed with:
+#     python -m airline.flights purge-orphans airline.db
+import argparse
+import sys
+import time
+from dataclasses import dataclass
+
+from airline.db import ConnectionPool
+from airline.refdata import CREW, invalidate, invalidate_flights
+
+FLIGHT_STATUSES = ["Scheduled", "Delayed", "Cancelled"]
+
+
+@dataclass(frozen=True)
+class LifecycleResult:
+    action: str
+    flight_id: int
+    bookings: int
+    crew: int
+    elapsed: float
+
+    def summary(self):
+        return (f"{self.action} flight {self.flight_id}: {self.bookings} booking(s), "
+                f"{self.crew} crew assignment(s) in {self.elapsed * 1000:.1f} ms")
+
+
+def propagate_cancellation(conn, flight_id):
+    """Cancel every confirmed booking and seat hold of a cancelled flight."""
+    conn.execute("DELETE FROM seat_holds WHERE flight_id = ?", (flight_id,))
+    return conn.execute(
+        "UPDATE bookings SET status = 'Cancelled' WHERE flight_id = ? AND status = 'Confirmed'",
+        (flight_id,),
+    ).rowcount
+
+
+def cancel_flight(pool, flight_id):
+    start = time.perf_counter()
+    with pool.transaction(immediate=True) as conn:
+        conn.execute("UPDATE flights SET status = 'Cancelled' WHERE flight_id = ?", (flight_id,))
+        bookings = propagate_cancellation(conn, flight_id)
+    invalidate_flights()
+    return LifecycleResult("Cancelled", flight_id, bookings, 0, time.perf_counter() - start)
+
+
+def delete_flight(pool, flight_id):
+    """LifecycleResult of the delete, or None when the flight does not exist."""
+    start = time.perf_counter()
+    with pool.transaction(immediate=True) as conn:
+        conn.execute("DELETE FROM seat_holds WHERE flight_id = ?", (flight_id,))
+        bookings = conn.execute("DELETE FROM bookings WHERE flight_id = ?", (flight_id,)).rowcount
+        crew = conn.execute("DELETE FROM crew WHERE flight_id = ?", (flight_id,)).rowcount
+        deleted = conn.execute("DELETE FROM flights WHERE flight_id = ?", (flight_id,)).rowcount
+    invalidate_flights()
+    if not deleted:
+        return None
+    return LifecycleResult("Deleted", flight_id, bookings, crew, time.perf_counter() - start)
+
+
+# Tables whose flight_id must point at an existing flight
+FLIGHT_CHILDREN = ["bookings", "crew", "seat_holds"]
+
+
+def find_orphans(conn):
+    return {
+        table: conn.execute(f"""
+            SELECT COUNT(*) FROM {table} t
+            WHERE NOT EXISTS (SELECT 1 FROM flights f WHERE f.flight_id = t.flight_id)
+        """).fetchone()[0]
+        for table in FLIGHT_CHILDREN
+    }
+
+
+def purge_orphans(pool):
+    """Delete child rows of flights that no longer exist; return counts per table."""
+    with pool.transaction(immediate=True) as conn:
+        purged = {
+            table: conn.execute(f"""
+                DELETE FROM {table}
+                WHERE NOT EXISTS (SELECT 1 FROM flights f WHERE f.flight_id = {table}.flight_id)
+            """).rowcount
+            for table in FLIGHT_CHILDREN
+        }
+    # Flights themselves are untouched; only the crew listing can change
+    invalidate(CREW)
+    return purged
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Flight lifecycle maintenance")
+    commands = parser.add_subparsers(dest="command", required=True)
+    orphans = commands.add_parser("purge-orphans", help="delete bookings/crew/holds of missing flights")
+    orphans.add_argument("database", nargs="?", default="airline.db")
+    orphans.add_argument("--dry-run", action="store_true", help="only count orphans")
+    args = parser.parse_args(argv)
+
+    pool = ConnectionPool(args.database, max_size=1)
+    try:
+        if args.dry_run:
+            with pool.connection() as conn:
+                counts = find_orphans(conn)
+        else:
+            counts = purge_orphans(pool)
+    finally:
+        pool.close()
+    verb = "found" if args.dry_run else "purged"
+    for table, count in counts.items():
+        print(f"{table}: {count} orphan row(s) {verb}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
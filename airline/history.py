@@ -0,0 +1,152 @@
+# Booking History
+#
+# "My Bookings" and the profile counters are served from a per-user summary
+# instead of joining bookings and flights (live and archived) on every
+# rerun.  A user's bookings are folded into legs (one per flight, with every
+# seat on it) and connecting legs into trips, using the same connection
+# rules as airline.routing.  The trips are stored in display order, upcoming
+# first (soonest first) and then past (latest first), in user_trips keyed by
+# (user_id, position), so any page is one primary-key range read;
+# user_booking_stats holds the counters for the profile page.
+#
+# The summary is refreshed incrementally, one user at a time: triggers on
+# bookings and flights (migration 15) add the user's id to
+# user_history_dirty, and the next read rebuilds just that user.  Whether a
+# trip is upcoming depends on the clock, so a summary also goes stale once
+# one of its trips departs or lands (stale_after).
+import json
+from dataclasses import asdict
+
+from airline.models import BookingStats, Trip, TripLeg, from_row
+from airline.queries import USER_BOOKING_STATS, USER_TRIPS_PAGE
+from airline.routing import MAX_LAYOVER
+from airline.timeutil import now_epoch
+
+HISTORY_PAGE_SIZE = 10
+
+_LEG_COLUMNS = """
+    b.booking_id, b.seat_number, b.status, f.flight_id, f.flight_number,
+    f.departure_airport AS origin, f.arrival_airport AS destination, f.departure_time,
+    f.arrival_time, f.departure_ts, f.arrival_ts, f.status AS flight_status
+"""
+
+USER_LEGS = f"""
+    SELECT {_LEG_COLUMNS}, 0 AS archived
+    FROM bookings b JOIN flights f ON f.flight_id = b.flight_id
+    WHERE b.user_id = ?
+    UNION ALL
+    SELECT {_LEG_COLUMNS}, 1 AS archived
+    FROM bookings_history b JOIN flights_history f ON f.flight_id = b.flight_id
+    WHERE b.user_id = ?
+"""
+
+
+def _legs(rows):
+    """One TripLeg per flight, in departure order."""
+    legs = {}
+    for row in rows:
+        leg = legs.get(row["flight_id"])
+        if leg is None:
+            leg = legs[row["flight_id"]] = {
+                **{k: row[k] for k in TripLeg._field_names if k in row.keys()},
+                "seats": [], "cancelled_seats": [], "booking_ids": [],
+            }
+        leg["seats" if row["status"] == "Confirmed" else "cancelled_seats"].append(row["seat_number"])
+        leg["booking_ids"].append(row["booking_id"])
+    return sorted(
+        (TripLeg(**{**leg, "seats": tuple(sorted(leg["seats"])), "archived": bool(leg["archived"]),
+                    "cancelled_seats": tuple(sorted(leg["cancelled_seats"])),
+                    "booking_ids": tuple(leg["booking_ids"])})
+         for leg in legs.values()),
+        key=lambda leg: (leg.departure_ts, leg.flight_id),
+    )
+
+
+def _connects(trip, leg):
+    last = trip[-1]
+    return (bool(leg.seats) == bool(last.seats)
+            and leg.origin == last.destination
+            and 0 <= leg.departure_ts - last.arrival_ts <= MAX_LAYOVER
+            and leg.destination not in {l.origin for l in trip})
+
+
+def group_trips(legs, now):
+    """Trips in display order: upcoming (not yet landed) soonest first, then
+    past trips latest first."""
+    open_trips = []
+    for leg in legs:
+        trip = next((t for t in open_trips if _connects(t, leg)), None)
+        if trip is None:
+            open_trips.append([leg])
+        else:
+            trip.append(leg)
+    trips = [Trip(tuple(t), "Confirmed" if any(l.seats for l in t) else "Cancelled", t[-1].arrival_ts > now)
+             for t in open_trips]
+    upcoming = sorted((t for t in trips if t.upcoming), key=lambda t: t.departure_ts)
+    past = sorted((t for t in trips if not t.upcoming), key=lambda t: t.departure_ts, reverse=True)
+    return upcoming + past
+
+
+def refresh_user(conn, user_id, now=None):
+    """Rebuild one user's summary inside the caller's write transaction."""
+    now = now_epoch() if now is None else now
+    trips = group_trips(_legs(conn.execute(USER_LEGS, (user_id, user_id)).fetchall()), now)
+    conn.execute("DELETE FROM user_trips WHERE user_id = ?", (user_id,))
+    conn.executemany(
+        "INSERT INTO user_trips (user_id, position, departure_ts, arrival_ts, upcoming, status, legs) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?)",
+        [(user_id, position, t.departure_ts, t.arrival_ts, int(t.upcoming), t.status,
+          json.dumps([asdict(leg) for leg in t.legs], ensure_ascii=False))
+         for position, t in enumerate(trips)],
+    )
+    flown = [leg for t in trips for leg in t.legs if leg.seats]
+    upcoming = [t for t in trips if t.upcoming and t.status == "Confirmed"]
+    stats = BookingStats(
+        user_id=user_id,
+        trips=len(trips),
+        upcoming_trips=len(upcoming),
+        segments=len(flown),
+        upcoming_segments=sum(1 for leg in flown if leg.arrival_ts > now),
+        seats=sum(len(leg.seats) for leg in flown),
+        next_departure_ts=min((t.departure_ts for t in upcoming if t.departure_ts > now), default=None),
+    )
+    # The next moment a trip departs or lands changes what is upcoming
+    stale_after = min((ts for t in trips for ts in (t.departure_ts, t.arrival_ts) if ts > now), default=None)
+    conn.execute("""
+        INSERT OR REPLACE INTO user_booking_stats (
+            user_id, trips, upcoming_trips, segments, upcoming_segments, seats,
+            next_departure_ts, stale_after, refreshed_at
+        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+    """, (user_id, stats.trips, stats.upcoming_trips, stats.segments, stats.upcoming_segments,
+          stats.seats, stats.next_departure_ts, stale_after, now))
+    conn.execute("DELETE FROM user_history_dirty WHERE user_id = ?", (user_id,))
+    return stats
+
+
+def booking_stats(pool, user_id, now=None):
+    """The user's BookingStats: a single-row read unless the summary is stale."""
+    now = now_epoch() if now is None else now
+    with pool.connection() as conn:
+        row = conn.execute(USER_BOOKING_STATS, (user_id,)).fetchone()
+    if row is not None and not row["dirty"] and (row["stale_after"] is None or row["stale_after"] > now):
+        return from_row(BookingStats, row)
+    with pool.transaction(immediate=True) as conn:
+        return refresh_user(conn, user_id, now)
+
+
+def _trip(row):
+    legs = tuple(
+        TripLeg(**{**leg, "seats": tuple(leg["seats"]), "cancelled_seats": tuple(leg["cancelled_seats"]),
+                   "booking_ids": tuple(leg["booking_ids"])})
+        for leg in json.loads(row["legs"])
+    )
+    return Trip(legs, row["status"], bool(row["upcoming"]))
+
+
+def history_page(pool, user_id, page=0, page_size=HISTORY_PAGE_SIZE, now=None):
+    """(trips on page, BookingStats); stats.trips is the total to page over."""
+    stats = booking_stats(pool, user_id, now)
+    start = page * page_size
+    with pool.connection() as conn:
+        rows = conn.execute(USER_TRIPS_PAGE, (user_id, start, start + page_size)).fetchall()
+    return [_trip(row) for row in rows], stats
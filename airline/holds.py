@@ -0,0 +1,80 @@
+# Seat Holds
+#
+# A hold is a short lease on one (flight_id, seat_number) taken when a
+# passenger picks a seat, so other sessions see it as unavailable until the
+# booking is confirmed, the seat is released, or the lease runs out.
+# Expiry is lazy: readers ignore leases past expires_at and writers sweep
+# them before taking new ones.
+import time
+
+HOLD_TTL = 300  # seconds
+
+
+def purge_expired(conn, now=None):
+    now = time.time() if now is None else now
+    return conn.execute("DELETE FROM seat_holds WHERE expires_at <= ?", (now,)).rowcount
+
+
+def acquire_holds(pool, flight_id, seats, holder, ttl=HOLD_TTL):
+    """Hold (or renew) seats for holder; return (acquired, lost) tuples.
+
+    A seat is lost if it is already booked or held by another holder.
+    """
+    seats = list(dict.fromkeys(seats))
+    if not seats:
+        return (), ()
+    now = time.time()
+    acquired, lost = [], []
+    with pool.transaction(immediate=True) as conn:
+        purge_expired(conn, now)
+        placeholders = ", ".join("?" * len(seats))
+        booked = {
+            row["seat_number"]
+            for row in conn.execute(
+                f"SELECT seat_number FROM bookings WHERE flight_id = ? AND status = 'Confirmed' AND seat_number IN ({placeholders})",
+                (flight_id, *seats),
+            )
+        }
+        for seat in seats:
+            if seat in booked:
+                lost.append(seat)
+                continue
+            # Insert, or renew the lease only if we already own it
+            changed = conn.execute("""
+                INSERT INTO seat_holds (flight_id, seat_number, holder, expires_at)
+                VALUES (?, ?, ?, ?)
+                ON CONFLICT (flight_id, seat_number) DO UPDATE
+                SET expires_at = excluded.expires_at
+                WHERE seat_holds.holder = excluded.holder
+            """, (flight_id, seat, holder, now + ttl)).rowcount
+            (acquired if changed else lost).append(seat)
+    return tuple(acquired), tuple(lost)
+
+
+def release_holds(pool, holder, flight_id=None, seats=None):
+    """Drop holder's leases, optionally limited to one flight and seat list."""
+    sql = "DELETE FROM seat_holds WHERE holder = ?"
+    params = [holder]
+    if flight_id is not None:
+        sql += " AND flight_id = ?"
+        params.append(flight_id)
+    if seats is not None:
+        seats = list(seats)
+        if not seats:
+            return 0
+        sql += f" AND seat_number IN ({', '.join('?' * len(seats))})"
+        params.extend(seats)
+    with pool.transaction() as conn:
+        return conn.execute(sql, params).rowcount
+
+
+def held_seats(conn, flight_id, exclude_holder=None, now=None):
+    """Seats on flight_id under a live lease, excluding exclude_holder's own."""
+    now = time.time() if now is None else now
+    return {
+        row["seat_number"]
+        for row in conn.execute(
+            "SELECT seat_number FROM seat_holds WHERE flight_id = ? AND expires_at > ? AND holder IS NOT ?",
+            (flight_id, now, exclude_holder),
+        )
+    }
@@ -0,0 +1,292 @@
+# Bulk Schedule Import
+#
+# Streams a CSV or Parquet flight schedule into the flights table.  Rows are
+# read one chunk at a time, validated against the airports and cabin layouts
+# tables, and inserted with executemany in one transaction per chunk, so
+# memory stays flat however large the file is.  Rejected rows are counted,
+# sampled for the report and optionally written out in full to a CSV.
+#
+# Expected columns (local airport times, as on the Add Flight form):
+#     flight_number, departure_airport, arrival_airport, departure_time,
+#     arrival_time, capacity[, layout][, status]
+#
+#     python -m airline.importer airline.db schedule.csv [--rejects rejects.csv]
+#         [--format parquet] [--chunk-size 5000] [--defer-indexes]
+#
+# --defer-indexes drops the flights indexes and search trigger for the load.
+# The dropped definitions are recorded in deferred_schema in the same
+# transaction, so if the import dies halfway, restore_deferred() (run by the
+# next import and at app/API startup) recreates them.
+import argparse
+import csv
+import io
+import os
+import sys
+import time
+from dataclasses import dataclass, field
+
+from airline.db import ConnectionPool
+from airline.flights import FLIGHT_STATUSES
+from airline.refdata import invalidate_flights
+from airline.search import index_flight_sql
+from airline.seatmap import DEFAULT_LAYOUT
+from airline.timeutil import local_text, parse_local, to_epoch
+
+try:
+    import pyarrow.parquet as pq
+except ImportError:
+    pq = None
+
+CHUNK_SIZE = 5000
+REJECT_SAMPLES = 20
+SEARCH_TRIGGER = "trg_flight_search_insert"
+
+REQUIRED_COLUMNS = ("flight_number", "departure_airport", "arrival_airport",
+                    "departure_time", "arrival_time", "capacity")
+
+INSERT_FLIGHT = """
+    INSERT INTO flights (flight_number, departure_airport, arrival_airport, departure_time,
+                         arrival_time, departure_ts, arrival_ts, capacity, layout_id, status)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+
+class ImportFormatError(ValueError):
+    pass
+
+
+@dataclass(frozen=True)
+class Rejected:
+    line: int
+    reason: str
+
+
+@dataclass
+class ImportResult:
+    read: int = 0
+    inserted: int = 0
+    rejected: int = 0
+    elapsed: float = 0.0
+    samples: list = field(default_factory=list)
+
+    @property
+    def rows_per_sec(self):
+        return self.read / self.elapsed if self.elapsed else 0.0
+
+    def summary(self):
+        return (f"Read {self.read} row(s): {self.inserted} imported, {self.rejected} rejected "
+                f"in {self.elapsed:.2f} s ({self.rows_per_sec:,.0f} rows/s)")
+
+
+def detect_format(name):
+    return "parquet" if str(name).lower().endswith((".parquet", ".pq")) else "csv"
+
+
+def read_csv(source, chunk_size=CHUNK_SIZE):
+    """Yield lists of row dicts; source is a path or a binary/text file object."""
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, newline="", encoding="utf-8-sig") as f:
+            yield from read_csv(f, chunk_size)
+        return
+    if isinstance(source.read(0), bytes):
+        source = io.TextIOWrapper(source, encoding="utf-8-sig", newline="")
+    reader = csv.DictReader(source)
+    _check_columns(reader.fieldnames or ())
+    chunk = []
+    for row in reader:
+        chunk.append(row)
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def read_parquet(source, chunk_size=CHUNK_SIZE):
+    if pq is None:
+        raise ImportFormatError("Parquet import needs pyarrow (pip install pyarrow)")
+    parquet = pq.ParquetFile(source)
+    _check_columns(parquet.schema_arrow.names)
+    for batch in parquet.iter_batches(batch_size=chunk_size):
+        yield batch.to_pylist()
+
+
+READERS = {"csv": read_csv, "parquet": read_parquet}
+
+
+def _check_columns(columns):
+    missing = [c for c in REQUIRED_COLUMNS if c not in columns]
+    if missing:
+        raise ImportFormatError(f"Missing column(s): {', '.join(missing)}")
+
+
+class RowValidator:
+    """Turns raw rows into INSERT parameters using in-memory reference data."""
+
+    def __init__(self, conn):
+        self.airports = dict(conn.execute("SELECT code, tz FROM airports").fetchall())
+        self.layouts = {
+            row["code"]: (row["layout_id"], row["seat_count"])
+            for row in conn.execute("SELECT layout_id, code, seat_count FROM cabin_layouts")
+        }
+
+    def __call__(self, row):
+        """Return (params, None) for a valid row or (None, reason)."""
+        number = str(row.get("flight_number") or "").strip()
+        if not number:
+            return None, "missing flight_number"
+        dep, arr = (str(row.get(k) or "").strip().upper() for k in ("departure_airport", "arrival_airport"))
+        for code in (dep, arr):
+            if code not in self.airports:
+                return None, f"unknown airport {code!r}"
+        if dep == arr:
+            return None, "departure and arrival airport are the same"
+        try:
+            dep_local = parse_local(row["departure_time"], self.airports[dep])
+            arr_local = parse_local(row["arrival_time"], self.airports[arr])
+        except (TypeError, ValueError) as e:
+            return None, str(e)
+        dep_ts = to_epoch(dep_local, self.airports[dep])
+        arr_ts = to_epoch(arr_local, self.airports[arr])
+        if arr_ts <= dep_ts:
+            return None, "arrival is not after departure"
+        try:
+            capacity = int(row["capacity"])
+        except (TypeError, ValueError):
+            return None, f"invalid capacity {row.get('capacity')!r}"
+        if capacity <= 0:
+            return None, "capacity must be greater than 0"
+        layout_code = str(row.get("layout") or DEFAULT_LAYOUT).strip()
+        if layout_code not in self.layouts:
+            return None, f"unknown layout {layout_code!r}"
+        layout_id, seat_count = self.layouts[layout_code]
+        if capacity > seat_count:
+            return None, f"capacity {capacity} exceeds the {seat_count} seats of layout {layout_code!r}"
+        status = str(row.get("status") or "Scheduled").strip()
+        if status not in FLIGHT_STATUSES:
+            return None, f"invalid status {status!r}"
+        return (number, dep, arr, local_text(dep_local), local_text(arr_local),
+                dep_ts, arr_ts, capacity, layout_id, status), None
+
+
+def _secondary_indexes(conn, table):
+    return conn.execute(
+        "SELECT name, sql, type FROM sqlite_master WHERE type = 'index' AND tbl_name = ? AND sql IS NOT NULL",
+        (table,),
+    ).fetchall()
+
+
+def restore_deferred(pool):
+    """Recreate whatever a deferred import dropped, in one transaction, and
+    index the flights inserted meanwhile; returns the number of objects."""
+    with pool.transaction(immediate=True) as conn:
+        dropped = conn.execute("SELECT name, type, sql, last_id FROM deferred_schema").fetchall()
+        for item in dropped:
+            if conn.execute("SELECT 1 FROM sqlite_master WHERE name = ?", (item["name"],)).fetchone() is None:
+                conn.execute(item["sql"])
+            if item["name"] == SEARCH_TRIGGER:
+                conn.execute("DELETE FROM flight_search WHERE rowid > ?", (item["last_id"],))
+                conn.execute(index_flight_sql("f") + " FROM flights f WHERE f.flight_id > ?", (item["last_id"],))
+        conn.execute("DELETE FROM deferred_schema")
+    return len(dropped)
+
+
+def import_flights(pool, source, fmt=None, chunk_size=CHUNK_SIZE, reject_file=None,
+                   defer_indexes=False, progress=None):
+    """Import a schedule; returns an ImportResult.
+
+    reject_file, when given, is a text file object that receives every
+    rejected row with its line number and reason.  defer_indexes drops the
+    flights indexes for the load and rebuilds them once at the end; only use
+    it when nothing else is searching the database (it is offered by the
+    CLI only).  progress(result) is called after every chunk.
+    """
+    fmt = fmt or detect_format(getattr(source, "name", source))
+    if fmt not in READERS:
+        raise ImportFormatError(f"Unsupported format {fmt!r}")
+    result = ImportResult()
+    start = time.perf_counter()
+    writer = None
+
+    restore_deferred(pool)
+    with pool.connection() as conn:
+        validate = RowValidator(conn)
+    if defer_indexes:
+        with pool.transaction(immediate=True) as conn:
+            # B-tree indexes and the per-row search-index trigger are
+            # rebuilt once at the end instead of row by row
+            dropped = _secondary_indexes(conn, "flights") + conn.execute(
+                "SELECT name, sql, type FROM sqlite_master WHERE name = ?", (SEARCH_TRIGGER,)
+            ).fetchall()
+            last_id = conn.execute("SELECT COALESCE(MAX(flight_id), 0) FROM flights").fetchone()[0]
+            conn.executemany("INSERT INTO deferred_schema (name, type, sql, last_id) VALUES (?, ?, ?, ?)",
+                             [(item["name"], item["type"], item["sql"], last_id) for item in dropped])
+            for item in dropped:
+                conn.execute(f"DROP {item['type'].upper()} {item['name']}")
+    try:
+        line = 1  # header
+        for chunk in READERS[fmt](source, chunk_size):
+            params = []
+            for row in chunk:
+                line += 1
+                values, reason = validate(row)
+                if values is not None:
+                    params.append(values)
+                    continue
+                result.rejected += 1
+                if len(result.samples) < REJECT_SAMPLES:
+                    result.samples.append(Rejected(line, reason))
+                if reject_file is not None:
+                    if writer is None:
+                        writer = csv.writer(reject_file)
+                        writer.writerow(["line", "reason", *row.keys()])
+                    writer.writerow([line, reason, *row.values()])
+            if params:
+                with pool.transaction(immediate=True) as conn:
+                    conn.executemany(INSERT_FLIGHT, params)
+            result.read += len(chunk)
+            result.inserted += len(params)
+            result.elapsed = time.perf_counter() - start
+            if progress is not None:
+                progress(result)
+    finally:
+        if defer_indexes:
+            restore_deferred(pool)
+    if result.inserted:
+        invalidate_flights()
+    result.elapsed = time.perf_counter() - start
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Bulk import a flight schedule")
+    parser.add_argument("database")
+    parser.add_argument("source", help="CSV or Parquet file")
+    parser.add_argument("--format", choices=sorted(READERS), help="default: from the file extension")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    parser.add_argument("--rejects", help="write rejected rows with reasons to this CSV")
+    parser.add_argument("--defer-indexes", action="store_true",
+                        help="drop flights indexes during the load and rebuild them after")
+    args = parser.parse_args(argv)
+
+    pool = ConnectionPool(args.database, max_size=1)
+    rejects = open(args.rejects, "w", newline="", encoding="utf-8") if args.rejects else None
+    try:
+        result = import_flights(pool, args.source, args.format, args.chunk_size, rejects, args.defer_indexes)
+    except (ImportFormatError, OSError) as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 1
+    finally:
+        pool.close()
+        if rejects:
+            rejects.close()
+    print(result.summary())
+    for rejected in result.samples:
+        print(f"  line {rejected.line}: {rejected.reason}")
+    if result.rejected > len(result.samples):
+        print(f"  ... and {result.rejected - len(result.samples)} more")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,91 @@
+# Seat Inventory
+#
+# flights.booked_count is a denormalized count of confirmed bookings kept in
+# sync by triggers on bookings (see migration 3).  Availability is always
+# looked up for a whole result set at once so that a page listing N flights
+# costs one indexed query, not N.
+#
+# Check the counters against a full recount with:
+#     python -m airline.inventory airline.db [--fix]
+import argparse
+import sys
+from dataclasses import dataclass
+
+from airline.db import ConnectionPool
+from airline.queries import FLIGHT_AVAILABILITY
+
+# Stay well below SQLite's host-parameter limit for very large result sets
+BATCH_SIZE = 500
+
+
+@dataclass(frozen=True)
+class Availability:
+    flight_id: int
+    capacity: int
+    booked: int
+
+    @property
+    def remaining(self):
+        return max(self.capacity - self.booked, 0)
+
+
+def flight_availability(conn, flight_ids):
+    """Return {flight_id: Availability} for every existing flight in flight_ids."""
+    ids = list(dict.fromkeys(flight_ids))
+    result = {}
+    for start in range(0, len(ids), BATCH_SIZE):
+        chunk = ids[start:start + BATCH_SIZE]
+        sql = FLIGHT_AVAILABILITY.format(ids=", ".join("?" * len(chunk)))
+        for row in conn.execute(sql, chunk):
+            result[row["flight_id"]] = Availability(row["flight_id"], row["capacity"], row["booked"])
+    return result
+
+
+@dataclass(frozen=True)
+class CounterDrift:
+    flight_id: int
+    booked_count: int
+    actual: int
+
+
+def reconcile_inventory(conn, fix=False):
+    """Compare every booked_count with a recount; optionally repair drift."""
+    drift = [
+        CounterDrift(row["flight_id"], row["booked_count"], row["actual"])
+        for row in conn.execute("""
+            SELECT f.flight_id, f.booked_count, COUNT(b.booking_id) AS actual
+            FROM flights f
+            LEFT JOIN bookings b ON b.flight_id = f.flight_id AND b.status = 'Confirmed'
+            GROUP BY f.flight_id
+            HAVING f.booked_count != COUNT(b.booking_id)
+        """)
+    ]
+    if fix and drift:
+        conn.executemany(
+            "UPDATE flights SET booked_count = ? WHERE flight_id = ?",
+            [(d.actual, d.flight_id) for d in drift],
+        )
+    return drift
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Reconcile flights.booked_count with bookings")
+    parser.add_argument("database", nargs="?", default="airline.db")
+    parser.add_argument("--fix", action="store_true", help="rewrite drifted counters")
+    args = parser.parse_args(argv)
+
+    pool = ConnectionPool(args.database, max_size=1)
+    try:
+        # IMMEDIATE keeps bookings from changing between recount and repair
+        with pool.transaction(immediate=True) as conn:
+            drift = reconcile_inventory(conn, fix=args.fix)
+    finally:
+        pool.close()
+    for d in drift:
+        print(f"flight {d.flight_id}: booked_count={d.booked_count} actual={d.actual}")
+    print(f"{len(drift)} flight(s) out of sync" + (" (fixed)" if args.fix and drift else ""))
+    return 1 if drift and not args.fix else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
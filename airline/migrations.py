@@ -0,0 +1,783 @@
+# Schema Migrations
+#
+# Each migration is a numbered function that receives a connection inside an
+# open transaction.  migrate() applies every migration newer than the version
+# recorded in schema_version, one transaction per step, so a failed step
+# leaves the database at the previous version.
+#
+# Run against a database file directly with:  python -m airline.migrations airline.db
+import json
+import sys
+
+from airline.db import ConnectionPool
+
+MIGRATIONS = []
+
+
+def migration(version, description):
+    def register(func):
+        if any(v == version for v, _, _ in MIGRATIONS):
+            raise ValueError(f"Duplicate migration version {version}")
+        MIGRATIONS.append((version, description, func))
+        MIGRATIONS.sort(key=lambda m: m[0])
+        return func
+    return register
+
+
+def current_version(conn):
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS schema_version (
+            version INTEGER PRIMARY KEY,
+            description TEXT NOT NULL,
+            applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    return conn.execute("SELECT COALESCE(MAX(version), 0) FROM schema_version").fetchone()[0]
+
+
+def latest_version():
+    return MIGRATIONS[-1][0] if MIGRATIONS else 0
+
+
+def migrate(pool, target=None):
+    """Apply pending migrations and return the resulting schema version."""
+    target = latest_version() if target is None else target
+    with pool.connection() as conn:
+        # Table rebuilds (create/copy/drop/rename) must not trip foreign
+        # keys; the pragma is a no-op inside a transaction, so it is switched
+        # off around the steps and restored afterwards.
+        conn.execute("PRAGMA foreign_keys = OFF")
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            version = current_version(conn)
+            conn.commit()
+            for number, description, func in MIGRATIONS:
+                if number <= version or number > target:
+                    continue
+                # BEGIN IMMEDIATE serialises concurrent migrators; re-check
+                # inside the lock in case another process applied this step.
+                conn.execute("BEGIN IMMEDIATE")
+                try:
+                    if current_version(conn) < number:
+                        func(conn)
+                        conn.execute(
+                            "INSERT INTO schema_version (version, description) VALUES (?, ?)",
+                            (number, description),
+                        )
+                except BaseException:
+                    conn.rollback()
+                    raise
+                conn.commit()
+                version = number
+        finally:
+            conn.execute(f"PRAGMA foreign_keys = {pool.pragmas.get('foreign_keys', 'OFF')}")
+    return version
+
+
+@migration(1, "baseline schema")
+def _baseline(conn):
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS users (
+            user_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            username TEXT UNIQUE NOT NULL,
+            password TEXT NOT NULL,
+            email TEXT,
+            role TEXT CHECK(role IN ('admin', 'passenger')) NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS flights (
+            flight_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            flight_number TEXT NOT NULL,
+            departure_airport TEXT NOT NULL,
+            arrival_airport TEXT NOT NULL,
+            departure_time DATETIME NOT NULL,
+            arrival_time DATETIME NOT NULL,
+            capacity INTEGER NOT NULL,
+            status TEXT DEFAULT 'Scheduled'
+        )
+    """)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS bookings (
+            booking_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER,
+            flight_id INTEGER,
+            booking_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            seat_number TEXT,
+            status TEXT DEFAULT 'Confirmed',
+            FOREIGN KEY (user_id) REFERENCES users(user_id),
+            FOREIGN KEY (flight_id) REFERENCES flights(flight_id),
+            UNIQUE (flight_id, seat_number)
+        )
+    """)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS crew (
+            crew_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            flight_id INTEGER,
+            crew_name TEXT NOT NULL,
+            role TEXT NOT NULL,
+            contact_info TEXT,
+            FOREIGN KEY (flight_id) REFERENCES flights(flight_id)
+        )
+    """)
+
+
+@migration(2, "indexes for route search, seat counts, user bookings and crew")
+def _hot_query_indexes(conn):
+    # Route + date search: equality on both airports, range on departure_time
+    conn.execute("""
+        CREATE INDEX IF NOT EXISTS idx_flights_route_departure
+        ON flights (departure_airport, arrival_airport, departure_time)
+    """)
+    # Flight pick-lists ordered by departure
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_flights_departure ON flights (departure_time)")
+    # Covers COUNT(*) of confirmed seats per flight without touching the table
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_bookings_flight_status ON bookings (flight_id, status)")
+    # "My Bookings": seek by user, already ordered by booking_date
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_bookings_user_date ON bookings (user_id, booking_date)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_crew_flight ON crew (flight_id)")
+
+
+@migration(3, "denormalized flights.booked_count maintained by triggers")
+def _booked_count(conn):
+    conn.execute("ALTER TABLE flights ADD COLUMN booked_count INTEGER NOT NULL DEFAULT 0")
+    conn.execute("""
+        UPDATE flights SET booked_count = (
+            SELECT COUNT(*) FROM bookings b
+            WHERE b.flight_id = flights.flight_id AND b.status = 'Confirmed'
+        )
+    """)
+    _create_booked_count_triggers(conn)
+
+
+def _create_booked_count_triggers(conn):
+    # Triggers run inside the writing statement's transaction, so every
+    # write path (app pages, bulk jobs, manual SQL) keeps the counter exact.
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_bookings_count_insert
+        AFTER INSERT ON bookings WHEN NEW.status = 'Confirmed'
+        BEGIN
+            UPDATE flights SET booked_count = booked_count + 1 WHERE flight_id = NEW.flight_id;
+        END
+    """)
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_bookings_count_delete
+        AFTER DELETE ON bookings WHEN OLD.status = 'Confirmed'
+        BEGIN
+            UPDATE flights SET booked_count = booked_count - 1 WHERE flight_id = OLD.flight_id;
+        END
+    """)
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_bookings_count_update
+        AFTER UPDATE OF status, flight_id ON bookings
+        BEGIN
+            UPDATE flights SET booked_count = booked_count - 1
+            WHERE flight_id = OLD.flight_id AND OLD.status = 'Confirmed';
+            UPDATE flights SET booked_count = booked_count + 1
+            WHERE flight_id = NEW.flight_id AND NEW.status = 'Confirmed';
+        END
+    """)
+
+
+@migration(4, "seat_holds lease table")
+def _seat_holds(conn):
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS seat_holds (
+            flight_id INTEGER NOT NULL,
+            seat_number TEXT NOT NULL,
+            holder TEXT NOT NULL,
+            expires_at REAL NOT NULL,
+            PRIMARY KEY (flight_id, seat_number),
+            FOREIGN KEY (flight_id) REFERENCES flights(flight_id)
+        ) WITHOUT ROWID
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_seat_holds_expires ON seat_holds (expires_at)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_seat_holds_holder ON seat_holds (holder)")
+
+
+@migration(5, "aircraft_types, cabin_layouts and flights.layout_id")
+def _cabin_layouts(conn):
+    from airline.seatmap import DEFAULT_LAYOUT, build_layout, load_layout_specs
+
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS aircraft_types (
+            aircraft_type_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            code TEXT UNIQUE NOT NULL,
+            name TEXT NOT NULL
+        )
+    """)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS cabin_layouts (
+            layout_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            aircraft_type_id INTEGER NOT NULL,
+            code TEXT UNIQUE NOT NULL,
+            name TEXT NOT NULL,
+            spec TEXT NOT NULL,
+            seat_count INTEGER NOT NULL,
+            FOREIGN KEY (aircraft_type_id) REFERENCES aircraft_types(aircraft_type_id)
+        )
+    """)
+    conn.execute("ALTER TABLE flights ADD COLUMN layout_id INTEGER REFERENCES cabin_layouts(layout_id)")
+
+    for code, spec in load_layout_specs().items():
+        conn.execute(
+            "INSERT OR IGNORE INTO aircraft_types (code, name) VALUES (?, ?)",
+            (spec["aircraft"], spec["aircraft_name"]),
+        )
+        conn.execute("""
+            INSERT OR IGNORE INTO cabin_layouts (aircraft_type_id, code, name, spec, seat_count)
+            SELECT aircraft_type_id, ?, ?, ?, ? FROM aircraft_types WHERE code = ?
+        """, (code, spec["name"], json.dumps({"cabins": spec["cabins"]}),
+              build_layout(code, spec).seat_count, spec["aircraft"]))
+
+    # Every existing flight was sold against the hard-coded standard map
+    conn.execute("""
+        UPDATE flights SET layout_id = (SELECT layout_id FROM cabin_layouts WHERE code = ?)
+        WHERE layout_id IS NULL
+    """, (DEFAULT_LAYOUT,))
+
+
+@migration(6, "indexes for keyset-paginated booking administration")
+def _booking_admin_indexes(conn):
+    # Each index ends in booking_date (booking_id is the implicit rowid
+    # suffix), so every filter combination can seek and read in page order.
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_bookings_date ON bookings (booking_date)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_bookings_flight_date ON bookings (flight_id, booking_date)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_bookings_status_date ON bookings (status, booking_date)")
+
+
+@migration(7, "seat uniqueness only among confirmed bookings")
+def _confirmed_seat_uniqueness(conn):
+    # The table-level UNIQUE (flight_id, seat_number) kept cancelled bookings
+    # holding their seat forever.  SQLite cannot drop a table constraint, so
+    # rebuild bookings and enforce uniqueness with a partial index instead.
+    conn.execute("""
+        CREATE TABLE bookings_new (
+            booking_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER,
+            flight_id INTEGER,
+            booking_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            seat_number TEXT,
+            status TEXT DEFAULT 'Confirmed',
+            FOREIGN KEY (user_id) REFERENCES users(user_id),
+            FOREIGN KEY (flight_id) REFERENCES flights(flight_id)
+        )
+    """)
+    conn.execute("""
+        INSERT INTO bookings_new (booking_id, user_id, flight_id, booking_date, seat_number, status)
+        SELECT booking_id, user_id, flight_id, booking_date, seat_number, status FROM bookings
+    """)
+    conn.execute("DROP TABLE bookings")
+    conn.execute("ALTER TABLE bookings_new RENAME TO bookings")
+
+    conn.execute("""
+        CREATE UNIQUE INDEX idx_bookings_confirmed_seat
+        ON bookings (flight_id, seat_number) WHERE status = 'Confirmed'
+    """)
+    conn.execute("CREATE INDEX idx_bookings_flight_status ON bookings (flight_id, status)")
+    conn.execute("CREATE INDEX idx_bookings_user_date ON bookings (user_id, booking_date)")
+    conn.execute("CREATE INDEX idx_bookings_date ON bookings (booking_date)")
+    conn.execute("CREATE INDEX idx_bookings_flight_date ON bookings (flight_id, booking_date)")
+    conn.execute("CREATE INDEX idx_bookings_status_date ON bookings (status, booking_date)")
+    _create_booked_count_triggers(conn)
+
+
+@migration(8, "history tables for archived flights, bookings and crew")
+def _history_tables(conn):
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS flights_history (
+            flight_id INTEGER PRIMARY KEY,
+            flight_number TEXT NOT NULL,
+            departure_airport TEXT NOT NULL,
+            arrival_airport TEXT NOT NULL,
+            departure_time DATETIME NOT NULL,
+            arrival_time DATETIME NOT NULL,
+            capacity INTEGER NOT NULL,
+            status TEXT,
+            booked_count INTEGER NOT NULL DEFAULT 0,
+            layout_id INTEGER,
+            archived_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS bookings_history (
+            booking_id INTEGER PRIMARY KEY,
+            user_id INTEGER,
+            flight_id INTEGER,
+            booking_date TIMESTAMP,
+            seat_number TEXT,
+            status TEXT
+        )
+    """)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS crew_history (
+            crew_id INTEGER PRIMARY KEY,
+            flight_id INTEGER,
+            crew_name TEXT NOT NULL,
+            role TEXT NOT NULL,
+            contact_info TEXT
+        )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_flights_history_departure ON flights_history (departure_time)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_bookings_history_user_date ON bookings_history (user_id, booking_date)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_bookings_history_flight ON bookings_history (flight_id)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_crew_history_flight ON crew_history (flight_id)")
+    # Archiving selects departed flights by arrival time
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_flights_arrival ON flights (arrival_time)")
+
+
+@migration(9, "airports table and UTC epoch departure_ts/arrival_ts on flights")
+def _typed_flight_times(conn):
+    from airline.airports import load_airport_seeds
+    from airline.timeutil import local_text, parse_local, to_epoch
+
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS airports (
+            code TEXT PRIMARY KEY,
+            name TEXT NOT NULL,
+            city TEXT,
+            country TEXT,
+            tz TEXT NOT NULL DEFAULT 'UTC'
+        )
+    """)
+    conn.executemany(
+        "INSERT OR IGNORE INTO airports (code, name, city, country, tz) VALUES (:code, :name, :city, :country, :tz)",
+        load_airport_seeds(),
+    )
+
+    # Airports used to be free text ("Barisal Airport", "..., Kolkata"); map
+    # each distinct value onto a code by code, name or "name, city", and keep
+    # anything unrecognised as its own UTC airport rather than losing it.
+    lookup = {}
+    for code, name, city, tz in conn.execute("SELECT code, name, city, tz FROM airports"):
+        for key in (code, name, f"{name}, {city}" if city else None):
+            if key:
+                lookup[key.strip().lower()] = (code, tz)
+    texts = {
+        row[0] for table in ("flights", "flights_history") for column in ("departure_airport", "arrival_airport")
+        for row in conn.execute(f"SELECT DISTINCT {column} FROM {table}")
+    }
+    for text in texts:
+        key = text.strip().lower()
+        if key not in lookup:
+            conn.execute("INSERT OR IGNORE INTO airports (code, name) VALUES (?, ?)", (text, text))
+            lookup[key] = (text, "UTC")
+
+    for table in ("flights", "flights_history"):
+        conn.execute(f"ALTER TABLE {table} ADD COLUMN departure_ts INTEGER")
+        conn.execute(f"ALTER TABLE {table} ADD COLUMN arrival_ts INTEGER")
+        rows = conn.execute(
+            f"SELECT flight_id, departure_airport, arrival_airport, departure_time, arrival_time FROM {table}"
+        ).fetchall()
+        updates = []
+        for flight_id, dep_airport, arr_airport, dep_text, arr_text in rows:
+            dep_code, dep_tz = lookup[dep_airport.strip().lower()]
+            arr_code, arr_tz = lookup[arr_airport.strip().lower()]
+            dep_local, arr_local = parse_local(dep_text, dep_tz), parse_local(arr_text, arr_tz)
+            updates.append((
+                dep_code, arr_code, local_text(dep_local), local_text(arr_local),
+                to_epoch(dep_local, dep_tz), to_epoch(arr_local, arr_tz), flight_id,
+            ))
+        conn.executemany(f"""
+            UPDATE {table} SET departure_airport = ?, arrival_airport = ?,
+                departure_time = ?, arrival_time = ?, departure_ts = ?, arrival_ts = ?
+            WHERE flight_id = ?
+        """, updates)
+
+    # Range filters and sorting move from the text columns to the epochs
+    for name in ("idx_flights_route_departure", "idx_flights_departure", "idx_flights_arrival",
+                 "idx_flights_history_departure"):
+        conn.execute(f"DROP INDEX IF EXISTS {name}")
+    conn.execute("""
+        CREATE INDEX IF NOT EXISTS idx_flights_route_departure
+        ON flights (departure_airport, arrival_airport, departure_ts)
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_flights_departure ON flights (departure_ts)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_flights_arrival ON flights (arrival_ts)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_flights_history_departure ON flights_history (departure_ts)")
+
+
+@migration(10, "FTS5 search indexes over airports and flights")
+def _search_indexes(conn):
+    from airline.search import index_flight_sql
+
+    # Prefix indexes keep search-as-you-type lookups ("dh", "dha") off the
+    # full token list
+    conn.execute("""
+        CREATE VIRTUAL TABLE IF NOT EXISTS airport_search USING fts5(
+            code, name, city, country,
+            tokenize = 'unicode61 remove_diacritics 2', prefix = '1 2 3'
+        )
+    """)
+    conn.execute("""
+        CREATE VIRTUAL TABLE IF NOT EXISTS flight_search USING fts5(
+            flight_number, departure, arrival,
+            tokenize = 'unicode61 remove_diacritics 2', prefix = '1 2 3'
+        )
+    """)
+    conn.execute("INSERT INTO airport_search (code, name, city, country) "
+                 "SELECT code, name, COALESCE(city, ''), COALESCE(country, '') FROM airports")
+    conn.execute(index_flight_sql("f") + " FROM flights f")
+
+    # Airports change rarely, so their index rows are found by code
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_airport_search_insert AFTER INSERT ON airports
+        BEGIN
+            INSERT INTO airport_search (code, name, city, country)
+            VALUES (new.code, new.name, COALESCE(new.city, ''), COALESCE(new.country, ''));
+        END
+    """)
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_airport_search_delete AFTER DELETE ON airports
+        BEGIN
+            DELETE FROM airport_search WHERE code = old.code;
+        END
+    """)
+    conn.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_airport_search_update AFTER UPDATE ON airports
+        BEGIN
+            DELETE FROM airport_search WHERE code = old.code;
+            INSERT INTO airport_search (code, name, city, country)
+            VALUES (new.code, new.name, COALESCE(new.city, ''), COALESCE(new.country, ''));
+            DELETE FROM flight_search WHERE rowid IN (
+                SELECT flight_id FROM flights WHERE departure_airport = new.code OR arrival_airport = new.code
+            );
+            {index_flight_sql("f")} FROM flights f
+            WHERE f.departure_airport = new.code OR f.arrival_airport = new.code;
+        END
+    """)
+
+    conn.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_flight_search_insert AFTER INSERT ON flights
+        BEGIN
+            {index_flight_sql("new")};
+        END
+    """)
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_flight_search_delete AFTER DELETE ON flights
+        BEGIN
+            DELETE FROM flight_search WHERE rowid = old.flight_id;
+        END
+    """)
+    conn.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_flight_search_update
+        AFTER UPDATE OF flight_id, flight_number, departure_airport, arrival_airport ON flights
+        BEGIN
+            DELETE FROM flight_search WHERE rowid = old.flight_id;
+            {index_flight_sql("new")};
+        END
+    """)
+
+
+@migration(11, "FTS5 search index over archived flights")
+def _archived_flight_search(conn):
+    from airline.search import index_flight_sql
+
+    # Admin pick-lists search archived flights too; archiving inserts into
+    # flights_history, so indexing follows the same trigger pattern as
+    # flight_search
+    conn.execute("""
+        CREATE VIRTUAL TABLE IF NOT EXISTS archived_flight_search USING fts5(
+            flight_number, departure, arrival,
+            tokenize = 'unicode61 remove_diacritics 2', prefix = '1 2 3'
+        )
+    """)
+    conn.execute(index_flight_sql("f", "archived_flight_search") + " FROM flights_history f")
+    conn.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_archived_flight_search_insert AFTER INSERT ON flights_history
+        BEGIN
+            {index_flight_sql("new", "archived_flight_search")};
+        END
+    """)
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_archived_flight_search_delete AFTER DELETE ON flights_history
+        BEGIN
+            DELETE FROM archived_flight_search WHERE rowid = old.flight_id;
+        END
+    """)
+    conn.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_airport_archived_search_update AFTER UPDATE ON airports
+        BEGIN
+            DELETE FROM archived_flight_search WHERE rowid IN (
+                SELECT flight_id FROM flights_history WHERE departure_airport = new.code OR arrival_airport = new.code
+            );
+            {index_flight_sql("f", "archived_flight_search")} FROM flights_history f
+            WHERE f.departure_airport = new.code OR f.arrival_airport = new.code;
+        END
+    """)
+
+
+@migration(12, "flight_changes log of flight writes for the in-memory route graph")
+def _flight_changes(conn):
+    # One row per flight holding the sequence number of its latest change,
+    # so the table stays as small as the schedule and a reader catches up
+    # with one range read on seq.  Sequence numbers come from the seq index
+    # and only grow: rows are updated, never deleted.
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS flight_changes (
+            flight_id INTEGER PRIMARY KEY,
+            seq INTEGER NOT NULL
+        )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_flight_changes_seq ON flight_changes (seq)")
+
+    def log(row):
+        return f"""
+            INSERT INTO flight_changes (flight_id, seq)
+            VALUES ({row}.flight_id, (SELECT COALESCE(MAX(seq), 0) + 1 FROM flight_changes))
+            ON CONFLICT (flight_id) DO UPDATE SET seq = excluded.seq;
+        """
+
+    conn.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_flight_changes_insert AFTER INSERT ON flights
+        BEGIN
+            {log("NEW")}
+        END
+    """)
+    conn.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_flight_changes_delete AFTER DELETE ON flights
+        BEGIN
+            {log("OLD")}
+        END
+    """)
+    # Counter updates (booked_count) do not change the graph
+    conn.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_flight_changes_update
+        AFTER UPDATE OF flight_id, flight_number, departure_airport, arrival_airport, departure_time,
+                        departure_ts, arrival_ts, status ON flights
+        BEGIN
+            {log("OLD")}
+            {log("NEW")}
+        END
+    """)
+
+
+@migration(13, "deferred_schema record of what a deferred import dropped")
+def _deferred_schema(conn):
+    # Written in the same transaction as the drops, so whatever interrupts a
+    # deferred import, airline.importer.restore_deferred() can put the
+    # indexes and trigger back (the import does so itself, startup too)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS deferred_schema (
+            name TEXT PRIMARY KEY,
+            type TEXT NOT NULL,
+            sql TEXT NOT NULL,
+            last_id INTEGER NOT NULL
+        )
+    """)
+
+
+@migration(14, "sessions shared by every process")
+def _sessions(conn):
+    # Login sessions were a per-process dict, so a token issued by one API
+    # worker was unknown to the next; only token digests are stored
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS sessions (
+            token_hash BLOB PRIMARY KEY,
+            user_id INTEGER NOT NULL REFERENCES users(user_id) ON DELETE CASCADE,
+            expires_at REAL NOT NULL
+        ) WITHOUT ROWID
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_sessions_user ON sessions(user_id)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_sessions_expires ON sessions(expires_at)")
+
+
+@migration(15, "materialized per-user trip history and booking stats")
+def _booking_history(conn):
+    # Rebuilt one user at a time by airline.history; the rows hold each
+    # trip's legs so a history page is one primary-key range read
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS user_trips (
+            user_id INTEGER NOT NULL,
+            position INTEGER NOT NULL,
+            departure_ts INTEGER NOT NULL,
+            arrival_ts INTEGER NOT NULL,
+            upcoming INTEGER NOT NULL,
+            status TEXT NOT NULL,
+            legs TEXT NOT NULL,
+            PRIMARY KEY (user_id, position)
+        ) WITHOUT ROWID
+    """)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS user_booking_stats (
+            user_id INTEGER PRIMARY KEY,
+            trips INTEGER NOT NULL,
+            upcoming_trips INTEGER NOT NULL,
+            segments INTEGER NOT NULL,
+            upcoming_segments INTEGER NOT NULL,
+            seats INTEGER NOT NULL,
+            next_departure_ts INTEGER,
+            stale_after INTEGER,
+            refreshed_at INTEGER NOT NULL
+        )
+    """)
+    # Users whose summary no longer matches their bookings.  Triggers only
+    # record the user id, so every write path stays cheap and the rebuild
+    # happens once, on the next read.
+    conn.execute("CREATE TABLE IF NOT EXISTS user_history_dirty (user_id INTEGER PRIMARY KEY)")
+    conn.execute("INSERT OR IGNORE INTO user_history_dirty SELECT user_id FROM users")
+    for table in ("bookings", "bookings_history"):
+        conn.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS trg_{table}_dirty_insert AFTER INSERT ON {table}
+            WHEN NEW.user_id IS NOT NULL
+            BEGIN
+                INSERT OR IGNORE INTO user_history_dirty VALUES (NEW.user_id);
+            END
+        """)
+        conn.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS trg_{table}_dirty_update AFTER UPDATE ON {table}
+            BEGIN
+                INSERT OR IGNORE INTO user_history_dirty
+                SELECT user_id FROM (SELECT OLD.user_id AS user_id UNION SELECT NEW.user_id)
+                WHERE user_id IS NOT NULL;
+            END
+        """)
+        conn.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS trg_{table}_dirty_delete AFTER DELETE ON {table}
+            WHEN OLD.user_id IS NOT NULL
+            BEGIN
+                INSERT OR IGNORE INTO user_history_dirty VALUES (OLD.user_id);
+            END
+        """)
+    # Rescheduled, renumbered or cancelled flights change their passengers' legs
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_flights_dirty_update
+        AFTER UPDATE OF flight_number, departure_airport, arrival_airport, departure_ts, arrival_ts, status
+        ON flights
+        BEGIN
+            INSERT OR IGNORE INTO user_history_dirty
+            SELECT DISTINCT user_id FROM bookings WHERE flight_id = NEW.flight_id AND user_id IS NOT NULL;
+        END
+    """)
+
+
+@migration(16, "crew_members master table; crew rows become assignments of a member")
+def _crew_members(conn):
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS crew_members (
+            member_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL,
+            role TEXT NOT NULL,
+            contact_info TEXT,
+            home_base TEXT REFERENCES airports(code),
+            active INTEGER NOT NULL DEFAULT 1,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    for table in ("crew", "crew_history"):
+        conn.execute(f"ALTER TABLE {table} ADD COLUMN member_id INTEGER REFERENCES crew_members(member_id)")
+
+    # Free-text rows name the same person once per flight; one member per
+    # (name, contact), in the role of their latest assignment
+    conn.execute("""
+        INSERT INTO crew_members (name, role, contact_info)
+        SELECT crew_name, role, contact_info FROM (
+            SELECT crew_name, role, contact_info, MAX(crew_id) AS latest
+            FROM (SELECT crew_id, crew_name, role, contact_info FROM crew
+                  UNION ALL SELECT crew_id, crew_name, role, contact_info FROM crew_history)
+            GROUP BY crew_name, COALESCE(contact_info, '')
+        )
+        ORDER BY latest
+    """)
+    for table in ("crew", "crew_history"):
+        conn.execute(f"""
+            UPDATE {table} SET member_id = (
+                SELECT member_id FROM crew_members m
+                WHERE m.name = {table}.crew_name AND m.contact_info IS {table}.contact_info
+            )
+        """)
+    # A member's assignments in time order are read by the scheduler
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_crew_member ON crew (member_id, flight_id)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_crew_history_member ON crew_history (member_id)")
+
+    # crew keeps the name and contact it is listed and exported with; renaming
+    # a member updates their live assignments, history keeps what was flown
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_crew_members_sync
+        AFTER UPDATE OF name, contact_info ON crew_members
+        BEGIN
+            UPDATE crew SET crew_name = NEW.name, contact_info = NEW.contact_info
+            WHERE member_id = NEW.member_id;
+        END
+    """)
+
+
+@migration(17, "booking_curve rollup of bookings per flight and days before departure")
+def _booking_curve(conn):
+    from airline.analytics import days_before_sql, rebuild_booking_curve
+
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS booking_curve (
+            flight_id INTEGER NOT NULL,
+            days_before INTEGER NOT NULL,
+            bookings INTEGER NOT NULL DEFAULT 0,
+            cancellations INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (flight_id, days_before)
+        ) WITHOUT ROWID
+    """)
+    rebuild_booking_curve(conn)
+
+    # The rollup covers live and archived bookings alike: archiving inserts
+    # into bookings_history (+1) before deleting from bookings (-1), both
+    # against the same departure, so moved bookings net out.
+    def add(flights, row, sign):
+        return f"""
+            INSERT INTO booking_curve (flight_id, days_before, bookings, cancellations)
+            SELECT {row}.flight_id, {days_before_sql("f", row)}, {sign}, {sign} * ({row}.status = 'Cancelled')
+            FROM {flights} f WHERE f.flight_id = {row}.flight_id AND {row}.booking_date IS NOT NULL
+            ON CONFLICT (flight_id, days_before) DO UPDATE SET
+                bookings = bookings + excluded.bookings,
+                cancellations = cancellations + excluded.cancellations;
+        """
+
+    for table, flights in (("bookings", "flights"), ("bookings_history", "flights_history")):
+        conn.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS trg_{table}_curve_insert AFTER INSERT ON {table}
+            BEGIN
+                {add(flights, "NEW", 1)}
+            END
+        """)
+        conn.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS trg_{table}_curve_delete AFTER DELETE ON {table}
+            BEGIN
+                {add(flights, "OLD", -1)}
+            END
+        """)
+    conn.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_bookings_curve_update
+        AFTER UPDATE OF flight_id, booking_date, status ON bookings
+        BEGIN
+            {add("flights", "OLD", -1)}
+            {add("flights", "NEW", 1)}
+        END
+    """)
+    # A rescheduled flight moves all of its bookings to other buckets
+    conn.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_flights_curve_reschedule
+        AFTER UPDATE OF departure_ts ON flights
+        BEGIN
+            DELETE FROM booking_curve WHERE flight_id = NEW.flight_id;
+            INSERT INTO booking_curve (flight_id, days_before, bookings, cancellations)
+            SELECT b.flight_id, {days_before_sql("NEW", "b")}, COUNT(*), SUM(b.status = 'Cancelled')
+            FROM bookings b WHERE b.flight_id = NEW.flight_id AND b.booking_date IS NOT NULL
+            GROUP BY 1, 2;
+        END
+    """)
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    database = argv[0] if argv else "airline.db"
+    pool = ConnectionPool(database, max_size=1)
+    try:
+        with pool.connection() as conn:
+            before = current_version(conn)
+        after = migrate(pool)
+    finally:
+        pool.close()
+    print(f"{database}: schema version {before} -> {after}")
+
+
+if __name__ == "__main__":
+    main()
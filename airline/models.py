@@ -0,0 +1,195 @@
+# Domain Models
+#
+# Plain value objects returned by airline.services instead of sqlite3.Row,
+# so callers (the Streamlit pages, the HTTP API, scripts) never depend on
+# column order or on a live cursor.  slots=True keeps them small and fast to
+# build when a listing materializes thousands of them.
+from dataclasses import asdict, dataclass, fields
+
+
+def from_row(cls, row):
+    """Build cls from a row (or mapping), ignoring columns it does not model."""
+    names = cls._field_names
+    return cls(**{key: row[key] for key in row.keys() if key in names})
+
+
+def to_dict(obj):
+    """Plain dict of a model, for JSON responses."""
+    return asdict(obj)
+
+
+def _with_field_names(cls):
+    cls._field_names = frozenset(f.name for f in fields(cls))
+    return cls
+
+
+@_with_field_names
+@dataclass(frozen=True, slots=True)
+class User:
+    user_id: int
+    username: str
+    email: str = None
+    role: str = None
+    created_at: str = None
+
+
+@_with_field_names
+@dataclass(frozen=True, slots=True)
+class Airport:
+    code: str
+    name: str
+    city: str = None
+    country: str = None
+    tz: str = "UTC"
+
+    @property
+    def label(self):
+        return f"{self.code} - {self.name} ({self.city})" if self.city else self.code
+
+
+@_with_field_names
+@dataclass(frozen=True, slots=True)
+class CabinLayout:
+    layout_id: int
+    code: str
+    name: str
+    seat_count: int
+    aircraft_code: str = None
+    aircraft_name: str = None
+
+    @property
+    def label(self):
+        return f"{self.aircraft_name} - {self.name} ({self.seat_count} seats)"
+
+
+@_with_field_names
+@dataclass(frozen=True, slots=True)
+class Flight:
+    flight_id: int
+    flight_number: str
+    departure_airport: str
+    arrival_airport: str
+    departure_time: str = None    # local wall-clock time at the departure airport
+    arrival_time: str = None      # local wall-clock time at the arrival airport
+    departure_ts: int = None      # UTC epoch seconds
+    arrival_ts: int = None
+    capacity: int = None
+    status: str = None
+    booked_count: int = None
+    layout_id: int = None
+    archived: bool = False
+
+    @property
+    def remaining(self):
+        return max(self.capacity - self.booked_count, 0)
+
+    @property
+    def label(self):
+        return (f"{self.flight_id} - {self.flight_number} "
+                f"({self.departure_airport}→{self.arrival_airport} @ {self.departure_time})")
+
+
+@_with_field_names
+@dataclass(frozen=True, slots=True)
+class Booking:
+    booking_id: int
+    flight_id: int = None
+    user_id: int = None
+    username: str = None
+    flight_number: str = None
+    departure_airport: str = None
+    arrival_airport: str = None
+    departure_time: str = None
+    seat_number: str = None
+    status: str = None
+    booking_date: str = None
+
+    @property
+    def cursor(self):
+        """Keyset position to pass as after= for the next page."""
+        return self.booking_date, self.booking_id
+
+
+@_with_field_names
+@dataclass(frozen=True, slots=True)
+class CrewAssignment:
+    crew_id: int = None
+    flight_id: int = None
+    member_id: int = None
+    crew_name: str = None
+    role: str = None
+    contact_info: str = None
+    flight_number: str = None
+    departure_time: str = None
+    departure_ts: int = None
+
+    @property
+    def cursor(self):
+        """Keyset position to pass as after= for the next page."""
+        return self.departure_ts, self.crew_id
+
+
+@_with_field_names
+@dataclass(frozen=True, slots=True)
+class CrewMember:
+    member_id: int
+    name: str
+    role: str
+    contact_info: str = None
+    home_base: str = None         # airport code; None means based anywhere
+    active: bool = True
+
+    @property
+    def label(self):
+        base = f", {self.home_base}" if self.home_base else ""
+        return f"{self.name} - {self.role}{base}"
+
+
+@_with_field_names
+@dataclass(frozen=True, slots=True)
+class TripLeg:
+    flight_id: int
+    flight_number: str
+    origin: str
+    destination: str
+    departure_time: str
+    arrival_time: str
+    departure_ts: int
+    arrival_ts: int
+    flight_status: str = None
+    seats: tuple = ()              # confirmed seat labels
+    cancelled_seats: tuple = ()
+    booking_ids: tuple = ()
+    archived: bool = False
+
+
+@dataclass(frozen=True, slots=True)
+class Trip:
+    """Connecting legs a passenger flies in one go (see airline.history)."""
+    legs: tuple
+    status: str
+    upcoming: bool
+
+    @property
+    def departure_ts(self):
+        return self.legs[0].departure_ts
+
+    @property
+    def arrival_ts(self):
+        return self.legs[-1].arrival_ts
+
+    @property
+    def route(self):
+        return " → ".join([self.legs[0].origin] + [leg.destination for leg in self.legs])
+
+
+@_with_field_names
+@dataclass(frozen=True, slots=True)
+class BookingStats:
+    user_id: int
+    trips: int = 0                # every trip on record, cancelled ones included
+    upcoming_trips: int = 0
+    segments: int = 0             # flights with at least one confirmed seat
+    upcoming_segments: int = 0
+    seats: int = 0
+    next_departure_ts: int = None
@@ -0,0 +1,147 @@
+# Hot Queries
+#
+# SQL for the lookups that run on every search/booking rerun.  Each one must
+# be answerable from an index; airline.queryplan checks that with
+# EXPLAIN QUERY PLAN.  Keep filters sargable: compare bare columns against
+# parameters instead of wrapping them in functions such as DATE().  Time
+# ranges compare the UTC epoch columns (departure_ts / arrival_ts).
+import datetime
+
+from airline.airports import airport_tz
+from airline.analytics import BOOKING_CURVE, DAY_STATS, FLIGHT_LOAD, ROUTE_STATS
+from airline.auth import SESSION_USER
+from airline.bookings import BookingFilter, count_query, page_query
+from airline.crew import (MEMBER_SCHEDULE_SQL, SCHEDULE_SQL, CrewFilter, count_query as crew_count_query,
+                          page_query as crew_page_query)
+from airline.routing import FLIGHT_CHANGES, LAST_CHANGE
+from airline.timeutil import local_day_range
+
+FIND_FLIGHTS = """
+    SELECT * FROM flights
+    WHERE departure_airport = ?
+    AND arrival_airport = ?
+    AND departure_ts >= ?
+    AND departure_ts < ?
+    ORDER BY departure_ts
+"""
+
+# Capacity and confirmed seat counts for a batch of flights; {ids} is filled
+# with one placeholder per flight id.  booked_count is kept in step with
+# bookings by triggers (migration 3), so this is a primary-key lookup.
+FLIGHT_AVAILABILITY = """
+    SELECT flight_id, capacity, booked_count AS booked
+    FROM flights
+    WHERE flight_id IN ({ids})
+"""
+
+# Seats taken on a flight; cancelled bookings give their seat back
+FLIGHT_SEATS = "SELECT seat_number FROM bookings WHERE flight_id = ? AND status = 'Confirmed'"
+
+USER_BOOKINGS = """
+    SELECT b.booking_id, f.flight_number, f.departure_airport, f.arrival_airport,
+           f.departure_time, b.seat_number, b.booking_date, b.status
+    FROM bookings b
+    JOIN flights f ON b.flight_id = f.flight_id
+    WHERE b.user_id = ?
+    ORDER BY b.booking_date DESC
+"""
+
+FLIGHT_CREW = "SELECT crew_id, flight_id, member_id, crew_name, role, contact_info FROM crew WHERE flight_id = ?"
+
+# Login lookup by name through the UNIQUE(username) index; the password is
+# checked in Python against the stored hash (airline.auth)
+USER_LOGIN = "SELECT user_id, username, email, role, created_at, password FROM users WHERE username = ?"
+
+# Booking history (airline.history): counters and one page of trips straight
+# from the per-user summary tables
+USER_BOOKING_STATS = """
+    SELECT s.*, EXISTS (SELECT 1 FROM user_history_dirty d WHERE d.user_id = s.user_id) AS dirty
+    FROM user_booking_stats s
+    WHERE s.user_id = ?
+"""
+
+USER_TRIPS_PAGE = """
+    SELECT status, upcoming, legs
+    FROM user_trips
+    WHERE user_id = ? AND position >= ? AND position < ?
+    ORDER BY position
+"""
+
+# Typeahead lookups (airline.search): the FTS5 MATCH drives the plan, then
+# each hit is a primary-key lookup
+SEARCH_FLIGHTS = """
+    SELECT f.flight_id, f.flight_number, f.departure_airport, f.arrival_airport, f.departure_time,
+           f.arrival_time, f.departure_ts, f.capacity, f.layout_id, f.status
+    FROM flight_search s
+    JOIN flights f ON f.flight_id = s.rowid
+    WHERE flight_search MATCH ? AND f.departure_ts >= ?
+    ORDER BY f.departure_ts
+    LIMIT ?
+"""
+
+SEARCH_ARCHIVED_FLIGHTS = """
+    SELECT f.flight_id, f.flight_number, f.departure_airport, f.arrival_airport, f.departure_time,
+           f.arrival_time, f.departure_ts, f.capacity, f.layout_id, f.status, 1 AS archived
+    FROM archived_flight_search s
+    JOIN flights_history f ON f.flight_id = s.rowid
+    WHERE archived_flight_search MATCH ?
+    ORDER BY f.departure_ts DESC
+    LIMIT ?
+"""
+
+UPCOMING_FLIGHTS = """
+    SELECT flight_id, flight_number, departure_airport, arrival_airport, departure_time,
+           arrival_time, departure_ts, capacity, layout_id, status
+    FROM flights
+    WHERE departure_ts >= ?
+    ORDER BY departure_ts
+    LIMIT ?
+"""
+
+SEARCH_AIRPORTS = """
+    SELECT a.code, a.name, a.city, a.country, a.tz
+    FROM airport_search s
+    JOIN airports a ON a.code = s.code
+    WHERE airport_search MATCH ?
+    ORDER BY a.code = ? DESC, s.rank
+    LIMIT ?
+"""
+
+# name -> (sql, sample parameters) used by the query plan check
+HOT_QUERIES = {
+    "find_flights": (FIND_FLIGHTS, ("DAC", "CGP", 1735668000, 1735754400)),
+    "flight_availability": (FLIGHT_AVAILABILITY.format(ids="?, ?"), (1, 2)),
+    "flight_seats": (FLIGHT_SEATS, (1,)),
+    "user_bookings": (USER_BOOKINGS, (1,)),
+    "flight_crew": (FLIGHT_CREW, (1,)),
+    "admin_bookings_page": page_query(after=("2025-01-01 00:00:00", 100)),
+    "admin_bookings_page_filtered": page_query(BookingFilter(flight_id=1, status="Confirmed"),
+                                               after=("2025-01-01 00:00:00", 100)),
+    "count_bookings": count_query(BookingFilter(flight_id=1)),
+    "count_bookings_by_status": count_query(BookingFilter(status="Cancelled", date_from=datetime.date(2025, 1, 1))),
+    "crew_page": crew_page_query(after=(0, 100)),
+    "crew_page_by_member": crew_page_query(CrewFilter(member_id=1), after=(0, 100)),
+    "count_crew": crew_count_query(CrewFilter(flight_id=1)),
+    "count_crew_by_day": crew_count_query(CrewFilter(day=datetime.date(2025, 1, 1))),
+    "crew_schedule": (SCHEDULE_SQL, (0, 86400, 0, 86400)),
+    "crew_member_schedule": (MEMBER_SCHEDULE_SQL, (0, 86400, 1, 0, 86400, 1)),
+    "day_stats": (DAY_STATS, {"start": 0, "end": 86400, "airport": "DAC"}),
+    "route_stats": (ROUTE_STATS, {"start": 0, "end": 86400, "airport": None, "limit": 15}),
+    "flight_load": (FLIGHT_LOAD.format(order="DESC"), {"start": 0, "end": 86400, "airport": None, "limit": 20}),
+    "booking_curve": (BOOKING_CURVE, {"start": 0, "end": 86400, "airport": None, "max_days": 60}),
+    "user_login": (USER_LOGIN, ("admin",)),
+    "session_user": (SESSION_USER, (b"\0" * 32, 0)),
+    "user_booking_stats": (USER_BOOKING_STATS, (1,)),
+    "user_trips_page": (USER_TRIPS_PAGE, (1, 0, 10)),
+    "search_flights": (SEARCH_FLIGHTS, ('"dac"*', 0, 20)),
+    "search_archived_flights": (SEARCH_ARCHIVED_FLIGHTS, ('"dac"*', 20)),
+    "upcoming_flights": (UPCOMING_FLIGHTS, (0, 20)),
+    "flight_changes": (FLIGHT_CHANGES, (100,)),
+    "last_flight_change": (LAST_CHANGE, ()),
+    "search_airports": (SEARCH_AIRPORTS, ('"dha"*', "DHA", 20)),
+}
+
+
+def day_range(conn, day, airport):
+    """Half-open epoch bounds of `day` in the departure airport's local time."""
+    return local_day_range(day, airport_tz(conn, airport))
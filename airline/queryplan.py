@@ -0,0 +1,88 @@
+# Query Plan Check
+#
+# Runs EXPLAIN QUERY PLAN for every hot query and reports any step that
+# falls back to a full table scan.  Exits non-zero on a regression:
+#
+#     python -m airline.queryplan airline.db
+#
+# Plans are checked against an empty in-memory copy of the schema, so the
+# result depends only on the indexes, not on sqlite_stat1 figures from a
+# small development database (where scanning two rows is the right call).
+import sqlite3
+import sys
+
+from airline.db import ConnectionPool
+from airline.migrations import migrate
+from airline.queries import HOT_QUERIES
+
+
+def query_plan(conn, sql, params):
+    return [row["detail"] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}", params)]
+
+
+def is_full_scan(detail, materialized=()):
+    # "SCAN t" walks the whole table (or a whole index when it is only used
+    # for ordering); "SEARCH t USING INDEX ..." is an index seek.  Virtual
+    # tables always report SCAN; an FTS5 plan string after the colon ("0:M3")
+    # means the module is seeking on a MATCH or rowid constraint.  Scanning
+    # a materialized subquery or co-routine reads only the rows its own
+    # (separately checked) plan produced.
+    if " VIRTUAL TABLE INDEX " in detail:
+        return detail.endswith(":")
+    if detail.removeprefix("SCAN ") in materialized:
+        return False
+    return detail.startswith("SCAN ") and not detail.startswith("SCAN CONSTANT ROW")
+
+
+def schema_copy(conn):
+    """Empty in-memory database with conn's tables, indexes and triggers."""
+    copy = sqlite3.connect(":memory:")
+    copy.row_factory = sqlite3.Row
+    # Shadow tables (flight_search_data, ...) are created by their virtual
+    # table, so replaying them as well would fail
+    for row in conn.execute(r"""
+        SELECT m.sql FROM sqlite_master m
+        WHERE m.sql IS NOT NULL AND m.name NOT LIKE 'sqlite_%'
+        AND NOT EXISTS (
+            SELECT 1 FROM sqlite_master v
+            WHERE v.sql LIKE 'CREATE VIRTUAL TABLE%' AND m.name LIKE v.name || '\_%' ESCAPE '\'
+        )
+        ORDER BY m.type = 'table' DESC, m.type = 'index' DESC
+    """):
+        copy.execute(row["sql"])
+    return copy
+
+
+def full_scans(conn, queries=None):
+    """Return {query name: [offending plan steps]} for queries that scan."""
+    problems = {}
+    for name, (sql, params) in (HOT_QUERIES if queries is None else queries).items():
+        plan = query_plan(conn, sql, params)
+        materialized = {d.split(" ", 1)[1] for d in plan if d.startswith(("MATERIALIZE ", "CO-ROUTINE "))}
+        scans = [d for d in plan if is_full_scan(d, materialized)]
+        if scans:
+            problems[name] = scans
+    return problems
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    database = argv[0] if argv else "airline.db"
+    pool = ConnectionPool(database, max_size=1)
+    try:
+        migrate(pool)
+        with pool.connection() as db:
+            conn = schema_copy(db)
+            problems = full_scans(conn)
+            for name, (sql, params) in HOT_QUERIES.items():
+                status = "FULL SCAN" if name in problems else "ok"
+                print(f"{name}: {status}")
+                for detail in query_plan(conn, sql, params):
+                    print(f"    {detail}")
+    finally:
+        pool.close()
+    return 1 if problems else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,77 @@
+# Reference Data Cache
+#
+# Crew pick-lists are needed on almost every Streamlit rerun but change only
+# when an admin edits flights or crew (flights themselves are picked through
+# bounded typeahead search, see airline.search).  They are cached per
+# process for REFDATA_TTL seconds and dropped immediately by invalidate(),
+# which every write path calls after committing.  The TTL only bounds
+# staleness from writers in other processes (CLI tools, a second server).
+#
+# Listings hold slow-changing columns only; per-flight counters such as
+# booked_count must be read fresh for the selected flight.
+import threading
+import time
+from types import MappingProxyType
+
+from airline.models import CrewAssignment, CrewMember, from_row
+
+REFDATA_TTL = 30
+
+CREW = "crew"
+CREW_MEMBERS = "crew_members"
+
+_cache = {}
+_generation = 0
+_lock = threading.Lock()
+
+
+def cached(key, loader, ttl=REFDATA_TTL):
+    """Value for key, calling loader() when it is missing or expired."""
+    now = time.monotonic()
+    with _lock:
+        entry = _cache.get(key)
+        if entry is not None and entry[0] > now:
+            return entry[1]
+        generation = _generation
+    value = loader()
+    with _lock:
+        # An invalidate() that raced the load means the value may predate
+        # the write; hand it to this caller but do not keep it.
+        if _generation == generation:
+            _cache[key] = (now + ttl, value)
+    return value
+
+
+def invalidate(*keys):
+    """Drop cached listings (all of them when no keys are given)."""
+    global _generation
+    with _lock:
+        for key in keys or list(_cache):
+            _cache.pop(key, None)
+        _generation += 1
+
+
+def invalidate_flights():
+    # Crew listings show flight numbers and vanish with deleted flights
+    invalidate(CREW)
+
+
+def _by_id(rows, key, model):
+    return MappingProxyType({row[key]: from_row(model, row) for row in rows})
+
+
+def crew_choices(conn):
+    """Read-only {crew_id: CrewAssignment} of live crew in departure order."""
+    return cached(CREW, lambda: _by_id(conn.execute("""
+        SELECT c.crew_id, c.flight_id, c.member_id, c.crew_name, c.role, c.contact_info, f.flight_number
+        FROM crew c
+        JOIN flights f ON c.flight_id = f.flight_id
+        ORDER BY f.departure_ts, c.crew_id
+    """).fetchall(), "crew_id", CrewAssignment))
+
+
+def crew_member_choices(conn):
+    """Read-only {member_id: CrewMember} of every member, by name."""
+    return cached(CREW_MEMBERS, lambda: _by_id(conn.execute("""
+        SELECT member_id, name, role, contact_info, home_base, active FROM crew_members ORDER BY name, member_id
+    """).fetchall(), "member_id", CrewMember))
@@ -0,0 +1,284 @@
+# Connecting Itineraries
+#
+# An in-memory time-expanded graph of the live schedule: every flight is an
+# edge from (origin, departure_ts) to (destination, arrival_ts), and each
+# airport keeps its outgoing edges sorted by departure time, so "what leaves
+# X between t1 and t2" is a bisect instead of a query.  Itineraries with up
+# to two stops are found by walking those windows, bounded by the minimum
+# connection time and the maximum layover.
+#
+# The graph is loaded once and then kept current incrementally from
+# flight_changes, a per-flight change log that triggers on flights maintain
+# (migration 12): each search first reads the entries past the last one
+# applied, so writes from any process (the archive cron, the importer CLI, a
+# second server) reach the graph, and only the changed flights are re-read.
+#
+# Benchmark on a synthetic schedule with:
+#     python -m airline.routing bench [--flights 100000]
+import argparse
+import bisect
+import random
+import statistics
+import sys
+import threading
+import time
+from dataclasses import dataclass
+
+MIN_CONNECTION = 45 * 60
+MAX_LAYOVER = 6 * 3600
+MAX_STOPS = 2
+ITINERARY_LIMIT = 20
+
+GRAPH_COLUMNS = "flight_id, flight_number, departure_airport, arrival_airport, departure_time, departure_ts, arrival_ts"
+
+LAST_CHANGE = "SELECT COALESCE(MAX(seq), 0) FROM flight_changes"
+
+# Changed flights with their current row; flight_id is NULL once deleted
+FLIGHT_CHANGES = f"""
+    SELECT c.seq, c.flight_id AS changed_id, f.status, {", ".join("f." + c for c in GRAPH_COLUMNS.split(", "))}
+    FROM flight_changes c
+    LEFT JOIN flights f ON f.flight_id = c.flight_id
+    WHERE c.seq > ?
+    ORDER BY c.seq
+"""
+
+
+@dataclass(frozen=True)
+class Leg:
+    flight_id: int
+    flight_number: str
+    origin: str
+    destination: str
+    departure_ts: int
+    arrival_ts: int
+    departure_time: str = ""
+
+
+@dataclass(frozen=True)
+class Itinerary:
+    legs: tuple
+
+    @property
+    def departure_ts(self):
+        return self.legs[0].departure_ts
+
+    @property
+    def arrival_ts(self):
+        return self.legs[-1].arrival_ts
+
+    @property
+    def duration(self):
+        return self.arrival_ts - self.departure_ts
+
+    @property
+    def stops(self):
+        return len(self.legs) - 1
+
+    @property
+    def layovers(self):
+        return tuple(b.departure_ts - a.arrival_ts for a, b in zip(self.legs, self.legs[1:]))
+
+    def summary(self):
+        route = " → ".join([self.legs[0].origin] + [leg.destination for leg in self.legs])
+        flights = ", ".join(leg.flight_number for leg in self.legs)
+        stops = "direct" if not self.stops else f"{self.stops} stop(s)"
+        return f"{route} ({flights}; {stops}, {self.duration // 3600}h {self.duration % 3600 // 60:02d}m)"
+
+
+class _Timetable:
+    """Legs sorted by departure time with a parallel list of keys for bisect."""
+
+    __slots__ = ("times", "legs")
+
+    def __init__(self):
+        self.times = []
+        self.legs = []
+
+    def add(self, leg):
+        i = bisect.bisect_right(self.times, leg.departure_ts)
+        self.times.insert(i, leg.departure_ts)
+        self.legs.insert(i, leg)
+
+    def remove(self, leg):
+        i = bisect.bisect_left(self.times, leg.departure_ts)
+        while self.legs[i].flight_id != leg.flight_id:
+            i += 1
+        del self.times[i]
+        del self.legs[i]
+
+    def window(self, start, end):
+        """Legs departing in [start, end]."""
+        return self.legs[bisect.bisect_left(self.times, start):bisect.bisect_right(self.times, end)]
+
+
+def _leg(row):
+    return Leg(row["flight_id"], row["flight_number"], row["departure_airport"], row["arrival_airport"],
+               row["departure_ts"], row["arrival_ts"], row["departure_time"])
+
+
+class RouteGraph:
+    def __init__(self, legs=()):
+        self._lock = threading.RLock()
+        self._seq = 0
+        self._reset(legs)
+
+    def _reset(self, legs):
+        self._legs = {}
+        self._by_origin = {}
+        self._by_route = {}
+        for leg in sorted(legs, key=lambda l: l.departure_ts):
+            # Appending in departure order keeps every timetable sorted
+            self._legs[leg.flight_id] = leg
+            for table in (self._by_origin.setdefault(leg.origin, _Timetable()),
+                          self._by_route.setdefault((leg.origin, leg.destination), _Timetable())):
+                table.times.append(leg.departure_ts)
+                table.legs.append(leg)
+
+    @classmethod
+    def from_db(cls, conn):
+        graph = cls()
+        graph.load(conn)
+        return graph
+
+    def load(self, conn):
+        # The log position is read first: a change committed in between is
+        # applied again by the next sync, which is harmless
+        seq = conn.execute(LAST_CHANGE).fetchone()[0]
+        # Cancelled flights cannot be part of an itinerary
+        rows = conn.execute(f"SELECT {GRAPH_COLUMNS} FROM flights WHERE status IS NOT 'Cancelled'")
+        legs = [_leg(row) for row in rows]
+        with self._lock:
+            self._reset(legs)
+            self._seq = seq
+
+    def __len__(self):
+        return len(self._legs)
+
+    def add(self, leg):
+        with self._lock:
+            self.remove(leg.flight_id)
+            self._legs[leg.flight_id] = leg
+            self._by_origin.setdefault(leg.origin, _Timetable()).add(leg)
+            self._by_route.setdefault((leg.origin, leg.destination), _Timetable()).add(leg)
+
+    def remove(self, flight_id):
+        with self._lock:
+            leg = self._legs.pop(flight_id, None)
+            if leg is not None:
+                self._by_origin[leg.origin].remove(leg)
+                self._by_route[leg.origin, leg.destination].remove(leg)
+
+    def sync(self, conn):
+        """Apply flight changes logged since the last load or sync."""
+        with self._lock:
+            for row in conn.execute(FLIGHT_CHANGES, (self._seq,)):
+                if row["flight_id"] is None or row["status"] == "Cancelled":
+                    self.remove(row["changed_id"])
+                else:
+                    self.add(_leg(row))
+                self._seq = row["seq"]
+
+    def search(self, origin, destination, earliest, latest, max_stops=MAX_STOPS, min_stops=0,
+               min_connection=MIN_CONNECTION, max_layover=MAX_LAYOVER, limit=ITINERARY_LIMIT):
+        """Itineraries from origin to destination whose first leg departs in
+        [earliest, latest], ordered by arrival time, then stops.  Those with
+        fewer than min_stops stops are dropped before the limit applies."""
+        found = []
+        with self._lock:
+            for first in self._departures(origin, earliest, latest):
+                self._extend((first,), {origin}, destination, max_stops, min_connection, max_layover, found)
+        if min_stops:
+            found = [it for it in found if it.stops >= min_stops]
+        found.sort(key=lambda it: (it.arrival_ts, it.stops, -it.departure_ts))
+        return found[:limit]
+
+    def _departures(self, airport, start, end):
+        table = self._by_origin.get(airport)
+        return table.window(start, end) if table else ()
+
+    def _extend(self, legs, visited, destination, stops_left, min_connection, max_layover, found):
+        last = legs[-1]
+        if last.destination == destination:
+            found.append(Itinerary(legs))
+            return
+        if not stops_left or last.destination in visited:
+            return
+        visited = visited | {last.destination}
+        start, end = last.arrival_ts + min_connection, last.arrival_ts + max_layover
+        if stops_left == 1:
+            # Only the final hop is left, so look up the exact route
+            table = self._by_route.get((last.destination, destination))
+            for leg in table.window(start, end) if table else ():
+                found.append(Itinerary(legs + (leg,)))
+            return
+        for leg in self._departures(last.destination, start, end):
+            if leg.destination not in visited:
+                self._extend(legs + (leg,), visited, destination, stops_left - 1,
+                             min_connection, max_layover, found)
+
+
+# Benchmark
+
+def synthetic_schedule(flights, airports=200, days=30, seed=7):
+    """Random legs between hub-weighted airports spread over `days` days."""
+    rng = random.Random(seed)
+    codes = [f"X{i:03d}" for i in range(airports)]
+    # A few hubs carry most traffic, as in real networks
+    weights = [1 / (i + 1) ** 0.8 for i in range(airports)]
+    legs = []
+    for flight_id in range(1, flights + 1):
+        origin, destination = rng.choices(codes, weights, k=2)
+        while destination == origin:
+            destination = rng.choices(codes, weights)[0]
+        departure = rng.randrange(days * 86400)
+        legs.append(Leg(flight_id, f"SY{flight_id}", origin, destination,
+                        departure, departure + rng.randrange(3600, 6 * 3600, 300)))
+    return codes, legs
+
+
+def _percentiles(samples):
+    q = statistics.quantiles(samples, n=100)
+    return f"p50 {q[49] * 1000:.2f} ms, p95 {q[94] * 1000:.2f} ms, max {max(samples) * 1000:.2f} ms"
+
+
+def benchmark(flights=100_000, queries=1000, seed=7):
+    codes, legs = synthetic_schedule(flights, seed=seed)
+    start = time.perf_counter()
+    graph = RouteGraph(legs)
+    print(f"build: {len(graph)} flights over {len(codes)} airports in {time.perf_counter() - start:.2f} s")
+
+    rng = random.Random(seed)
+    samples, results = [], 0
+    for _ in range(queries):
+        origin, destination = rng.sample(codes[:50], 2)
+        day = rng.randrange(29) * 86400
+        start = time.perf_counter()
+        results += len(graph.search(origin, destination, day, day + 86400))
+        samples.append(time.perf_counter() - start)
+    print(f"search: {queries} queries, {results / queries:.1f} itineraries each; {_percentiles(samples)}")
+
+    samples = []
+    for leg in rng.sample(legs, min(1000, len(legs))):
+        moved = Leg(leg.flight_id, leg.flight_number, leg.origin, leg.destination,
+                    leg.departure_ts + 1800, leg.arrival_ts + 1800)
+        start = time.perf_counter()
+        graph.add(moved)
+        samples.append(time.perf_counter() - start)
+    print(f"update: {len(samples)} flight edits; {_percentiles(samples)}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Connecting itinerary engine")
+    commands = parser.add_subparsers(dest="command", required=True)
+    bench = commands.add_parser("bench", help="benchmark on a synthetic schedule")
+    bench.add_argument("--flights", type=int, default=100_000)
+    bench.add_argument("--queries", type=int, default=1000)
+    bench.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args(argv)
+
+    benchmark(args.flights, args.queries, args.seed)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,68 @@
+# Typeahead Search
+#
+# Search-as-you-type over airports and flights, backed by the FTS5 tables
+# airport_search and flight_search (migration 10, kept in step by triggers);
+# archived_flight_search (migration 11) does the same for flights_history.
+# Every token the user typed is matched as a prefix ("dha bzl" finds flights
+# touching Dhaka and Barisal), and results are always capped at MAX_RESULTS
+# so a page never ships more than a screenful of options.
+import re
+
+from airline.queries import SEARCH_AIRPORTS, SEARCH_ARCHIVED_FLIGHTS, SEARCH_FLIGHTS, UPCOMING_FLIGHTS
+
+SEARCH_LIMIT = 20
+MAX_RESULTS = 50
+# A single letter prefix-matches most of the index; wait for a second one
+MIN_QUERY_CHARS = 2
+
+_TOKEN = re.compile(r"\w+")
+
+
+# Text indexed for a flight's departure/arrival: code, city and airport name
+_PLACE = "COALESCE((SELECT code || ' ' || COALESCE(city, '') || ' ' || name FROM airports WHERE code = {0}), {0})"
+
+
+def index_flight_sql(alias, table="flight_search"):
+    """INSERT ... SELECT head indexing the flight row `alias` into table."""
+    return f"""
+        INSERT INTO {table} (rowid, flight_number, departure, arrival)
+        SELECT {alias}.flight_id, {alias}.flight_number,
+               {_PLACE.format(alias + ".departure_airport")}, {_PLACE.format(alias + ".arrival_airport")}
+    """
+
+
+def fts_query(text):
+    """FTS5 MATCH expression for free text, or None when nothing is searchable."""
+    tokens = _TOKEN.findall((text or "").lower())
+    if sum(map(len, tokens)) < MIN_QUERY_CHARS:
+        return None
+    # Quoting each token keeps FTS5 operators (AND, NEAR, ^, :) inert
+    return " ".join(f'"{token}"*' for token in tokens) or None
+
+
+def _limit(limit):
+    return max(1, min(limit, MAX_RESULTS))
+
+
+def search_airports(conn, text, limit=SEARCH_LIMIT):
+    """Airports matching code, name, city or country prefixes; exact codes first."""
+    query = fts_query(text)
+    if query is None:
+        return []
+    return conn.execute(SEARCH_AIRPORTS, (query, (text or "").strip().upper(), _limit(limit))).fetchall()
+
+
+def search_flights(conn, text, limit=SEARCH_LIMIT, departing_after=None, include_archived=False):
+    """Flights matching flight number, airport code, city or name prefixes.
+
+    Soonest departures first; with no search text, just the next flights.
+    include_archived appends matching archived flights, latest first.
+    """
+    query = fts_query(text)
+    after = departing_after if departing_after is not None else -2**63
+    if query is None:
+        return conn.execute(UPCOMING_FLIGHTS, (after, _limit(limit))).fetchall()
+    rows = conn.execute(SEARCH_FLIGHTS, (query, after, _limit(limit))).fetchall()
+    if include_archived and len(rows) < _limit(limit):
+        rows += conn.execute(SEARCH_ARCHIVED_FLIGHTS, (query, _limit(limit) - len(rows))).fetchall()
+    return rows
@@ -0,0 +1,191 @@
+# Seat Maps
+#
+# Cabin layouts live in the cabin_layouts table (seeded from
+# seat_layouts.json) and each flight points at one through flights.layout_id.
+# A layout is compiled into a SeatLayout: an ordered tuple of seat labels plus
+# a label -> bit position index, kept in a process-wide LRU cache keyed by
+# layout id.  Per-flight seat state (booked, held, selected) is then a plain
+# int bitset over that order, so availability is a few integer operations
+# instead of set/list scans per seat.
+import html
+import json
+import os
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+
+LAYOUTS_PATH = os.path.join(os.path.dirname(__file__), "seat_layouts.json")
+DEFAULT_LAYOUT = "standard"
+LAYOUT_CACHE_SIZE = 64
+
+
+class LayoutError(ValueError):
+    pass
+
+
+@dataclass(frozen=True)
+class Cabin:
+    name: str
+    first_row: int
+    last_row: int
+    letters: str
+
+    @property
+    def rows(self):
+        return range(self.first_row, self.last_row + 1)
+
+
+@dataclass(frozen=True)
+class SeatLayout:
+    key: str
+    name: str
+    cabins: tuple
+    layout_id: int = None
+    seats: tuple = field(init=False)
+    index: dict = field(init=False, compare=False, repr=False)
+
+    def __post_init__(self):
+        seats = tuple(
+            f"{row}{letter}"
+            for cabin in self.cabins
+            for row in cabin.rows
+            for letter in cabin.letters
+        )
+        if len(set(seats)) != len(seats):
+            raise LayoutError(f"Layout {self.key!r} repeats seat labels")
+        object.__setattr__(self, "seats", seats)
+        object.__setattr__(self, "index", {seat: i for i, seat in enumerate(seats)})
+
+    @property
+    def seat_count(self):
+        return len(self.seats)
+
+    @property
+    def full_mask(self):
+        return (1 << len(self.seats)) - 1
+
+    def mask(self, seats):
+        """Bitset of the given labels; labels outside the layout are ignored."""
+        bits = 0
+        for seat in seats:
+            i = self.index.get(seat)
+            if i is not None:
+                bits |= 1 << i
+        return bits
+
+    def labels(self, mask):
+        return [seat for i, seat in enumerate(self.seats) if mask >> i & 1]
+
+    def capacity_issue(self, capacity):
+        """Describe a mismatch between flights.capacity and this layout, if any."""
+        if capacity > self.seat_count:
+            return (f"Flight capacity {capacity} exceeds the {self.seat_count} seats "
+                    f"in the {self.name} layout")
+        return None
+
+
+def build_layout(key, spec, layout_id=None):
+    try:
+        cabins = tuple(
+            Cabin(c["name"], int(c["first_row"]), int(c["last_row"]), c["seats"])
+            for c in spec["cabins"]
+        )
+    except (KeyError, TypeError, ValueError) as e:
+        raise LayoutError(f"Invalid layout {key!r}: {e}") from None
+    if not cabins or any(c.last_row < c.first_row or not c.letters for c in cabins):
+        raise LayoutError(f"Invalid layout {key!r}: empty cabin")
+    return SeatLayout(key, spec.get("name", key), cabins, layout_id)
+
+
+def load_layout_specs(path=LAYOUTS_PATH):
+    """Seed definitions: {code: spec} with aircraft and cabin details."""
+    with open(path, encoding="utf-8") as f:
+        specs = json.load(f)
+    for key, spec in specs.items():
+        build_layout(key, spec)  # validate before anything is stored
+    return specs
+
+
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def get_layout(conn, layout_id=None):
+    """Compiled SeatLayout for layout_id (the default layout when None)."""
+    if layout_id is None:
+        layout_id = default_layout_id(conn)
+    with _cache_lock:
+        layout = _cache.get(layout_id)
+        if layout is not None:
+            _cache.move_to_end(layout_id)
+            return layout
+    row = conn.execute(
+        "SELECT layout_id, code, name, spec FROM cabin_layouts WHERE layout_id = ?",
+        (layout_id,),
+    ).fetchone()
+    if row is None:
+        raise LayoutError(f"Unknown cabin layout {layout_id}")
+    spec = dict(json.loads(row["spec"]), name=row["name"])
+    layout = build_layout(row["code"], spec, row["layout_id"])
+    with _cache_lock:
+        _cache[layout_id] = layout
+        while len(_cache) > LAYOUT_CACHE_SIZE:
+            _cache.popitem(last=False)
+    return layout
+
+
+def default_layout_id(conn):
+    row = conn.execute("SELECT layout_id FROM cabin_layouts WHERE code = ?", (DEFAULT_LAYOUT,)).fetchone()
+    if row is None:
+        raise LayoutError(f"Default cabin layout {DEFAULT_LAYOUT!r} is missing")
+    return row["layout_id"]
+
+
+def list_layouts(conn):
+    return conn.execute("""
+        SELECT l.layout_id, l.code, l.name, l.seat_count, a.code AS aircraft_code, a.name AS aircraft_name
+        FROM cabin_layouts l
+        JOIN aircraft_types a ON a.aircraft_type_id = l.aircraft_type_id
+        ORDER BY a.name, l.name
+    """).fetchall()
+
+
+SEAT_MAP_CSS = """
+<style>
+.seat-map { font-family: sans-serif; color: #fff; }
+.seat-map h4 { margin: 12px 0 6px; }
+.seat-row { display: flex; gap: 4px; margin-bottom: 4px; align-items: center; }
+.seat-row .row-no { width: 28px; text-align: right; margin-right: 6px; font-size: 12px; }
+.seat { width: 38px; padding: 4px 0; border-radius: 4px; text-align: center; font-size: 12px; }
+.seat.free { background: #4CAF50; }
+.seat.booked { background: #ff4444; }
+.seat.held { background: #9e9e9e; }
+.seat.selected { background: #FFEB3B; color: #000; }
+.seat-legend span { margin-right: 12px; }
+</style>
+"""
+
+
+def render_seat_map(layout, booked=0, held=0, selected=0):
+    """Render the whole map as one HTML block from the state bitsets."""
+    parts = [SEAT_MAP_CSS, '<div class="seat-map">']
+    i = 0
+    for cabin in layout.cabins:
+        parts.append(f"<h4>{html.escape(cabin.name)} (Rows {cabin.first_row}-{cabin.last_row})</h4>")
+        for row in cabin.rows:
+            parts.append(f'<div class="seat-row"><span class="row-no">{row}</span>')
+            for letter in cabin.letters:
+                bit = 1 << i
+                state = ("selected" if selected & bit else "booked" if booked & bit
+                         else "held" if held & bit else "free")
+                parts.append(f'<span class="seat {state}">{row}{letter}</span>')
+                i += 1
+            parts.append("</div>")
+    parts.append(
+        '<div class="seat-legend">'
+        '<span class="seat free">&nbsp;</span> Free '
+        '<span class="seat selected">&nbsp;</span> Selected '
+        '<span class="seat held">&nbsp;</span> Held '
+        '<span class="seat booked">&nbsp;</span> Booked</div></div>'
+    )
+    return "".join(parts)
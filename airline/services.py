@@ -0,0 +1,576 @@
+# Services
+#
+# The application's use cases, independent of any UI: the Streamlit pages,
+# the HTTP API (airline.api) and scripts all go through these classes.  Each
+# service owns a ConnectionPool, delegates to the data-layer modules
+# (booking, bookings, search, archive, ...) and returns airline.models value
+# objects rather than sqlite3.Row.  Errors from SQLite propagate as
+# sqlite3.Error; invalid input raises ValueError.
+import threading
+import time
+from collections import OrderedDict
+
+from airline import queries
+from airline.airports import airport_tz, flight_times, list_airports
+from airline.analytics import (ANALYTICS_CACHE_SIZE, ANALYTICS_TTL, CURVE_DAYS, FLIGHT_LIMIT, ROUTE_LIMIT,
+                               booking_curve, day_stats, flight_load, route_stats)
+from airline.archive import archive_departed, flight_crew, get_flight, user_bookings
+from airline.auth import (DEFAULT_COST, SessionStore, credential_token, dummy_hash, hash_password,
+                          needs_rehash, run_hashing, verify_password)
+from airline.booking import reserve_seats
+from airline.bookings import (BookingFilter, cancel_bookings, cancel_matching, count_bookings, delete_bookings,
+                              delete_matching, page_bookings)
+from airline.crew import (CREW_COMPLEMENT, CREW_PAGE_SIZE, DEFAULT_RULES, AssignResult, CrewFilter, CrewSchedule,
+                          FlightCrewResult, Sector, Violation, count_crew, day_sectors, page_crew, plan_assignments,
+                          staffed_roles, utc_day)
+from airline.flights import cancel_flight, delete_flight, propagate_cancellation
+from airline.history import HISTORY_PAGE_SIZE, booking_stats, history_page
+from airline.holds import acquire_holds, held_seats, release_holds
+from airline.importer import import_flights
+from airline.inventory import flight_availability
+from airline.models import Airport, Booking, CabinLayout, CrewAssignment, CrewMember, Flight, User, from_row
+from airline.refdata import (CREW, CREW_MEMBERS, crew_choices, crew_member_choices, invalidate,
+                             invalidate_flights)
+from airline.routing import RouteGraph
+from airline.search import search_airports, search_flights
+from airline.seatmap import get_layout, list_layouts
+from airline.timeutil import from_epoch, local_day_range, now_epoch
+
+CREW_ROLES = ["Pilot", "Co-Pilot", "Flight Attendant", "Engineer", "Catering Manager", "Hostess"]
+
+
+class UserService:
+    """Accounts and logins; see airline.auth for the hashing and sessions."""
+
+    def __init__(self, pool, cost=DEFAULT_COST, sessions=None):
+        self.pool = pool
+        self.cost = cost
+        self.sessions = sessions if sessions is not None else SessionStore(pool)
+
+    def register(self, username, password, email, role="passenger"):
+        hashed = run_hashing(hash_password, password, self.cost)
+        with self.pool.transaction() as conn:
+            return conn.execute(
+                "INSERT INTO users (username, password, email, role) VALUES (?, ?, ?, ?)",
+                (username, hashed, email, role),
+            ).lastrowid
+
+    def login(self, username, password, role, token=None):
+        """Verify credentials and open a session: (User, token), or None."""
+        with self.pool.connection() as conn:
+            row = conn.execute(queries.USER_LOGIN, (username,)).fetchone()
+        # Unknown users are verified against a dummy hash so they take as long
+        stored = row["password"] if row is not None else dummy_hash(self.cost)
+        if not run_hashing(verify_password, password, stored) or row is None or row["role"] != role:
+            return None
+        if needs_rehash(stored, self.cost):
+            self._store_hash(row["user_id"], stored, password)
+        user = from_row(User, row)
+        return user, self.sessions.issue(user, token)
+
+    def authenticate(self, username, password, role):
+        """Verified User for a credential sent with every request (HTTP
+        Basic); repeats are answered from the session store."""
+        token = credential_token(username, password, role)
+        user = self.sessions.get(token)
+        if user is None:
+            result = self.login(username, password, role, token)
+            user = result[0] if result else None
+        return user
+
+    def session(self, token):
+        return self.sessions.get(token)
+
+    def logout(self, token):
+        self.sessions.revoke(token)
+
+    def get(self, user_id):
+        with self.pool.connection() as conn:
+            row = conn.execute("SELECT * FROM users WHERE user_id = ?", (user_id,)).fetchone()
+        return from_row(User, row) if row else None
+
+    def change_password(self, user_id, current, new, keep_session=None):
+        """Returns False when current does not match.  Every other session
+        of the user is signed out."""
+        with self.pool.connection() as conn:
+            row = conn.execute("SELECT password FROM users WHERE user_id = ?", (user_id,)).fetchone()
+        if row is None or not run_hashing(verify_password, current, row["password"]):
+            return False
+        if not self._store_hash(user_id, row["password"], new):
+            return False
+        self.sessions.revoke_user(user_id, keep=keep_session)
+        return True
+
+    def _store_hash(self, user_id, old, password):
+        # Hashed outside the transaction; the UPDATE only applies if the
+        # stored value is still the one that was verified
+        hashed = run_hashing(hash_password, password, self.cost)
+        with self.pool.transaction() as conn:
+            return conn.execute("UPDATE users SET password = ? WHERE user_id = ? AND password = ?",
+                                (hashed, user_id, old)).rowcount == 1
+
+
+class FlightService:
+    def __init__(self, pool):
+        self.pool = pool
+        self._graph = None
+        self._graph_lock = threading.Lock()
+
+    # Reads
+
+    def get(self, flight_id, include_archived=False):
+        with self.pool.connection() as conn:
+            row = get_flight(conn, flight_id, include_archived)
+        return from_row(Flight, row) if row else None
+
+    def search(self, text, limit=None, upcoming_only=True, include_archived=False):
+        """Bounded typeahead matches, soonest first.  With upcoming_only off
+        (admin pages) text also matches past flights, archived ones when
+        include_archived, and a flight id exactly; empty text still lists
+        the next departures."""
+        kwargs = {"limit": limit} if limit else {}
+        text = (text or "").strip()
+        with self.pool.connection() as conn:
+            rows = search_flights(conn, text, departing_after=now_epoch() if upcoming_only or not text else None,
+                                  include_archived=include_archived and not upcoming_only, **kwargs)
+        flights = [from_row(Flight, row) for row in rows]
+        if text.isdigit() and not upcoming_only:
+            exact = self.get(int(text), include_archived)
+            if exact is not None:
+                flights = [exact] + [f for f in flights if f.flight_id != exact.flight_id]
+        return flights
+
+    def search_airports(self, text, limit=None):
+        kwargs = {"limit": limit} if limit else {}
+        with self.pool.connection() as conn:
+            return [from_row(Airport, row) for row in search_airports(conn, text, **kwargs)]
+
+    def airports(self):
+        with self.pool.connection() as conn:
+            rows = list_airports(conn)
+        return [from_row(Airport, row) for row in rows]
+
+    def layouts(self):
+        with self.pool.connection() as conn:
+            return [from_row(CabinLayout, row) for row in list_layouts(conn)]
+
+    def day_range(self, day, airport):
+        with self.pool.connection() as conn:
+            return queries.day_range(conn, day, airport)
+
+    def find(self, dep_airport, arr_airport, day):
+        """Direct flights on a local calendar day at the departure airport."""
+        with self.pool.connection() as conn:
+            start, end = queries.day_range(conn, day, dep_airport)
+            rows = conn.execute(queries.FIND_FLIGHTS, (dep_airport, arr_airport, start, end)).fetchall()
+        return [from_row(Flight, row) for row in rows]
+
+    def availability(self, flight_ids):
+        """{flight_id: inventory.Availability} for seat counts of many flights."""
+        with self.pool.connection() as conn:
+            return flight_availability(conn, flight_ids)
+
+    def local_times(self, flight):
+        """(departure, arrival) as aware datetimes in each airport's zone."""
+        with self.pool.connection() as conn:
+            return (from_epoch(flight.departure_ts, airport_tz(conn, flight.departure_airport)),
+                    from_epoch(flight.arrival_ts, airport_tz(conn, flight.arrival_airport)))
+
+    def itineraries(self, dep_airport, arr_airport, day, **constraints):
+        """Connecting itineraries whose first leg departs on the local day."""
+        with self.pool.connection() as conn:
+            graph = self._route_graph(conn)
+            graph.sync(conn)
+            start, end = queries.day_range(conn, day, dep_airport)
+        return graph.search(dep_airport, arr_airport, start, end - 1, **constraints)
+
+    def _route_graph(self, conn):
+        # Built on first use, then kept current from the flight_changes log
+        with self._graph_lock:
+            if self._graph is None:
+                self._graph = RouteGraph.from_db(conn)
+            return self._graph
+
+    # Writes
+
+    def create(self, flight_number, dep_airport, arr_airport, dep_local, arr_local, capacity, layout_id):
+        """Add a flight from local date-times; returns its id."""
+        with self.pool.transaction() as conn:
+            times = flight_times(conn, dep_airport, arr_airport, dep_local, arr_local)
+            flight_id = conn.execute("""
+                INSERT INTO flights (
+                    flight_number, departure_airport, arrival_airport, departure_time,
+                    arrival_time, departure_ts, arrival_ts, capacity, layout_id
+                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """, (flight_number, dep_airport, arr_airport, times["departure_time"], times["arrival_time"],
+                  times["departure_ts"], times["arrival_ts"], capacity, layout_id)).lastrowid
+        invalidate_flights()
+        return flight_id
+
+    def update(self, flight_id, flight_number, dep_airport, arr_airport, dep_local, arr_local,
+               capacity, layout_id, status):
+        """Returns (updated, cancelled_bookings).  updated is False when the
+        new capacity is below the seats already sold; a flight that no longer
+        exists raises ValueError."""
+        # Checked in the UPDATE itself so it cannot race a booking
+        with self.pool.transaction(immediate=True) as conn:
+            times = flight_times(conn, dep_airport, arr_airport, dep_local, arr_local)
+            previous = conn.execute("SELECT status FROM flights WHERE flight_id = ?", (flight_id,)).fetchone()
+            if previous is None:
+                raise ValueError(f"Flight {flight_id} not found")
+            updated = conn.execute("""
+                UPDATE flights SET
+                    flight_number = ?,
+                    departure_airport = ?,
+                    arrival_airport = ?,
+                    departure_time = ?,
+                    arrival_time = ?,
+                    departure_ts = ?,
+                    arrival_ts = ?,
+                    capacity = ?,
+                    layout_id = ?,
+                    status = ?
+                WHERE flight_id = ? AND booked_count <= ?
+            """, (flight_number, dep_airport, arr_airport, times["departure_time"], times["arrival_time"],
+                  times["departure_ts"], times["arrival_ts"], capacity, layout_id, status,
+                  flight_id, capacity)).rowcount
+            cancelled = 0
+            if updated and status == "Cancelled" and previous["status"] != "Cancelled":
+                cancelled = propagate_cancellation(conn, flight_id)
+        if updated:
+            invalidate_flights()
+        return bool(updated), cancelled
+
+    def cancel(self, flight_id):
+        return cancel_flight(self.pool, flight_id)
+
+    def delete(self, flight_id):
+        """LifecycleResult, or None when the flight does not exist."""
+        return delete_flight(self.pool, flight_id)
+
+    def archive_departed(self):
+        return archive_departed(self.pool)
+
+    def import_schedule(self, source, **options):
+        return import_flights(self.pool, source, **options)
+
+
+class BookingService:
+    def __init__(self, pool):
+        self.pool = pool
+
+    def seat_map(self, flight_id, layout_id=None, holder=None):
+        """(layout, booked mask, held-by-others mask) for a flight."""
+        with self.pool.connection() as conn:
+            layout = get_layout(conn, layout_id)
+            booked = layout.mask(row["seat_number"] for row in conn.execute(queries.FLIGHT_SEATS, (flight_id,)))
+            held = layout.mask(held_seats(conn, flight_id, exclude_holder=holder))
+        return layout, booked, held
+
+    def hold(self, flight_id, seats, holder):
+        return acquire_holds(self.pool, flight_id, seats, holder)
+
+    def release(self, holder, flight_id=None, seats=None):
+        return release_holds(self.pool, holder, flight_id, seats)
+
+    def reserve(self, user_id, flight_id, seats, holder=None):
+        return reserve_seats(self.pool, user_id, flight_id, seats, holder=holder)
+
+    def for_user(self, user_id, include_archived=False):
+        with self.pool.connection() as conn:
+            return [from_row(Booking, row) for row in user_bookings(conn, user_id, include_archived)]
+
+    def history(self, user_id, page=0, page_size=HISTORY_PAGE_SIZE):
+        """One page of the user's trips, upcoming first, and their BookingStats."""
+        return history_page(self.pool, user_id, page, page_size)
+
+    def stats(self, user_id):
+        return booking_stats(self.pool, user_id)
+
+    def count(self, filters=BookingFilter()):
+        with self.pool.connection() as conn:
+            return count_bookings(conn, filters)
+
+    def page(self, filters=BookingFilter(), after=None, limit=None):
+        kwargs = {"limit": limit} if limit else {}
+        with self.pool.connection() as conn:
+            return [from_row(Booking, row) for row in page_bookings(conn, filters, after, **kwargs)]
+
+    def cancel(self, booking_ids):
+        return cancel_bookings(self.pool, booking_ids)
+
+    def delete(self, booking_ids):
+        return delete_bookings(self.pool, booking_ids)
+
+    def cancel_matching(self, filters):
+        return cancel_matching(self.pool, filters)
+
+    def delete_matching(self, filters):
+        return delete_matching(self.pool, filters)
+
+
+_INSERT_ASSIGNMENT = """
+    INSERT INTO crew (flight_id, member_id, crew_name, role, contact_info)
+    SELECT ?, member_id, name, ?, contact_info FROM crew_members WHERE member_id = ?
+"""
+
+_UPDATE_ASSIGNMENT = """
+    UPDATE crew SET (flight_id, member_id, crew_name, role, contact_info) = (
+        SELECT ?, member_id, name, ?, contact_info FROM crew_members WHERE member_id = ?
+    ) WHERE crew_id = ?
+"""
+
+
+class CrewService:
+    """Crew members and their flight assignments; the duty rules are in
+    airline.crew."""
+
+    def __init__(self, pool, rules=DEFAULT_RULES):
+        self.pool = pool
+        self.rules = rules
+
+    def choices(self):
+        """Cached read-only {crew_id: CrewAssignment} of live assignments."""
+        with self.pool.connection() as conn:
+            return crew_choices(conn)
+
+    def members(self):
+        """Cached read-only {member_id: CrewMember}."""
+        with self.pool.connection() as conn:
+            return crew_member_choices(conn)
+
+    def for_flight(self, flight_id, include_archived=False):
+        with self.pool.connection() as conn:
+            return [from_row(CrewAssignment, row) for row in flight_crew(conn, flight_id, include_archived)]
+
+    def add_member(self, name, role, contact_info=None, home_base=None):
+        with self.pool.transaction() as conn:
+            member_id = conn.execute(
+                "INSERT INTO crew_members (name, role, contact_info, home_base) VALUES (?, ?, ?, ?)",
+                (name, role, contact_info, home_base or None),
+            ).lastrowid
+        invalidate(CREW_MEMBERS)
+        return member_id
+
+    def update_member(self, member_id, name, role, contact_info, home_base, active=True):
+        with self.pool.transaction() as conn:
+            conn.execute("""
+                UPDATE crew_members SET name = ?, role = ?, contact_info = ?, home_base = ?, active = ?
+                WHERE member_id = ?
+            """, (name, role, contact_info, home_base or None, int(active), member_id))
+        # Renames reach the assignments through trg_crew_members_sync
+        invalidate(CREW_MEMBERS, CREW)
+
+    def count(self, filters=CrewFilter()):
+        with self.pool.connection() as conn:
+            return count_crew(conn, filters)
+
+    def page(self, filters=CrewFilter(), after=None, limit=CREW_PAGE_SIZE):
+        with self.pool.connection() as conn:
+            return [from_row(CrewAssignment, row) for row in page_crew(conn, filters, after, limit)]
+
+    def _sector(self, conn, flight_id):
+        row = conn.execute(
+            "SELECT flight_id, departure_airport, arrival_airport, departure_ts, arrival_ts FROM flights "
+            "WHERE flight_id = ?", (flight_id,)
+        ).fetchone()
+        if row is None:
+            raise ValueError(f"Flight {flight_id} not found")
+        return Sector(*row)
+
+    def _member_roles(self, conn, member_ids):
+        member_ids = list(set(member_ids))
+        roles = dict(conn.execute(
+            f"SELECT member_id, role FROM crew_members WHERE member_id IN ({', '.join('?' * len(member_ids))})",
+            member_ids,
+        ).fetchall())
+        missing = set(member_ids) - roles.keys()
+        if missing:
+            raise ValueError(f"Crew member {min(missing)} not found")
+        return roles
+
+    def _assign(self, conn, flight_id, member_id, role, force, replacing=None):
+        sector = self._sector(conn, flight_id)
+        member_role = self._member_roles(conn, [member_id])[member_id]
+        schedule = CrewSchedule.from_db(conn, sector.departure_ts, sector.departure_ts + 1, self.rules, member_id)
+        if replacing is not None and replacing["member_id"] == member_id:
+            schedule.remove(member_id, replacing["flight_id"])
+        violations = tuple(schedule.check(member_id, sector))
+        if violations and not force:
+            return AssignResult(None, violations)
+        if replacing is None:
+            crew_id = conn.execute(_INSERT_ASSIGNMENT, (flight_id, role or member_role, member_id)).lastrowid
+        else:
+            crew_id = replacing["crew_id"]
+            conn.execute(_UPDATE_ASSIGNMENT, (flight_id, role or member_role, member_id, crew_id))
+        return AssignResult(crew_id, violations)
+
+    def assign(self, flight_id, member_id, role=None, force=False):
+        """Put a member on a flight (in their own role unless role is given).
+
+        Returns an AssignResult; when the assignment would break an overlap,
+        duty or rest rule nothing is written unless force is set, and the
+        violations are reported either way."""
+        with self.pool.transaction(immediate=True) as conn:
+            result = self._assign(conn, flight_id, member_id, role, force)
+        invalidate(CREW)
+        return result
+
+    def update(self, crew_id, flight_id, member_id, role=None, force=False):
+        """Move an assignment to another flight, member or role; see assign()."""
+        with self.pool.transaction(immediate=True) as conn:
+            current = conn.execute("SELECT crew_id, flight_id, member_id FROM crew WHERE crew_id = ?",
+                                   (crew_id,)).fetchone()
+            if current is None:
+                raise ValueError(f"Crew assignment {crew_id} not found")
+            result = self._assign(conn, flight_id, member_id, role, force, replacing=current)
+        invalidate(CREW)
+        return result
+
+    def save_flight(self, flight_id, crew, force=False):
+        """Make a flight's crew exactly `crew`, a list of (crew_id, member_id,
+        role) rows with crew_id None for new ones; assignments not listed are
+        removed.  All rows are checked against one schedule load and written
+        in one transaction, or none are (unless force) when any new or
+        changed row breaks a rule."""
+        with self.pool.transaction(immediate=True) as conn:
+            sector = self._sector(conn, flight_id)
+            current = {row["crew_id"]: row for row in conn.execute(
+                "SELECT crew_id, member_id, role FROM crew WHERE flight_id = ?", (flight_id,)
+            )}
+            unknown = {crew_id for crew_id, _, _ in crew if crew_id is not None} - current.keys()
+            if unknown:
+                raise ValueError(f"Crew assignment {min(unknown)} is not on flight {flight_id}")
+            roles = self._member_roles(conn, [member_id for _, member_id, _ in crew]) if crew else {}
+
+            # Judge every row against the rest of each member's roster, not
+            # against this flight's current crew
+            schedule = CrewSchedule.from_db(conn, sector.departure_ts, sector.departure_ts + 1, self.rules)
+            for row in current.values():
+                schedule.remove(row["member_id"], flight_id)
+            violations, seen, inserts, updates = [], set(), [], []
+            for crew_id, member_id, role in crew:
+                role = role or roles[member_id]
+                if member_id in seen:
+                    violations.append(Violation(member_id, "overlap", (flight_id,), "listed twice on this flight"))
+                    continue
+                seen.add(member_id)
+                previous = current.get(crew_id)
+                if previous is None or previous["member_id"] != member_id:
+                    violations.extend(schedule.check(member_id, sector))
+                if previous is None:
+                    inserts.append((flight_id, role, member_id))
+                elif (previous["member_id"], previous["role"]) != (member_id, role):
+                    updates.append((flight_id, role, member_id, crew_id))
+            if violations and not force:
+                return FlightCrewResult(saved=False, violations=tuple(violations))
+
+            removed = [(crew_id,) for crew_id in current.keys() - {crew_id for crew_id, _, _ in crew}]
+            conn.executemany("DELETE FROM crew WHERE crew_id = ?", removed)
+            conn.executemany(_UPDATE_ASSIGNMENT, updates)
+            conn.executemany(_INSERT_ASSIGNMENT, inserts)
+        invalidate(CREW)
+        return FlightCrewResult(True, len(inserts), len(updates), len(removed), tuple(violations))
+
+    def delete(self, crew_ids):
+        """Remove assignments (a list of crew ids) in one statement."""
+        crew_ids = list(crew_ids)
+        if not crew_ids:
+            return 0
+        with self.pool.transaction() as conn:
+            deleted = conn.execute(f"DELETE FROM crew WHERE crew_id IN ({', '.join('?' * len(crew_ids))})",
+                                   crew_ids).rowcount
+        invalidate(CREW)
+        return deleted
+
+    def conflicts(self, day=None):
+        """Rule violations involving flights departing on a UTC day (every
+        live flight when day is None)."""
+        with self.pool.connection() as conn:
+            if day is None:
+                start, end = conn.execute("SELECT MIN(departure_ts), MAX(departure_ts) + 1 FROM flights").fetchone()
+                if start is None:
+                    return []
+            else:
+                start, end = utc_day(day)
+            schedule = CrewSchedule.from_db(conn, start, end, self.rules)
+            flight_ids = {sector.flight_id for sector in day_sectors(conn, start, end)}
+        return [v for v in schedule.violations() if flight_ids.intersection(v.flight_ids)]
+
+    def auto_assign(self, day, dry_run=False, complement=CREW_COMPLEMENT):
+        """Staff the open positions on a UTC day's flights (airline.crew);
+        returns the AssignmentPlan, written in one transaction unless dry_run."""
+        start, end = utc_day(day)
+        with self.pool.transaction(immediate=True) as conn:
+            members = [from_row(CrewMember, row) for row in conn.execute(
+                "SELECT member_id, name, role, home_base FROM crew_members WHERE active ORDER BY member_id"
+            )]
+            plan = plan_assignments(CrewSchedule.from_db(conn, start, end, self.rules), day_sectors(conn, start, end),
+                                    members, staffed_roles(conn, start, end), complement)
+            if not dry_run:
+                conn.executemany(_INSERT_ASSIGNMENT, [(flight_id, role, member_id)
+                                                      for flight_id, member_id, role in plan.assignments])
+        if not dry_run:
+            invalidate(CREW)
+        return plan
+
+
+class AnalyticsService:
+    """Operations dashboard aggregates (airline.analytics).  Each result is
+    cached for ttl seconds per (query, days, airport), so a dashboard rerun
+    repeats no SQL until the cache expires.  Any date range can be asked
+    for, so the cache is an LRU of at most max_entries results."""
+
+    def __init__(self, pool, ttl=ANALYTICS_TTL, max_entries=ANALYTICS_CACHE_SIZE):
+        self.pool = pool
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _cached(self, query, first_day, last_day, airport, **options):
+        # Whole UTC days keep the cache keys few and shared between sessions
+        start, end = local_day_range(first_day, "UTC")[0], local_day_range(last_day, "UTC")[1]
+        key = (query.__name__, start, end, airport or None, *sorted(options.items()))
+        now = time.monotonic()
+        with self._lock:
+            entry = self._cache.get(key)
+            if entry is not None and entry[0] > now:
+                self._cache.move_to_end(key)
+                return entry[1]
+        with self.pool.connection() as conn:
+            value = tuple(query(conn, start, end, airport, **options))
+        with self._lock:
+            self._cache[key] = (now + self.ttl, value)
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.max_entries:
+                self._cache.popitem(last=False)
+        return value
+
+    def days(self, first_day, last_day, airport=None):
+        """DayStats per UTC departure day: load factor, delays, cancellations."""
+        return self._cached(day_stats, first_day, last_day, airport)
+
+    def routes(self, first_day, last_day, airport=None, limit=ROUTE_LIMIT):
+        """RouteStats of the busiest routes."""
+        return self._cached(route_stats, first_day, last_day, airport, limit=limit)
+
+    def flights(self, first_day, last_day, airport=None, limit=FLIGHT_LIMIT, emptiest=False):
+        """FlightLoad of the fullest (or emptiest) operating flights."""
+        return self._cached(flight_load, first_day, last_day, airport, limit=limit, emptiest=emptiest)
+
+    def booking_curve(self, first_day, last_day, airport=None, max_days=CURVE_DAYS):
+        """CurvePoint per days-before-departure for flights in the range."""
+        return self._cached(booking_curve, first_day, last_day, airport, max_days=max_days)
+
+
+class AirlineServices:
+    """Every service over one shared pool."""
+
+    def __init__(self, pool):
+        self.pool = pool
+        self.users = UserService(pool)
+        self.flights = FlightService(pool)
+        self.bookings = BookingService(pool)
+        self.crew = CrewService(pool)
+        self.analytics = AnalyticsService(pool)
@@ -0,0 +1,72 @@
+# Flight Times
+#
+# Flights are stored with departure_ts / arrival_ts as UTC epoch seconds;
+# every range filter and sort uses those integer columns.  departure_time /
+# arrival_time keep the airport-local wall-clock time as normalized text
+# ("YYYY-MM-DD HH:MM:SS") purely for display.  Conversion happens here, once,
+# at the boundary between the UI/imports and the database.
+import datetime
+import functools
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+TEXT_FORMAT = "%Y-%m-%d %H:%M:%S"
+_PARSE_FORMATS = (TEXT_FORMAT, "%Y-%m-%d %H:%M:%S.%f", "%Y-%m-%d %H:%M", "%Y-%m-%dT%H:%M:%S", "%Y-%m-%dT%H:%M")
+
+
+@functools.lru_cache(maxsize=None)
+def zone(name):
+    try:
+        return ZoneInfo(name or "UTC")
+    except (ZoneInfoNotFoundError, ValueError):
+        return datetime.timezone.utc
+
+
+def parse_local(text, tz=None):
+    """Parse a local date-time string in any of the accepted formats.
+
+    A value with an explicit UTC offset is converted to the wall-clock time
+    at tz; without tz it is rejected rather than having its offset dropped.
+    """
+    text = str(text).strip()
+    try:
+        # The C ISO parser covers the stored format and is far cheaper than
+        # strptime on bulk imports
+        parsed = datetime.datetime.fromisoformat(text)
+    except ValueError:
+        parsed = None
+    if parsed is not None:
+        if parsed.tzinfo is None:
+            return parsed
+        if tz is None:
+            raise ValueError(f"Unexpected UTC offset in {text!r}")
+        return parsed.astimezone(zone(tz)).replace(tzinfo=None)
+    for fmt in _PARSE_FORMATS:
+        try:
+            return datetime.datetime.strptime(text, fmt)
+        except ValueError:
+            pass
+    raise ValueError(f"Unrecognised date/time {text!r}")
+
+
+def to_epoch(local, tz):
+    """Naive airport-local datetime -> UTC epoch seconds."""
+    return int(local.replace(tzinfo=zone(tz)).timestamp())
+
+
+def from_epoch(ts, tz):
+    """UTC epoch seconds -> aware datetime in the airport's time zone."""
+    return datetime.datetime.fromtimestamp(ts, zone(tz))
+
+
+def local_text(local):
+    return local.strftime(TEXT_FORMAT)
+
+
+def local_day_range(day, tz):
+    """Epoch bounds [start, end) of a calendar day at an airport."""
+    start = datetime.datetime.combine(day, datetime.time())
+    return to_epoch(start, tz), to_epoch(start + datetime.timedelta(days=1), tz)
+
+
+def now_epoch():
+    return int(datetime.datetime.now(datetime.timezone.utc).timestamp())
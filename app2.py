@@ -1,82 +1,60 @@
 import streamlit as st
-import sqlite3
 from sqlite3 import Error
 import datetime
+import tempfile
+import uuid
+
+import plotly.graph_objects as go
+
+from airline.analytics import ANALYTICS_TTL, CURVE_DAYS
+from airline.bookings import PAGE_SIZE, BookingFilter
+from airline.crew import CREW_PAGE_SIZE, CrewFilter
+from airline.db import ConnectionPool
+from airline.export import (FORMATS as EXPORT_FORMATS, MIME_TYPES as EXPORT_MIME_TYPES, bookings_query,
+                            export_bytes, manifest_query, roster_query)
+from airline.flights import FLIGHT_STATUSES
+from airline.history import HISTORY_PAGE_SIZE
+from airline.importer import ImportFormatError, restore_deferred
+from airline.migrations import migrate
+from airline.seatmap import render_seat_map
+from airline.services import CREW_ROLES, AirlineServices
 
 # Database Configuration
 DATABASE = 'airline.db'
 
-# Initialize Database Tables
-def create_tables():
-    try:
-        conn = sqlite3.connect(DATABASE)
-        c = conn.cursor()
-
-        # Users Table
-        c.execute("""
-            CREATE TABLE IF NOT EXISTS users (
-                user_id INTEGER PRIMARY KEY AUTOINCREMENT,
-                username TEXT UNIQUE NOT NULL,
-                password TEXT NOT NULL,
-                email TEXT,
-                role TEXT CHECK(role IN ('admin', 'passenger')) NOT NULL,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        """)
-
-        # Flights Table
-        c.execute("""
-            CREATE TABLE IF NOT EXISTS flights (
-                flight_id INTEGER PRIMARY KEY AUTOINCREMENT,
-                flight_number TEXT NOT NULL,
-                departure_airport TEXT NOT NULL,
-                arrival_airport TEXT NOT NULL,
-                departure_time DATETIME NOT NULL,
-                arrival_time DATETIME NOT NULL,
-                capacity INTEGER NOT NULL,
-                status TEXT DEFAULT 'Scheduled'
-            )
-        """)
-
-        # Bookings Table
-        c.execute("""
-            CREATE TABLE IF NOT EXISTS bookings (
-                booking_id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id INTEGER,
-                flight_id INTEGER,
-                booking_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                seat_number TEXT,
-                status TEXT DEFAULT 'Confirmed',
-                FOREIGN KEY (user_id) REFERENCES users(user_id),
-                FOREIGN KEY (flight_id) REFERENCES flights(flight_id),
-                UNIQUE (flight_id, seat_number)
-            )
-        """)
-
-        # Crew Table
-        c.execute("""
-            CREATE TABLE IF NOT EXISTS crew (
-                crew_id INTEGER PRIMARY KEY AUTOINCREMENT,
-                flight_id INTEGER,
-                crew_name TEXT NOT NULL,
-                role TEXT NOT NULL,
-                contact_info TEXT,
-                FOREIGN KEY (flight_id) REFERENCES flights(flight_id)
-            )
-        """)
-
-        conn.commit()
-    except Error as e:
-        st.error(f"Error creating tables: {e}")
-    finally:
-        if conn:
-            conn.close()
-
-# Database Connection Helper
-def get_db():
-    conn = sqlite3.connect(DATABASE)
-    conn.row_factory = sqlite3.Row
-    return conn
+# Database Connection Helpers
+@st.cache_resource
+def get_pool():
+    # One pool per Streamlit server process, shared by all sessions
+    return ConnectionPool(DATABASE)
+
+# Pages are thin clients of the service layer, which also owns the
+# connecting-itinerary graph
+@st.cache_resource
+def get_services():
+    return AirlineServices(get_pool())
+
+def show_pool_metrics():
+    metrics = get_pool().metrics()
+    with st.sidebar.expander("Database Pool"):
+        st.write(f"Checkouts: {metrics.checkouts}")
+        st.write(f"Avg wait: {metrics.avg_wait * 1000:.2f} ms (max {metrics.max_wait * 1000:.2f} ms)")
+        st.write(f"Open connections: {metrics.open_connections} ({metrics.in_use} in use)")
+
+# Move landed flights to the history tables at most once an hour per process
+@st.cache_resource(ttl=3600)
+def run_archiver():
+    return get_services().flights.archive_departed()
+
+# Initialize Database Schema
+@st.cache_resource
+def init_db():
+    # Applies pending migrations once per server process; later reruns
+    # only hit the cached schema version.  Indexes left dropped by an
+    # interrupted deferred import are put back first thing.
+    version = migrate(get_pool())
+    restore_deferred(get_pool())
+    return version
 
 # Background Setting
 def set_background():
@@ -96,34 +74,19 @@ def set_background():
 # Database Operations
 def add_user(username, password, email, role):
     try:
-        conn = get_db()
-        c = conn.cursor()
-        c.execute("""
-            INSERT INTO users (username, password, email, role)
-            VALUES (?, ?, ?, ?)
-        """, (username, password, email, role))
-        conn.commit()
-        return c.lastrowid
+        return get_services().users.register(username, password, email, role)
     except Error as e:
         st.error(f"Error adding user: {e}")
         return None
-    finally:
-        conn.close()
 
-def authenticate_user(username, password, role):
+def login_user(username, password, role):
+    # Verifies the password once and returns (user, session token); reruns
+    # then only look the token up
     try:
-        conn = get_db()
-        c = conn.cursor()
-        c.execute("""
-            SELECT * FROM users 
-            WHERE username = ? AND password = ? AND role = ?
-        """, (username, password, role))
-        return c.fetchone()
+        return get_services().users.login(username, password, role)
     except Error as e:
         st.error(f"Error authenticating user: {e}")
         return None
-    finally:
-        conn.close()
 
 # Updated Profile Section with Password Change
 def show_passenger_profile():
@@ -139,10 +102,7 @@ def show_passenger_profile():
         """,
         unsafe_allow_html=True
     )
-    conn = get_db()
-    user = conn.execute("SELECT * FROM users WHERE user_id = ?", 
-                       (st.session_state.user_id,)).fetchone()
-    conn.close()
+    user = get_services().users.get(st.session_state.user_id)
 
     st.subheader("Passenger Profile")
     
@@ -154,20 +114,29 @@ def show_passenger_profile():
                 <h3 style="margin-bottom: 15px;">Account Overview</h3>
                 <div style="margin-bottom: 10px;">
                     <label>Username</label>
-                    <div>{user['username']}</div>
+                    <div>{user.username}</div>
                 </div>
                 <div style="margin-bottom: 10px;">
                     <label>Member Since</label>
-                    <div>{datetime.datetime.strptime(user['created_at'], '%Y-%m-%d %H:%M:%S').strftime('%B %d, %Y')}</div>
+                    <div>{datetime.datetime.strptime(user.created_at, '%Y-%m-%d %H:%M:%S').strftime('%B %d, %Y')}</div>
                 </div>
             </div>
         """, unsafe_allow_html=True)
     
     with col2:
+        stats = get_services().bookings.stats(st.session_state.user_id)
+        upcoming, segments, seats = st.columns(3)
+        upcoming.metric("Upcoming Trips", stats.upcoming_trips)
+        segments.metric("Total Segments", stats.segments)
+        seats.metric("Seats Booked", stats.seats)
+        if stats.next_departure_ts is not None:
+            next_departure = datetime.datetime.fromtimestamp(stats.next_departure_ts, datetime.timezone.utc)
+            st.caption(f"Next departure: {next_departure:%B %d, %Y %H:%M} UTC")
+
         with st.expander("Personal Information", expanded=True):
             st.markdown(f"""
                 <table style="width:100%">
-                    <tr><td>Email Address</td><td>{user['email']}</td></tr>
+                    <tr><td>Email Address</td><td>{user.email}</td></tr>
                     <tr><td>Account Type</td><td>Passenger</td></tr>
                 </table>
             """, unsafe_allow_html=True)
@@ -183,21 +152,94 @@ def show_passenger_profile():
                         st.error("New passwords do not match")
                     else:
                         try:
-                            conn = get_db()
-                            db_password = conn.execute("SELECT password FROM users WHERE user_id = ?", 
-                                                     (st.session_state.user_id,)).fetchone()['password']
-                            
-                            if current_password != db_password:
-                                st.error("Current password is incorrect")
-                            else:
-                                conn.execute("UPDATE users SET password = ? WHERE user_id = ?",
-                                           (new_password, st.session_state.user_id))
-                                conn.commit()
+                            if get_services().users.change_password(st.session_state.user_id,
+                                                                    current_password, new_password,
+                                                                    keep_session=st.session_state.session_token):
                                 st.success("Password updated successfully")
+                            else:
+                                st.error("Current password is incorrect")
                         except Error as e:
                             st.error(f"Password update failed: {str(e)}")
-                        finally:
-                            conn.close()
+
+# Trip history: one summary-table page per rerun (airline.history)
+def my_bookings():
+    st.subheader("My Bookings")
+    page = st.session_state.setdefault("history_page", 0)
+    trips, stats = get_services().bookings.history(st.session_state.user_id, page)
+
+    if not stats.trips:
+        st.info("You have no bookings.")
+        return
+    if not trips:
+        # The history shrank since this page was chosen
+        st.session_state.history_page = (stats.trips - 1) // HISTORY_PAGE_SIZE
+        st.rerun()
+
+    for trip in trips:
+        when = "Upcoming" if trip.upcoming else "Past"
+        st.markdown(f"**{trip.route}** · {when} · {trip.status}")
+        for leg in trip.legs:
+            seats = ", ".join(leg.seats) or "—"
+            cancelled = f" (cancelled: {', '.join(leg.cancelled_seats)})" if leg.cancelled_seats else ""
+            st.markdown(f"- {leg.flight_number} {leg.origin}→{leg.destination} at {leg.departure_time}  \n"
+                        f"  Seats: {seats}{cancelled} · Flight {leg.flight_status}")
+        st.write("---")
+
+    first = page * HISTORY_PAGE_SIZE
+    st.caption(f"Showing {first + 1}–{first + len(trips)} of {stats.trips} trips")
+    col1, col2 = st.columns(2)
+    if col1.button("Previous", disabled=page == 0, key="history_prev"):
+        st.session_state.history_page = page - 1
+        st.rerun()
+    if col2.button("Next", disabled=first + len(trips) >= stats.trips, key="history_next"):
+        st.session_state.history_page = page + 1
+        st.rerun()
+
+# Typeahead pickers: a text box whose bounded matches fill a small selectbox
+def airport_picker(label, key):
+    text = st.text_input(label, key=f"{key}_query", placeholder="Code, city or airport name")
+    matches = {a.code: a.label for a in get_services().flights.search_airports(text)}
+    if not matches:
+        if text:
+            st.caption("No matching airports")
+        return None
+    return st.selectbox(f"{label} matches", list(matches), format_func=matches.get, key=key,
+                        label_visibility="collapsed")
+
+# upcoming_only=False searches every date (and archived flights when asked)
+# by number, airport or id; optional pickers return None (meaning "All")
+# until something is typed
+def flight_picker(label, key, upcoming_only=True, include_archived=False, optional=False):
+    placeholder = "Flight number, airport code or city" + ("" if upcoming_only else ", or flight id")
+    text = st.text_input(label, key=f"{key}_query", placeholder=placeholder)
+    if optional and not text.strip():
+        return None
+    matches = {f.flight_id: f for f in get_services().flights.search(text, upcoming_only=upcoming_only,
+                                                                     include_archived=include_archived)}
+    if not matches:
+        st.caption("No matching upcoming flights" if upcoming_only else "No matching flights")
+        return None
+    flight_id = st.selectbox(f"{label} matches", list(matches), key=key, label_visibility="collapsed",
+                             format_func=lambda i: matches[i].label)
+    return matches[flight_id]
+
+def show_connections(dep_airport, arr_airport, dep_date):
+    flights = get_services().flights
+    itineraries = flights.itineraries(dep_airport, arr_airport, dep_date, min_stops=1)
+    availability = flights.availability([leg.flight_id for it in itineraries for leg in it.legs])
+    # A leg deleted or archived since the graph last synced breaks the connection
+    itineraries = [it for it in itineraries if all(availability.get(leg.flight_id) for leg in it.legs)]
+
+    st.subheader("Connecting Itineraries")
+    if not itineraries:
+        st.info("No connecting itineraries found for this day.")
+    for it in itineraries:
+        st.write(it.summary())
+        for leg in it.legs:
+            st.write(f"- {leg.flight_number}: {leg.origin} {leg.departure_time} → {leg.destination}, "
+                     f"{availability[leg.flight_id].remaining} seat(s) left")
+        st.write(f"Layovers: {', '.join(f'{l // 3600}h {l % 3600 // 60:02d}m' for l in it.layovers)}")
+        st.write("---")
 
 def find_flights():
     st.markdown(
@@ -213,41 +255,45 @@ def find_flights():
         unsafe_allow_html=True
     )
     st.subheader("Find Flights")
+    # The airport pickers search as you type, so they sit outside the form
+    dep_airport = airport_picker("Departure Airport", "search_dep")
+    arr_airport = airport_picker("Arrival Airport", "search_arr")
     with st.form("flight_search"):
-        dep_airport = st.text_input("Departure Airport")
-        arr_airport = st.text_input("Arrival Airport")
         dep_date = st.date_input("Departure Date")
+        connections = st.checkbox("Include connecting flights (up to 2 stops)")
 
         if st.form_submit_button("Search"):
-            conn = get_db()
-            flights = conn.execute("""
-                SELECT * FROM flights 
-                WHERE departure_airport = ? 
-                AND arrival_airport = ? 
-                AND DATE(departure_time) = ?
-            """, (dep_airport, arr_airport, dep_date)).fetchall()
-            conn.close()
+            if not (dep_airport and arr_airport):
+                st.warning("Choose both airports first.")
+                return
+            # The date is a local calendar day at the departure airport
+            flights = get_services().flights.find(dep_airport, arr_airport, dep_date)
 
             if flights:
                 st.subheader("Available Flights")
                 for flight in flights:
-                    booked = get_booked_seats(flight['flight_id'])
-                    st.write(f"Flight {flight['flight_number']}")
-                    st.write(f"Departure: {flight['departure_time']}")
-                    st.write(f"Arrival: {flight['arrival_time']}")
-                    st.write(f"Available Seats: {flight['capacity'] - booked}")
+                    st.write(f"Flight {flight.flight_number}")
+                    st.write(f"Departure: {flight.departure_time}")
+                    st.write(f"Arrival: {flight.arrival_time}")
+                    st.write(f"Available Seats: {flight.remaining}")
                     st.write("---")
-            else:
+            elif not connections:
                 st.warning("No flights found matching your criteria.")
 
-def get_booked_seats(flight_id):
-    conn = get_db()
-    count = conn.execute("""
-        SELECT COUNT(*) FROM bookings 
-        WHERE flight_id = ? AND status = 'Confirmed'
-    """, (flight_id,)).fetchone()[0]
-    conn.close()
-    return count
+            if connections:
+                show_connections(dep_airport, arr_airport, dep_date)
+
+def update_seat_holds(flight_id, hold_token):
+    # Seat picker callback: runs before the fragment rerun, so it may rewrite the widget
+    chosen = st.session_state.seat_picker
+    selected = st.session_state.selected_seats
+    bookings = get_services().bookings
+    bookings.release(hold_token, flight_id, [s for s in selected if s not in chosen])
+    _, lost = bookings.hold(flight_id, [s for s in chosen if s not in selected], hold_token)
+    if lost:
+        st.session_state.seat_notice = f"Seat(s) {', '.join(lost)} were just taken by another passenger"
+    st.session_state.selected_seats = [s for s in chosen if s not in lost]
+    st.session_state.seat_picker = st.session_state.selected_seats
 
 def book_flight():
     st.markdown(
@@ -264,89 +310,57 @@ def book_flight():
     )
     st.subheader("Book a Flight")
 
-    conn = get_db()
-    all_flights = conn.execute("""
-        SELECT flight_id, flight_number, departure_airport, arrival_airport, departure_time
-        FROM flights
-        ORDER BY departure_time
-    """).fetchall()
-    conn.close()
-
-    if not all_flights:
-        st.warning("No flights available. Please ask an admin to add flights first.")
+    flight = flight_picker("Search Flight to Book", "book_flight")
+    if flight is None:
         return
-
-    flight_options = [
-        f"{f['flight_id']} - {f['flight_number']} ({f['departure_airport']}→{f['arrival_airport']} @ {f['departure_time']})"
-        for f in all_flights
-    ]
-    selected = st.selectbox("Select Flight to Book", flight_options)
-    flight_id = int(selected.split(" - ")[0])
+    flight_id = flight.flight_id
 
     num_seats = st.number_input("Number of Seats", min_value=1, max_value=10, value=1)
 
-    conn = get_db()
-    booked_seats = {row['seat_number'] for row in conn.execute("SELECT seat_number FROM bookings WHERE flight_id = ?", (flight_id,))}
-    conn.close()
-
-    seat_sections = {
-        "Business Class (Rows 2-11)": {
-            row: [f"{row}{seat}" for seat in ["A", "F"]]
-            for row in range(2, 12)
-        },
-        "Economy Class (Rows 20-30)": {
-            row: [f"{row}{seat}" for seat in ["A", "B", "C", "D", "E", "F"]]
-            for row in range(20, 31)
-        }
-    }
-
     if 'selected_seats' not in st.session_state:
         st.session_state.selected_seats = []
+    if 'hold_token' not in st.session_state:
+        st.session_state.hold_token = uuid.uuid4().hex
+    hold_token = st.session_state.hold_token
 
-    st.markdown("""
-    <style>
-    button[kind="secondary"] {
-        background-color: #4CAF50 !important;
-        color: white !important;
-    }
-    
-    button[kind="secondary"]:disabled {
-        background-color: #ff4444 !important;
-        color: white !important;
-    }
-    
-    button[kind="primary"] {
-        background-color: #FFEB3B !important;
-        color: black !important;
-    }
-    </style>
-    """, unsafe_allow_html=True)
-
-    for section_name, rows in seat_sections.items():
-        st.subheader(section_name)
-        for row_label, seats in rows.items():
-            cols = st.columns(len(seats))
-            for idx, seat in enumerate(seats):
-                with cols[idx]:
-                    is_booked = seat in booked_seats
-                    is_selected = seat in st.session_state.selected_seats
-                    btn_type = "primary" if is_selected else "secondary"
-                    
-                    if st.button(
-                        seat,
-                        key=f"seat_{seat}",
-                        disabled=is_booked,
-                        help="Booked" if is_booked else "Click to select",
-                        type=btn_type
-                    ):
-                        if seat in st.session_state.selected_seats:
-                            st.session_state.selected_seats.remove(seat)
-                        else:
-                            if len(st.session_state.selected_seats) < num_seats:
-                                st.session_state.selected_seats.append(seat)
-                            else:
-                                st.warning(f"You can select up to {num_seats} seats")
-                        st.rerun()
+    # Switching flights gives up the seats held on the previous one
+    if st.session_state.get('hold_flight_id') != flight_id:
+        get_services().bookings.release(hold_token)
+        st.session_state.selected_seats = []
+        st.session_state.hold_flight_id = flight_id
+        st.session_state.seat_picker_sync = True
+
+    seat_selection(flight, num_seats, hold_token)
+
+# Picking seats reruns only this fragment, not the flight search above it
+@st.fragment
+def seat_selection(flight, num_seats, hold_token):
+    flight_id = flight.flight_id
+    layout, booked_mask, held_mask = get_services().bookings.seat_map(flight_id, flight.layout_id, hold_token)
+    selected_mask = layout.mask(st.session_state.selected_seats)
+
+    capacity_issue = layout.capacity_issue(flight.capacity)
+    if capacity_issue:
+        st.warning(capacity_issue)
+
+    st.markdown(render_seat_map(layout, booked_mask, held_mask, selected_mask), unsafe_allow_html=True)
+
+    notice = st.session_state.pop('seat_notice', None)
+    if notice:
+        st.warning(notice)
+
+    # Selections are only writable before the widget is created
+    options = layout.labels(~(booked_mask | held_mask) & layout.full_mask | selected_mask)
+    if st.session_state.pop('seat_picker_sync', False):
+        st.session_state.seat_picker = [s for s in st.session_state.selected_seats if s in options]
+    st.multiselect(
+        "Choose Seats",
+        options,
+        key="seat_picker",
+        max_selections=num_seats,
+        on_change=update_seat_holds,
+        args=(flight_id, hold_token)
+    )
 
     if st.session_state.selected_seats:
         st.write(f"Selected seats: {', '.join(st.session_state.selected_seats)}")
@@ -357,30 +371,44 @@ def book_flight():
             return
 
         try:
-            conn = get_db()
-            current_booked = {row['seat_number'] for row in conn.execute("SELECT seat_number FROM bookings WHERE flight_id = ?", (flight_id,))}
-            
-            conflicting = set(st.session_state.selected_seats) & current_booked
-            if conflicting:
-                st.error(f"Seat(s) {', '.join(conflicting)} were just booked by someone else")
-                return
+            result = get_services().bookings.reserve(st.session_state.user_id, flight_id,
+                                                     st.session_state.selected_seats, holder=hold_token)
+        except (Error, ValueError) as e:
+            st.error(f"Booking failed: {e}")
+            return
 
-            for seat in st.session_state.selected_seats:
-                conn.execute("""
-                    INSERT INTO bookings (user_id, flight_id, seat_number)
-                    VALUES (?, ?, ?)
-                """, (st.session_state.user_id, flight_id, seat))
-            conn.commit()
+        if result.conflicts:
+            # Drop the lost seats so the user only has to re-pick those
+            st.session_state.selected_seats = [
+                seat for seat in st.session_state.selected_seats if seat not in result.conflicts
+            ]
+            st.session_state.seat_notice = f"Seat(s) {', '.join(result.conflicts)} were just booked by someone else"
+            st.session_state.seat_picker_sync = True
+            st.rerun(scope="fragment")
+        elif not result.ok:
+            st.error(f"Booking failed: {result.error}")
+        else:
             st.success(f"Successfully booked {num_seats} seat(s)!")
             st.session_state.selected_seats = []
-            st.rerun()
-        except Error as e:
-            conn.rollback()
-            st.error(f"Booking failed: {e}")
-        finally:
-            conn.close()
+            st.session_state.seat_picker_sync = True
+            st.rerun(scope="fragment")
 
 # Admin Pages
+def download_export(label, query, fmt, name):
+    st.download_button(f"{label} ({fmt.upper()})", export_bytes(get_pool(), query, fmt),
+                       file_name=f"{name}.{fmt}", mime=EXPORT_MIME_TYPES[fmt], key=f"download_{name}")
+
+def select_cabin_layout(layouts, current_layout_id=None):
+    ids = [l.layout_id for l in layouts]
+    by_id = {l.layout_id: l for l in layouts}
+    layout_id = st.selectbox(
+        "Aircraft / Cabin Layout",
+        ids,
+        index=ids.index(current_layout_id) if current_layout_id in by_id else 0,
+        format_func=lambda i: by_id[i].label
+    )
+    return by_id[layout_id]
+
 def manage_flights():
     st.markdown(
         """
@@ -395,13 +423,16 @@ def manage_flights():
         unsafe_allow_html=True
     )
     st.subheader("Manage Flights")
-    action = st.selectbox("Action", ["Add Flight", "Update Flight", "Delete Flight"])
+    action = st.selectbox("Action", ["Add Flight", "Update Flight", "Delete Flight", "Import Schedule"])
 
+    flights = get_services().flights
     if action == "Add Flight":
+        layout = select_cabin_layout(flights.layouts())
+        airports = {a.code: a.label for a in flights.airports()}
         with st.form("add_flight"):
             flight_number = st.text_input("Flight Name")
-            dep_airport = st.text_input("Departure Airport")
-            arr_airport = st.text_input("Arrival Airport")
+            dep_airport = st.selectbox("Departure Airport", list(airports), format_func=airports.get)
+            arr_airport = st.selectbox("Arrival Airport", list(airports), format_func=airports.get)
 
             col1, col2 = st.columns(2)
             with col1:
@@ -411,45 +442,43 @@ def manage_flights():
                 arr_date = st.date_input("Arrival Date")
                 arr_time = st.time_input("Arrival Time")
 
-            departure_datetime = f"{dep_date} {dep_time}"
-            arrival_datetime = f"{arr_date} {arr_time}"
-            capacity = st.number_input("Capacity", min_value=1)
+            # Capacity can never exceed the seats the layout can sell
+            capacity = st.number_input("Capacity", min_value=1,
+                                       max_value=layout.seat_count, value=layout.seat_count)
 
             if st.form_submit_button("Add Flight"):
                 try:
-                    conn = get_db()
-                    conn.execute("""
-                        INSERT INTO flights (
-                            flight_number, departure_airport, arrival_airport,
-                            departure_time, arrival_time, capacity
-                        ) VALUES (?, ?, ?, ?, ?, ?)
-                    """, (flight_number, dep_airport, arr_airport,
-                          departure_datetime, arrival_datetime, capacity))
-                    conn.commit()
+                    # Dates and times are local to each airport
+                    flights.create(flight_number, dep_airport, arr_airport,
+                                   datetime.datetime.combine(dep_date, dep_time),
+                                   datetime.datetime.combine(arr_date, arr_time),
+                                   capacity, layout.layout_id)
                     st.success("Flight added successfully!")
+                except ValueError as e:
+                    st.error(str(e))
                 except Error as e:
                     st.error(f"Error adding flight: {e}")
-                finally:
-                    conn.close()
 
     elif action == "Update Flight":
-        conn = get_db()
-        flights = conn.execute("SELECT * FROM flights").fetchall()
-        if flights:
-            flight_choice = st.selectbox(
-                "Select Flight",
-                [f"{f['flight_id']} - {f['flight_number']}" for f in flights]
-            )
-            flight_id = int(flight_choice.split(" - ")[0])
-            flight = conn.execute("SELECT * FROM flights WHERE flight_id = ?", (flight_id,)).fetchone()
+        picked = flight_picker("Select Flight", "update_flight", upcoming_only=False)
+        if picked:
+            flight_id = picked.flight_id
+            flight = flights.get(flight_id)
+            if flight is None:
+                st.warning("Flight not found")
+                return
+            layout = select_cabin_layout(flights.layouts(), flight.layout_id)
+            airports = {a.code: a.label for a in flights.airports()}
+            codes = list(airports)
+            # Edit in each airport's local time
+            current_dep, current_arr = flights.local_times(flight)
 
             with st.form("update_flight"):
-                new_number = st.text_input("Flight Number", value=flight['flight_number'])
-                new_dep = st.text_input("Departure Airport", value=flight['departure_airport'])
-                new_arr = st.text_input("Arrival Airport", value=flight['arrival_airport'])
-
-                current_dep = datetime.datetime.strptime(flight['departure_time'], '%Y-%m-%d %H:%M:%S')
-                current_arr = datetime.datetime.strptime(flight['arrival_time'], '%Y-%m-%d %H:%M:%S')
+                new_number = st.text_input("Flight Number", value=flight.flight_number)
+                new_dep = st.selectbox("Departure Airport", codes, format_func=airports.get,
+                                       index=codes.index(flight.departure_airport))
+                new_arr = st.selectbox("Arrival Airport", codes, format_func=airports.get,
+                                       index=codes.index(flight.arrival_airport))
 
                 col1, col2 = st.columns(2)
                 with col1:
@@ -459,50 +488,90 @@ def manage_flights():
                     new_arr_date = st.date_input("Arrival Date", value=current_arr.date())
                     new_arr_time = st.time_input("Arrival Time", value=current_arr.time())
 
-                new_dep_datetime = f"{new_dep_date} {new_dep_time}"
-                new_arr_datetime = f"{new_arr_date} {new_arr_time}"
-
-                new_cap = st.number_input("Capacity", value=flight['capacity'], min_value=1)
+                new_cap = st.number_input("Capacity", value=min(flight.capacity, layout.seat_count),
+                                          min_value=1, max_value=layout.seat_count)
                 new_status = st.selectbox(
                     "Status",
-                    ["Scheduled", "Delayed", "Cancelled"],
-                    index=["Scheduled", "Delayed", "Cancelled"].index(flight['status'])
+                    FLIGHT_STATUSES,
+                    index=FLIGHT_STATUSES.index(flight.status)
                 )
 
                 if st.form_submit_button("Update Flight"):
-                    conn.execute("""
-                        UPDATE flights SET
-                            flight_number = ?,
-                            departure_airport = ?,
-                            arrival_airport = ?,
-                            departure_time = ?,
-                            arrival_time = ?,
-                            capacity = ?,
-                            status = ?
-                        WHERE flight_id = ?
-                    """, (new_number, new_dep, new_arr, new_dep_datetime,
-                          new_arr_datetime, new_cap, new_status, flight_id))
-                    conn.commit()
-                    st.success("Flight updated successfully!")
-        conn.close()
+                    # Capacity may not drop below the seats already sold
+                    try:
+                        updated, cancelled_bookings = flights.update(
+                            flight_id, new_number, new_dep, new_arr,
+                            datetime.datetime.combine(new_dep_date, new_dep_time),
+                            datetime.datetime.combine(new_arr_date, new_arr_time),
+                            new_cap, layout.layout_id, new_status)
+                    except ValueError as e:
+                        st.error(str(e))
+                        return
+                    except Error as e:
+                        st.error(f"Error updating flight: {e}")
+                        return
+                    if updated:
+                        st.success("Flight updated successfully!")
+                        if cancelled_bookings:
+                            st.info(f"Cancelled {cancelled_bookings} booking(s) on this flight")
+                    else:
+                        st.error(f"Capacity cannot be lower than the {flight.booked_count} seat(s) already booked")
 
     elif action == "Delete Flight":
-        conn = get_db()
-        flights = conn.execute("SELECT * FROM flights").fetchall()
-        if flights:
-            flight_choice = st.selectbox(
-                "Select Flight to Delete",
-                [f"{f['flight_id']} - {f['flight_number']}" for f in flights]
-            )
-            flight_id = int(flight_choice.split(" - ")[0])
+        picked = flight_picker("Select Flight to Delete", "delete_flight", upcoming_only=False)
+        if picked:
+            flight_id = picked.flight_id
+            flight = flights.get(flight_id)
+            if flight is None:
+                st.warning("Flight not found")
+                return
 
             with st.form("delete_flight"):
                 st.warning("Are you sure you want to delete this flight?")
+                st.write(f"This also removes its {flight.booked_count} confirmed booking(s) "
+                         "and all crew assignments.")
                 if st.form_submit_button("Confirm Delete"):
-                    conn.execute("DELETE FROM flights WHERE flight_id = ?", (flight_id,))
-                    conn.commit()
-                    st.success("Flight deleted successfully!")
-        conn.close()
+                    try:
+                        result = flights.delete(flight_id)
+                    except Error as e:
+                        st.error(f"Error deleting flight: {e}")
+                        return
+                    if result is None:
+                        st.error("Flight not found")
+                    else:
+                        st.success(f"Flight deleted successfully! ({result.summary()})")
+
+    elif action == "Import Schedule":
+        import_schedule()
+
+def import_schedule():
+    st.caption("Columns: flight_number, departure_airport, arrival_airport, departure_time, arrival_time, "
+               "capacity, and optionally layout and status. Times are local to each airport.")
+    with st.form("import_schedule"):
+        upload = st.file_uploader("Schedule file", type=["csv", "parquet"])
+        submitted = st.form_submit_button("Import")
+    if not (submitted and upload):
+        return
+
+    status = st.empty()
+    # Rejected rows go to disk, not memory, however many there are
+    with tempfile.TemporaryFile("w+", newline="", encoding="utf-8") as rejects:
+        try:
+            result = get_services().flights.import_schedule(
+                upload, reject_file=rejects,
+                progress=lambda r: status.write(f"{r.read:,} rows read..."))
+        except (ImportFormatError, Error) as e:
+            status.empty()
+            st.error(f"Import failed: {e}")
+            return
+        status.empty()
+        st.success(result.summary())
+        if result.rejected:
+            st.warning("Rejected rows (first few):\n" +
+                       "\n".join(f"- line {r.line}: {r.reason}" for r in result.samples))
+            rejects.seek(0)
+            st.download_button("Download all rejected rows", rejects.read(),
+                               file_name="rejected_rows.csv", mime="text/csv")
 
 def flight_overview():
     st.markdown(
@@ -519,51 +588,139 @@ def flight_overview():
     )
     st.subheader("Flight Management")
 
-    conn = get_db()
-    flights = conn.execute("SELECT * FROM flights ORDER BY departure_time DESC").fetchall()
-
-    if not flights:
-        st.warning("No flights found in the system")
+    include_archived = st.checkbox("Include archived flights")
+    services = get_services()
+    picked = flight_picker("Select Flight to View Details", "overview_flight", upcoming_only=False,
+                           include_archived=include_archived)
+    if picked is None:
         return
-
-    flight_options = [
-        f"{f['flight_id']} - {f['flight_number']} ({f['departure_airport']} to {f['arrival_airport']})"
-        for f in flights
-    ]
-    selected_flight = st.selectbox("Select Flight to View Details", flight_options)
-    flight_id = int(selected_flight.split(" - ")[0])
-    flight_details = conn.execute("SELECT * FROM flights WHERE flight_id = ?", (flight_id,)).fetchone()
+    flight_id = picked.flight_id
+    # Counters change with every booking, so the details are read fresh
+    flight_details = services.flights.get(flight_id, include_archived)
+    if flight_details is None:
+        st.warning("This flight no longer exists")
+        return
+    archived = flight_details.archived
 
     st.subheader("Flight Details")
     col1, col2 = st.columns(2)
     with col1:
         st.markdown(f"""
-            **Flight Number:** {flight_details['flight_number']}  
-            **Departure:** {flight_details['departure_airport']}  
-            **Departure Time:** {flight_details['departure_time']}  
-            **Status:** {flight_details['status']}
+            **Flight Number:** {flight_details.flight_number}  
+            **Departure:** {flight_details.departure_airport}  
+            **Departure Time:** {flight_details.departure_time}  
+            **Status:** {flight_details.status}{" (Archived)" if archived else ""}
         """)
     with col2:
         st.markdown(f"""
-            **Arrival:** {flight_details['arrival_airport']}  
-            **Arrival Time:** {flight_details['arrival_time']}  
-            **Capacity:** {flight_details['capacity']}  
-            **Booked Seats:** {get_booked_seats(flight_id)}
+            **Arrival:** {flight_details.arrival_airport}  
+            **Arrival Time:** {flight_details.arrival_time}  
+            **Capacity:** {flight_details.capacity}  
+            **Booked Seats:** {flight_details.booked_count}
         """)
 
     st.subheader("Assigned Crew Members")
-    crew_members = conn.execute("SELECT crew_name, role, contact_info FROM crew WHERE flight_id = ?", (flight_id,)).fetchall()
+    crew_members = services.crew.for_flight(flight_id, include_archived)
     if crew_members:
         for member in crew_members:
             st.markdown(f"""
-                **Name:** {member['crew_name']}  
-                **Role:** {member['role']}  
-                **Contact:** {member['contact_info']}
+                **Name:** {member.crew_name}  
+                **Role:** {member.role}  
+                **Contact:** {member.contact_info}
             """)
             st.write("---")
     else:
         st.info("No crew members assigned to this flight")
-    conn.close()
+
+    st.subheader("Downloads")
+    fmt = st.radio("Format", EXPORT_FORMATS, horizontal=True, key="overview_export_format")
+    # Files are only rendered on request, not on every rerun of the page
+    if st.button("Prepare Exports", key="overview_prepare_export"):
+        col1, col2 = st.columns(2)
+        with col1:
+            download_export("Passenger Manifest", manifest_query(flight_id, include_archived),
+                            fmt, f"manifest_{flight_details.flight_number}_{flight_id}")
+        with col2:
+            download_export("Crew Roster", roster_query(flight_id, include_archived),
+                            fmt, f"crew_{flight_details.flight_number}_{flight_id}")
+
+# Operations dashboard: every figure is a cached SQL aggregate
+# (airline.analytics), so a rerun reads at most a few hundred grouped rows
+def operations_dashboard():
+    st.subheader("Operations Dashboard")
+    today = datetime.date.today()
+    col1, col2 = st.columns(2)
+    with col1:
+        span = st.date_input("Departure Dates (UTC)", (today - datetime.timedelta(days=30),
+                                                       today + datetime.timedelta(days=30)))
+    with col2:
+        airport = airport_picker("Airport (optional)", "dashboard_airport")
+    if not isinstance(span, (tuple, list)) or len(span) != 2:
+        st.info("Choose a first and last departure date")
+        return
+    first, last = span
+
+    analytics = get_services().analytics
+    days = analytics.days(first, last, airport)
+    if not days:
+        st.info("No flights depart in this range")
+        return
+
+    flights = sum(d.flights for d in days)
+    capacity = sum(d.capacity for d in days)
+    booked = sum(d.booked for d in days)
+    delayed = sum(d.delayed for d in days)
+    cancelled = sum(d.cancelled for d in days)
+    cols = st.columns(5)
+    cols[0].metric("Flights", flights)
+    cols[1].metric("Load Factor", f"{booked / capacity:.1%}" if capacity else "—")
+    cols[2].metric("Seats Sold", booked)
+    cols[3].metric("Delayed", f"{delayed / flights:.1%}")
+    cols[4].metric("Cancelled", f"{cancelled / flights:.1%}")
+    st.caption(f"Figures refresh every {ANALYTICS_TTL} seconds")
+
+    labels = [d.day for d in days]
+    load = go.Figure(go.Scatter(x=labels, y=[d.load_factor for d in days], mode="lines+markers"))
+    load.update_layout(title="Load Factor by Day", yaxis_tickformat=".0%", yaxis_range=[0, 1])
+    st.plotly_chart(load, use_container_width=True)
+
+    status = go.Figure([
+        go.Bar(name="On Schedule", x=labels, y=[d.flights - d.delayed - d.cancelled for d in days]),
+        go.Bar(name="Delayed", x=labels, y=[d.delayed for d in days]),
+        go.Bar(name="Cancelled", x=labels, y=[d.cancelled for d in days]),
+    ])
+    status.update_layout(title="Flights by Status", barmode="stack")
+    st.plotly_chart(status, use_container_width=True)
+
+    col1, col2 = st.columns(2)
+    with col1:
+        routes = analytics.routes(first, last, airport)
+        chart = go.Figure(go.Bar(x=[r.load_factor for r in routes], y=[r.route for r in routes], orientation="h",
+                                 text=[f"{r.flights} flights" for r in routes]))
+        chart.update_layout(title="Busiest Routes by Load Factor", xaxis_tickformat=".0%",
+                            yaxis_autorange="reversed")
+        st.plotly_chart(chart, use_container_width=True)
+    with col2:
+        curve = analytics.booking_curve(first, last, airport)
+        chart = go.Figure([
+            go.Scatter(name="Bookings", x=[c.days_before for c in curve], y=[c.bookings for c in curve]),
+            go.Scatter(name="Cancelled", x=[c.days_before for c in curve], y=[c.cancellations for c in curve]),
+        ])
+        chart.update_layout(title="Booking Curve", xaxis_title=f"Days before departure ({CURVE_DAYS} = or more)",
+                            xaxis_autorange="reversed")
+        st.plotly_chart(chart, use_container_width=True)
+
+    for title, emptiest in (("Fullest Flights", False), ("Emptiest Flights", True)):
+        st.markdown(f"**{title}**")
+        st.dataframe([
+            {"Flight": f.flight_id, "Number": f.flight_number, "Route": f"{f.origin}→{f.destination}",
+             "Departure": f.departure_time, "Booked": f.booked, "Capacity": f.capacity,
+             "Load Factor": f"{f.load_factor:.0%}", "Status": f.status}
+            for f in analytics.flights(first, last, airport, emptiest=emptiest)
+        ], hide_index=True, use_container_width=True)
+
+CREW_TABLE_COLUMNS = ["crew_id", "flight_number", "departure_time", "crew_name", "role", "contact_info"]
+ROLE_INDEX = {role: i for i, role in enumerate(CREW_ROLES)}
 
 def manage_crew():
     st.markdown(
@@ -579,110 +736,299 @@ def manage_crew():
         unsafe_allow_html=True
     )
     st.subheader("Manage Crew Members")
-    action = st.selectbox("Action", ["Add Crew", "Update Crew", "Delete Crew"])
+    action = st.selectbox("Action", ["Assignments", "Flight Crew", "Crew Members", "Auto-Assign"])
+
+    notice = st.session_state.pop('crew_notice', None)
+    if notice:
+        st.success(notice)
+
+    # Cached id-keyed dicts; the only crew query per rerun is the page or
+    # flight being shown
+    members = get_services().crew.members()
+    if action == "Assignments":
+        crew_assignments(members)
+    elif action == "Flight Crew":
+        edit_flight_crew(members)
+    elif action == "Crew Members":
+        edit_crew_members(members)
+    elif action == "Auto-Assign":
+        auto_assign_crew(members)
+
+    with st.expander("Export full crew roster"):
+        fmt = st.radio("Format", EXPORT_FORMATS, horizontal=True, key="roster_export_format")
+        if st.button("Prepare Export"):
+            download_export("Download Roster", roster_query(), fmt, "crew_roster")
+
+def show_violations(violations, members):
+    for v in violations:
+        name = members[v.member_id].name if v.member_id in members else f"Member {v.member_id}"
+        st.warning(f"{name}: {v.kind} — {v.detail} (flights {', '.join(map(str, v.flight_ids))})")
+
+def crew_assignments(members):
+    services = get_services()
+
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        flight = flight_picker("Flight", "crew_filter_flight", upcoming_only=False, optional=True)
+        flight_id = flight.flight_id if flight else None
+    with col2:
+        member_id = st.selectbox("Crew Member", [None, *members],
+                                 format_func=lambda i: "All" if i is None else members[i].label)
+    with col3:
+        role = st.selectbox("Role", ["All", *CREW_ROLES])
+    with col4:
+        day = st.date_input("Departure Day (UTC)", value=None)
+    filters = CrewFilter(flight_id=flight_id, member_id=member_id, role=None if role == "All" else role, day=day)
+
+    # One keyset cursor per visited page; any filter change starts over
+    if st.session_state.get('crew_filters') != filters:
+        st.session_state.crew_filters = filters
+        st.session_state.crew_cursors = [None]
+    cursors = st.session_state.crew_cursors
+
+    total = services.crew.count(filters)
+    rows = services.crew.page(filters, after=cursors[-1], limit=CREW_PAGE_SIZE + 1)
+    has_next = len(rows) > CREW_PAGE_SIZE
+    rows = rows[:CREW_PAGE_SIZE]
+    if not rows:
+        st.info("No crew assignments found.")
+        return
 
-    conn = get_db()
-    flights = conn.execute("SELECT flight_id, flight_number, departure_time FROM flights").fetchall()
+    first = (len(cursors) - 1) * CREW_PAGE_SIZE + 1
+    st.caption(f"Showing {first}-{first + len(rows) - 1} of {total} assignments")
 
-    if action == "Add Crew":
-        with st.form("add_crew_form"):
-            if flights:
-                flight_choice = st.selectbox(
-                    "Select Flight",
-                    [f"{f['flight_id']} - {f['flight_number']} ({f['departure_time'].split()[0]})" for f in flights]
-                )
-                flight_id = int(flight_choice.split(" - ")[0])
-                crew_name = st.text_input("Crew Member Name")
-                role = st.selectbox("Role", ["Pilot", "Co-Pilot", "Flight Attendant", "Engineer", "Catering Manager", "Hostess"])
-                contact = st.text_input("Contact Information")
-
-                if st.form_submit_button("Add Crew Member"):
-                    conn.execute("""
-                        INSERT INTO crew (flight_id, crew_name, role, contact_info)
-                        VALUES (?, ?, ?, ?)
-                    """, (flight_id, crew_name, role, contact))
-                    conn.commit()
-                    st.success("Crew member added successfully!")
-            else:
-                st.warning("No flights available. Please add flights first.")
-    elif action == "Update Crew":
-        crew_members = conn.execute("SELECT c.*, f.flight_number FROM crew c JOIN flights f ON c.flight_id = f.flight_id").fetchall()
-        if crew_members:
-            crew_choice = st.selectbox(
-                "Select Crew Member to Update",
-                [f"{c['crew_name']} - {c['role']} (Flight {c['flight_number']})" for c in crew_members]
-            )
-            selected_index = [f"{c['crew_name']} - {c['role']} (Flight {c['flight_number']})" for c in crew_members].index(crew_choice)
-            selected_crew = crew_members[selected_index]
-
-            with st.form("update_crew_form"):
-                new_flight_choice = st.selectbox(
-                    "Select New Flight",
-                    [f"{f['flight_id']} - {f['flight_number']} ({f['departure_time'].split()[0]})" for f in flights],
-                    index=[f['flight_id'] for f in flights].index(selected_crew['flight_id'])
-                )
-                new_flight_id = int(new_flight_choice.split(" - ")[0])
-                new_name = st.text_input("Name", value=selected_crew['crew_name'])
-                new_role = st.selectbox(
-                    "Role",
-                    ["Pilot", "Co-Pilot", "Flight Attendant", "Engineer", "Catering Manager", "Hostess"],
-                    index=["Pilot", "Co-Pilot", "Flight Attendant", "Engineer", "Catering Manager", "Hostess"].index(selected_crew['role'])
-                )
-                new_contact = st.text_input("Contact Info", value=selected_crew['contact_info'])
-
-                if st.form_submit_button("Update Crew Member"):
-                    conn.execute("""
-                        UPDATE crew SET
-                            flight_id = ?,
-                            crew_name = ?,
-                            role = ?,
-                            contact_info = ?
-                        WHERE crew_id = ?
-                    """, (new_flight_id, new_name, new_role, new_contact, selected_crew['crew_id']))
-                    conn.commit()
-                    st.success("Crew member updated successfully!")
-        else:
-            st.warning("No crew members found")
-    elif action == "Delete Crew":
-        crew_members = conn.execute("SELECT c.*, f.flight_number FROM crew c JOIN flights f ON c.flight_id = f.flight_id").fetchall()
-        if crew_members:
-            crew_choice = st.selectbox(
-                "Select Crew Member to Delete",
-                [f"{c['crew_name']} - {c['role']} (Flight {c['flight_number']})" for c in crew_members]
-            )
-            selected_index = [f"{c['crew_name']} - {c['role']} (Flight {c['flight_number']})" for c in crew_members].index(crew_choice)
-            selected_crew = crew_members[selected_index]
-
-            with st.form("delete_crew_form"):
-                st.warning(f"Are you sure you want to delete {selected_crew['crew_name']}?")
-                if st.form_submit_button("Confirm Delete"):
-                    conn.execute("DELETE FROM crew WHERE crew_id = ?", (selected_crew['crew_id'],))
-                    conn.commit()
-                    st.success("Crew member deleted successfully!")
-        else:
-            st.warning("No crew members found")
-
-    st.subheader("Current Crew Assignments")
-    current_crew = conn.execute("""
-        SELECT f.flight_number, c.crew_name, c.role, c.contact_info 
-        FROM crew c 
-        JOIN flights f ON c.flight_id = f.flight_id
-        ORDER BY f.departure_time
-    """).fetchall()
-    if current_crew:
-        for crew in current_crew:
-            st.write(f"**Flight {crew['flight_number']}**")
-            st.write(f"Name: {crew['crew_name']}")
-            st.write(f"Role: {crew['role']}")
-            st.write(f"Contact: {crew['contact_info']}")
-            st.write("---")
+    edited = st.data_editor(
+        [{"Select": False, **{c: getattr(crew, c) for c in CREW_TABLE_COLUMNS}} for crew in rows],
+        key=f"crew_page_{len(cursors)}",
+        hide_index=True,
+        use_container_width=True,
+        disabled=CREW_TABLE_COLUMNS,
+        column_config={"Select": st.column_config.CheckboxColumn("Select")}
+    )
+    selected_ids = [r['crew_id'] for r in edited if r['Select']]
+
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        if st.button("◀ Previous", disabled=len(cursors) == 1):
+            cursors.pop()
+            st.rerun()
+    with col2:
+        if st.button("Next ▶", disabled=not has_next):
+            cursors.append(rows[-1].cursor)
+            st.rerun()
+    with col3:
+        if st.button(f"🗑️ Remove Selected ({len(selected_ids)})", disabled=not selected_ids):
+            st.session_state.crew_notice = f"Removed {services.crew.delete(selected_ids)} crew assignment(s)"
+            st.rerun()
+
+def edit_flight_crew(members):
+    flight = flight_picker("Flight", "crew_flight")
+    if flight is None:
+        return
+    services = get_services()
+    crew = services.crew.for_flight(flight.flight_id)
+
+    # Selectbox cells hold labels; map them back to ids with a dict
+    on_flight = {c.member_id for c in crew}
+    options = {f"{i} - {m.label}": i for i, m in members.items() if m.active or i in on_flight}
+    labels = {i: label for label, i in options.items()}
+
+    st.caption("Add, change or delete rows, then save them all at once. "
+               "Leave Role empty to use the member's own role.")
+    version = st.session_state.get('crew_editor_version', 0)
+    edited = st.data_editor(
+        [{"crew_id": c.crew_id, "Member": labels.get(c.member_id), "Role": c.role} for c in crew],
+        key=f"flight_crew_{flight.flight_id}_{version}",
+        num_rows="dynamic",
+        hide_index=True,
+        use_container_width=True,
+        disabled=["crew_id"],
+        column_config={
+            "crew_id": st.column_config.NumberColumn("Assignment"),
+            "Member": st.column_config.SelectboxColumn("Member", options=list(options), required=True),
+            "Role": st.column_config.SelectboxColumn("Role", options=CREW_ROLES),
+        }
+    )
+    force = st.checkbox("Save anyway if it breaks the duty rules")
+
+    if st.button("Save Flight Crew"):
+        rows = [(r.get("crew_id") or None, options[r["Member"]], r.get("Role") or None)
+                for r in edited if r.get("Member") in options]
+        try:
+            result = services.crew.save_flight(flight.flight_id, rows, force=force)
+        except (Error, ValueError) as e:
+            st.error(f"Saving the crew failed: {str(e)}")
+            return
+        show_violations(result.violations, members)
+        if not result.saved:
+            st.error("Nothing saved: some crew would break the duty rules. "
+                     "Tick \"Save anyway\" to override.")
+            return
+        st.session_state.crew_notice = result.summary()
+        st.session_state.crew_editor_version = version + 1
+        if not result.violations:
+            st.rerun()
+
+def edit_crew_members(members):
+    member_id = st.selectbox("Crew Member", [None, *members],
+                             format_func=lambda i: "New crew member" if i is None else members[i].label)
+    member = members.get(member_id)
+    # home_base references airports(code), so only offer known airports
+    airports = {None: "None", **{a.code: a.label for a in get_services().flights.airports()}}
+    bases = list(airports)
+    with st.form("crew_member_form"):
+        name = st.text_input("Name", value=member.name if member else "")
+        role = st.selectbox("Role", CREW_ROLES, index=ROLE_INDEX.get(member.role, 0) if member else 0)
+        contact = st.text_input("Contact Information", value=(member.contact_info or "") if member else "")
+        home_base = st.selectbox("Home Base", bases, format_func=airports.get,
+                                 index=bases.index(member.home_base) if member and member.home_base in airports else 0)
+        active = st.checkbox("Active", value=bool(member.active) if member else True)
+
+        if st.form_submit_button("Save Crew Member"):
+            if not name:
+                st.error("Name is required")
+                return
+            try:
+                if member is None:
+                    get_services().crew.add_member(name, role, contact, home_base)
+                    st.session_state.crew_notice = "Crew member added successfully!"
+                else:
+                    get_services().crew.update_member(member_id, name, role, contact, home_base, active)
+                    st.session_state.crew_notice = "Crew member updated successfully!"
+            except Error as e:
+                # IntegrityError included, e.g. an airport deleted meanwhile
+                st.error(f"Error saving crew member: {e}")
+                return
+            st.rerun()
+
+def auto_assign_crew(members):
+    st.caption("Staffs open positions (1 Pilot, 1 Co-Pilot, 2 Flight Attendants) on a UTC day's flights "
+               "from crew at the departure airport, respecting overlap, duty and rest rules.")
+    day = st.date_input("Day (UTC)", value=datetime.date.today())
+    col1, col2 = st.columns(2)
+    if col1.button("Check Conflicts"):
+        violations = get_services().crew.conflicts(day)
+        show_violations(violations, members)
+        if not violations:
+            st.success("No crew conflicts on this day")
+    if col2.button("Auto-Assign Crew"):
+        plan = get_services().crew.auto_assign(day)
+        st.success(plan.summary())
+        for flight_id, role, missing in plan.unfilled:
+            st.write(f"Flight {flight_id}: {missing} {role} position(s) still open")
+
+BOOKING_TABLE_COLUMNS = ["booking_id", "username", "flight_number", "departure_airport", "arrival_airport",
+                         "departure_time", "seat_number", "status", "booking_date"]
+
+def manage_bookings():
+    st.subheader("All Bookings")
+
+    bookings = get_services().bookings
+
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        flight = flight_picker("Flight", "bookings_filter_flight", upcoming_only=False, optional=True)
+        flight_id = flight.flight_id if flight else None
+    with col2:
+        username = st.text_input("User").strip()
+    with col3:
+        status = st.selectbox("Status", ["All", "Confirmed", "Cancelled"])
+    with col4:
+        date_range = st.date_input("Booked Between", value=())
+    filters = BookingFilter(
+        flight_id=flight_id,
+        username=username or None,
+        status=None if status == "All" else status,
+        date_from=date_range[0] if len(date_range) > 0 else None,
+        date_to=date_range[1] if len(date_range) > 1 else None
+    )
+
+    # One keyset cursor per visited page; any filter change starts over
+    if st.session_state.get('booking_filters') != filters:
+        st.session_state.booking_filters = filters
+        st.session_state.booking_cursors = [None]
+    cursors = st.session_state.booking_cursors
+
+    notice = st.session_state.pop('bookings_notice', None)
+    if notice:
+        st.success(notice)
+
+    total = bookings.count(filters)
+    rows = bookings.page(filters, after=cursors[-1], limit=PAGE_SIZE + 1)
+    has_next = len(rows) > PAGE_SIZE
+    rows = rows[:PAGE_SIZE]
+
+    if not rows:
+        st.info("No bookings found.")
+        return
+
+    first = (len(cursors) - 1) * PAGE_SIZE + 1
+    st.caption(f"Showing {first}-{first + len(rows) - 1} of {total} bookings")
+
+    edited = st.data_editor(
+        [{"Select": False, **{c: getattr(bk, c) for c in BOOKING_TABLE_COLUMNS}} for bk in rows],
+        key=f"bookings_page_{len(cursors)}",
+        hide_index=True,
+        use_container_width=True,
+        disabled=BOOKING_TABLE_COLUMNS,
+        column_config={"Select": st.column_config.CheckboxColumn("Select")}
+    )
+    selected_ids = [r['booking_id'] for r in edited if r['Select']]
+
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        if st.button("◀ Previous", disabled=len(cursors) == 1):
+            cursors.pop()
+            st.rerun()
+    with col2:
+        if st.button("Next ▶", disabled=not has_next):
+            cursors.append(rows[-1].cursor)
+            st.rerun()
+    with col3:
+        cancel_selected = st.button(f"Cancel Selected ({len(selected_ids)})", disabled=not selected_ids)
+    with col4:
+        delete_selected = st.button(f"🗑️ Delete Selected ({len(selected_ids)})", disabled=not selected_ids)
+
+    with st.expander(f"Export all {total} matching booking(s)"):
+        fmt = st.radio("Format", EXPORT_FORMATS, horizontal=True, key="bookings_export_format")
+        # Rendered only on request; a filter can match the whole table
+        if st.button("Prepare Export"):
+            download_export("Download Bookings", bookings_query(filters), fmt, "bookings")
+
+    with st.expander(f"Bulk Actions on all {total} matching booking(s)"):
+        confirm_all = st.checkbox("I understand this applies to every booking matching the filters")
+        col1, col2 = st.columns(2)
+        with col1:
+            cancel_all = st.button("Cancel All Matching", disabled=not confirm_all)
+        with col2:
+            delete_all = st.button("🗑️ Delete All Matching", disabled=not confirm_all)
+
+    try:
+        result = None
+        if cancel_selected:
+            result = bookings.cancel(selected_ids)
+        elif delete_selected:
+            result = bookings.delete(selected_ids)
+        elif cancel_all:
+            result = bookings.cancel_matching(filters)
+        elif delete_all:
+            result = bookings.delete_matching(filters)
+    except Error as e:
+        st.error(f"Bulk operation failed: {e}")
     else:
-        st.info("No crew members assigned to any flights")
-    conn.close()
+        if result:
+            st.session_state.bookings_notice = result.summary()
+            st.session_state.booking_cursors = [None]
+            st.rerun()
 
 def main():
     set_background()
-    create_tables()
+    try:
+        init_db()
+        run_archiver()
+    except Error as e:
+        st.error(f"Error initializing database: {e}")
+        st.stop()
 
     st.markdown("""
         <style>
@@ -726,11 +1072,18 @@ def main():
         </style>
     """, unsafe_allow_html=True)
 
+    # A session expires, or is signed out by a password change elsewhere
+    if (st.session_state.get('logged_in')
+            and get_services().users.session(st.session_state.get('session_token')) is None):
+        st.session_state.clear()
+        st.warning("Your session has ended. Please log in again.")
+
     if 'logged_in' not in st.session_state:
         st.session_state.update({
             'logged_in': False,
             'role': None,
             'user_id': None,
+            'session_token': None,
             'menu': None
         })
 
@@ -745,11 +1098,13 @@ def main():
                     username = st.text_input("Username")
                     password = st.text_input("Password", type="password")
                     if st.form_submit_button("Login"):
-                        user = authenticate_user(username, password, "passenger")
-                        if user:
+                        result = login_user(username, password, "passenger")
+                        if result:
+                            user, token = result
                             st.session_state.logged_in = True
                             st.session_state.role = "passenger"
-                            st.session_state.user_id = user['user_id']
+                            st.session_state.user_id = user.user_id
+                            st.session_state.session_token = token
                             st.session_state.menu = "Profile"
                             st.rerun()
                         else:
@@ -767,11 +1122,13 @@ def main():
                 username = st.text_input("Username")
                 password = st.text_input("Password", type="password")
                 if st.form_submit_button("Login"):
-                    user = authenticate_user(username, password, "admin")
-                    if user:
+                    result = login_user(username, password, "admin")
+                    if result:
+                        user, token = result
                         st.session_state.logged_in = True
                         st.session_state.role = "admin"
-                        st.session_state.user_id = user['user_id']
+                        st.session_state.user_id = user.user_id
+                        st.session_state.session_token = token
                         st.session_state.menu = "Flight Overview"
                         st.rerun()
                     else:
@@ -783,7 +1140,7 @@ def main():
         if st.session_state.role == "passenger":
             menu_options = ["Profile", "Find Flights", "Book Flight", "My Bookings", "Logout"]
         else:
-            menu_options = ["Flight Overview", "Manage Flights", "Manage Crew", "Manage Bookings", "Logout"]
+            menu_options = ["Flight Overview", "Dashboard", "Manage Flights", "Manage Crew", "Manage Bookings", "Logout"]
         
         cols = st.columns(len(menu_options))
         for i, option in enumerate(menu_options):
@@ -797,12 +1154,18 @@ def main():
                     use_container_width=True
                 ):
                     if option == "Logout":
+                        if 'hold_token' in st.session_state:
+                            get_services().bookings.release(st.session_state.hold_token)
+                        get_services().users.logout(st.session_state.session_token)
                         st.session_state.clear()
                         st.rerun()
                     else:
                         st.session_state.menu = option
                         st.rerun()
 
+        if st.session_state.role == "admin":
+            show_pool_metrics()
+
         if st.session_state.role == "passenger":
             if st.session_state.menu == "Profile":
                 show_passenger_profile()
@@ -811,80 +1174,19 @@ def main():
             elif st.session_state.menu == "Book Flight":
                 book_flight()
             elif st.session_state.menu == "My Bookings":
-                conn = get_db()
-                bookings = conn.execute("""
-                    SELECT b.booking_id, f.flight_number, f.departure_airport, f.arrival_airport, 
-                           f.departure_time, b.seat_number, b.booking_date
-                    FROM bookings b
-                    JOIN flights f ON b.flight_id = f.flight_id
-                    WHERE b.user_id = ?
-                    ORDER BY b.booking_date DESC
-                """, (st.session_state.user_id,)).fetchall()
-                conn.close()
-
-                st.subheader("My Bookings")
-                if bookings:
-                    for bk in bookings:
-                        st.markdown(f"""
-                            **Booking ID:** {bk['booking_id']}  
-                            **Flight:** {bk['flight_number']} ({bk['departure_airport']}→{bk['arrival_airport']})  
-                            **Departure Time:** {bk['departure_time']}  
-                            **Seat:** {bk['seat_number']}  
-                            **Booked At:** {bk['booking_date']}  
-                        """)
-                        st.write("---")
-                else:
-                    st.info("You have no bookings.")
+                my_bookings()
 
         elif st.session_state.role == "admin":
             if st.session_state.menu == "Flight Overview":
                 flight_overview()
+            elif st.session_state.menu == "Dashboard":
+                operations_dashboard()
             elif st.session_state.menu == "Manage Flights":
                 manage_flights()
             elif st.session_state.menu == "Manage Crew":
                 manage_crew()
             elif st.session_state.menu == "Manage Bookings":
-                conn = get_db()
-                all_bookings = conn.execute("""
-                    SELECT b.booking_id, u.username, f.flight_number, f.departure_airport, 
-                        f.arrival_airport, f.departure_time, b.seat_number, b.status, b.booking_date
-                    FROM bookings b
-                    JOIN users u ON b.user_id = u.user_id
-                    JOIN flights f ON b.flight_id = f.flight_id
-                    ORDER BY b.booking_date DESC
-                """).fetchall()
-                conn.close()
-
-                st.subheader("All Bookings")
-                if all_bookings:
-                    for bk in all_bookings:
-                        col1, col2 = st.columns([4,1])
-                        with col1:
-                            st.markdown(f"""
-                                **Booking ID:** {bk['booking_id']}  
-                                **User:** {bk['username']}  
-                                **Flight:** {bk['flight_number']} ({bk['departure_airport']}→{bk['arrival_airport']})  
-                                **Departure:** {bk['departure_time']}  
-                                **Seat:** {bk['seat_number']}  
-                                **Status:** {bk['status']}  
-                                **Booked At:** {bk['booking_date']}  
-                            """)
-                        with col2:
-                            with st.form(f"delete_booking_{bk['booking_id']}"):
-                                if st.form_submit_button("🗑️ Delete"):
-                                    try:
-                                        conn = get_db()
-                                        conn.execute("DELETE FROM bookings WHERE booking_id = ?", (bk['booking_id'],))
-                                        conn.commit()
-                                        st.success(f"Booking {bk['booking_id']} deleted successfully!")
-                                        st.rerun()
-                                    except Error as e:
-                                        st.error(f"Error deleting booking: {e}")
-                                    finally:
-                                        conn.close()
-                        st.write("---")
-                else:
-                    st.info("No bookings found.")
+                manage_bookings()
 
     st.markdown(
         """
@@ -0,0 +1,68 @@
+import datetime
+
+import pytest
+
+from airline import refdata
+from airline.db import ConnectionPool
+from airline.migrations import migrate
+
+DAY = datetime.date(2030, 3, 1)
+
+
+@pytest.fixture(autouse=True)
+def _fresh_refdata():
+    # Pick-lists are cached per process, not per database
+    refdata.invalidate()
+    yield
+    refdata.invalidate()
+
+
+@pytest.fixture
+def pool(tmp_path):
+    pool = ConnectionPool(str(tmp_path / "airline.db"), max_size=4)
+    migrate(pool)
+    yield pool
+    pool.close()
+
+
+@pytest.fixture
+def add_user(pool):
+    """Insert a passenger (plaintext password, as legacy rows) and return its id."""
+    def add(username="alice", password="secret", role="passenger"):
+        with pool.transaction() as conn:
+            return conn.execute(
+                "INSERT INTO users (username, password, email, role) VALUES (?, ?, ?, ?)",
+                (username, password, f"{username}@example.com", role),
+            ).lastrowid
+    return add
+
+
+@pytest.fixture
+def add_flight(pool):
+    """Create a flight from local times through FlightService; returns its id."""
+    from airline.services import FlightService
+
+    service = FlightService(pool)
+
+    def add(number="BG101", dep="DAC", arr="CGP", day=DAY, dep_time="09:00", arr_time="10:00",
+            capacity=86, layout_id=1):
+        dep_local = datetime.datetime.combine(day, datetime.time.fromisoformat(dep_time))
+        arr_local = datetime.datetime.combine(day, datetime.time.fromisoformat(arr_time))
+        return service.create(number, dep, arr, dep_local, arr_local, capacity, layout_id)
+    return add
+
+
+@pytest.fixture
+def add_crew(pool):
+    """Put a new crew member on flight_id; returns the assignment's crew_id."""
+    def add(flight_id, name="Rahim", role="Pilot", home_base="DAC"):
+        with pool.transaction() as conn:
+            member_id = conn.execute(
+                "INSERT INTO crew_members (name, role, contact_info, home_base) VALUES (?, ?, ?, ?)",
+                (name, role, "+880100", home_base),
+            ).lastrowid
+            return conn.execute(
+                "INSERT INTO crew (flight_id, member_id, crew_name, role, contact_info) VALUES (?, ?, ?, ?, ?)",
+                (flight_id, member_id, name, role, "+880100"),
+            ).lastrowid
+    return add
@@ -0,0 +1,117 @@
+import datetime
+
+import pytest
+
+from airline.analytics import (CurvePoint, booking_curve, day_stats, flight_load, rebuild_booking_curve,
+                               route_stats)
+from airline.archive import archive_departed
+from airline.services import AnalyticsService
+from airline.timeutil import local_day_range
+
+DAY = datetime.date(2030, 3, 1)
+
+
+@pytest.fixture
+def day(pool, add_user, add_flight):
+    """Three DAC→CGP flights (one cancelled) and a delayed CGP→CXB, all on DAY."""
+    user_id = add_user()
+    full = add_flight("BG101", capacity=4)
+    half = add_flight("BG103", dep_time="12:00", arr_time="13:00", capacity=4)
+    cancelled = add_flight("BG105", dep_time="15:00", arr_time="16:00", capacity=4)
+    delayed = add_flight("BG201", "CGP", "CXB", dep_time="11:00", arr_time="12:00", capacity=4)
+    with pool.transaction() as conn:
+        # BG101 departs 03:00 UTC and BG103 06:00 UTC: two days out, the same day, and over a year out
+        conn.executemany(
+            "INSERT INTO bookings (user_id, flight_id, seat_number, booking_date) VALUES (?, ?, ?, ?)", [
+                (user_id, full, "1A", "2030-02-27 03:00:00"),
+                (user_id, full, "1B", "2030-02-28 12:00:00"),
+                (user_id, full, "1C", "2029-01-01 00:00:00"),
+                (user_id, full, "1D", "2030-02-28 12:00:00"),
+                (user_id, half, "1A", "2030-02-27 06:00:00"),
+                (user_id, half, "1B", "2030-02-27 06:00:00"),
+            ])
+        conn.execute("UPDATE flights SET status = 'Cancelled' WHERE flight_id = ?", (cancelled,))
+        conn.execute("UPDATE flights SET status = 'Delayed' WHERE flight_id = ?", (delayed,))
+    return full, half, cancelled, delayed
+
+
+def _range():
+    return local_day_range(DAY, "UTC")
+
+
+def test_day_stats_leave_cancelled_seats_out(pool, day):
+    with pool.connection() as conn:
+        [stats] = day_stats(conn, *_range())
+    assert stats.day == DAY.isoformat()
+    assert (stats.flights, stats.capacity, stats.booked) == (4, 12, 6)
+    assert (stats.delayed, stats.cancelled) == (1, 1)
+    assert stats.load_factor == 0.5
+
+
+def test_route_stats_busiest_first_and_filtered_by_airport(pool, day):
+    with pool.connection() as conn:
+        routes = route_stats(conn, *_range())
+        assert [route.route for route in routes] == ["DAC→CGP", "CGP→CXB"]
+        assert (routes[0].flights, routes[0].capacity, routes[0].booked) == (3, 8, 6)
+        assert routes[0].load_factor == 0.75
+        assert [route.route for route in route_stats(conn, *_range(), airport="CXB")] == ["CGP→CXB"]
+        assert len(route_stats(conn, *_range(), limit=1)) == 1
+
+
+def test_flight_load_orders_by_load_factor(pool, day):
+    full, half, _, delayed = day
+    with pool.connection() as conn:
+        fullest = flight_load(conn, *_range())
+        emptiest = flight_load(conn, *_range(), emptiest=True)
+    assert [flight.flight_id for flight in fullest] == [full, half, delayed]
+    assert [flight.load_factor for flight in fullest] == [1.0, 0.5, 0.0]
+    assert [flight.flight_id for flight in emptiest] == [delayed, half, full]
+
+
+def test_booking_curve_is_kept_by_triggers(pool, day):
+    full, _, _, _ = day
+    with pool.connection() as conn:
+        curve = booking_curve(conn, *_range())
+    assert curve == [CurvePoint(60, 1, 0), CurvePoint(2, 3, 0), CurvePoint(0, 2, 0)]
+
+    with pool.transaction() as conn:
+        conn.execute("UPDATE bookings SET status = 'Cancelled' WHERE flight_id = ? AND seat_number = '1A'", (full,))
+        conn.execute("DELETE FROM bookings WHERE flight_id = ? AND seat_number = '1D'", (full,))
+        kept = booking_curve(conn, *_range())
+        rebuild_booking_curve(conn)
+        assert booking_curve(conn, *_range()) == kept
+    assert kept == [CurvePoint(60, 1, 0), CurvePoint(2, 3, 1), CurvePoint(0, 1, 0)]
+
+
+def test_archived_flights_still_count(pool, day):
+    with pool.connection() as conn:
+        before = day_stats(conn, *_range())
+    archive_departed(pool, before=_range()[1] + 86400)
+    with pool.connection() as conn:
+        assert conn.execute("SELECT COUNT(*) FROM flights").fetchone()[0] == 0
+        after = day_stats(conn, *_range())
+        assert sum(point.bookings for point in booking_curve(conn, *_range())) == 6
+    assert after == before
+
+
+def test_service_caches_each_result(pool, day):
+    service = AnalyticsService(pool, ttl=60)
+    first = service.days(DAY, DAY)
+    with pool.transaction() as conn:
+        conn.execute("DELETE FROM bookings")
+    assert service.days(DAY, DAY) == first
+    assert service.days(DAY, DAY, airport="CXB")[0].booked == 0
+
+
+def test_service_cache_is_a_bounded_lru(pool, day):
+    service = AnalyticsService(pool, ttl=60, max_entries=2)
+    first = service.days(DAY, DAY)
+    assert service.days(DAY, DAY, airport="DAC")[0].booked == 6
+    service.days(DAY, DAY)
+    service.days(DAY, DAY, airport="CXB")
+    assert len(service._cache) == 2
+    with pool.transaction() as conn:
+        conn.execute("DELETE FROM bookings")
+    # The least recently used result (DAC) was evicted and is read again
+    assert service.days(DAY, DAY) == first
+    assert service.days(DAY, DAY, airport="DAC")[0].booked == 0
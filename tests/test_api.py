@@ -0,0 +1,88 @@
+import asyncio
+import base64
+import json
+
+import pytest
+
+from airline.api import AirlineAPI
+from airline.auth import ScryptCost
+from airline.services import AirlineServices, UserService
+
+CHEAP = ScryptCost(n=2 ** 10)
+
+
+@pytest.fixture
+def api(pool):
+    services = AirlineServices(pool)
+    services.users = UserService(pool, CHEAP)
+    services.users.register("alice", "secret", "alice@example.com")
+    return AirlineAPI(services=services)
+
+
+def call(app, method, path, body=None, auth=None, query=""):
+    headers = [(b"authorization", auth.encode())] if auth else []
+    payload = json.dumps(body).encode() if body is not None else b""
+    sent = []
+
+    async def receive():
+        return {"type": "http.request", "body": payload}
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {"type": "http", "method": method, "path": path, "headers": headers,
+             "query_string": query.encode()}
+    asyncio.run(app(scope, receive, send))
+    return sent[0]["status"], json.loads(sent[1]["body"])
+
+
+def basic(username, password):
+    return "Basic " + base64.b64encode(f"{username}:{password}".encode()).decode()
+
+
+def test_flight_lookups(api, add_flight):
+    flight_id = add_flight()
+    status, body = call(api, "GET", f"/flights/{flight_id}")
+    assert status == 200
+    assert (body["flight_number"], body["remaining"]) == ("BG101", 86)
+    status, body = call(api, "GET", f"/flights/{flight_id}/seats")
+    assert len(body["free"]) == 86
+    assert call(api, "GET", "/flights/999")[0] == 404
+    assert [a["code"] for a in call(api, "GET", "/airports", query="q=dhaka")[1]] == ["DAC"]
+    assert call(api, "GET", "/itineraries", query="from=DAC&to=CGP&date=2030-03-01")[1][0]["stops"] == 0
+    assert call(api, "GET", "/itineraries", query="from=DAC&to=CGP&date=soon")[0] == 400
+    assert call(api, "PUT", "/bookings")[0] == 405
+    assert call(api, "GET", "/nowhere")[0] == 404
+
+
+def test_booking_requires_authentication(api, add_flight):
+    flight_id = add_flight()
+    request = {"flight_id": flight_id, "seats": ["2A"]}
+    assert call(api, "POST", "/bookings", request)[0] == 401
+    assert call(api, "POST", "/bookings", request, basic("alice", "wrong"))[0] == 401
+    assert call(api, "POST", "/bookings", request, basic("alice", "secret")) == \
+        (201, {"flight_id": flight_id, "booked": ["2A"]})
+    status, body = call(api, "POST", "/bookings", request, basic("alice", "secret"))
+    assert (status, body["conflicts"]) == (409, ["2A"])
+    assert [b["seat_number"] for b in call(api, "GET", "/bookings", auth=basic("alice", "secret"))[1]] == ["2A"]
+
+
+def test_bad_booking_requests_are_400(api, add_flight):
+    flight_id = add_flight()
+    auth = basic("alice", "secret")
+    assert call(api, "POST", "/bookings", {"seats": ["2A"]}, auth)[0] == 400
+    status, body = call(api, "POST", "/bookings", {"flight_id": flight_id, "seats": ["99Z"]}, auth)
+    assert (status, body["error"]) == (400, "No such seat(s) on this flight: 99Z")
+    assert call(api, "POST", "/bookings", {"flight_id": 999, "seats": ["2A"]}, auth)[0] == 404
+
+
+def test_session_token_works_across_workers(api, pool, add_flight):
+    flight_id = add_flight()
+    status, body = call(api, "POST", "/sessions", auth=basic("alice", "secret"))
+    assert status == 201
+    bearer = "Bearer " + body["token"]
+    # A second app over the same database stands in for another worker
+    other = AirlineAPI(services=AirlineServices(pool))
+    assert call(other, "POST", "/bookings", {"flight_id": flight_id, "seats": ["2F"]}, bearer)[0] == 201
+    assert call(api, "DELETE", "/sessions", auth=bearer) == (200, {})
+    assert call(other, "GET", "/bookings", auth=bearer)[0] == 401
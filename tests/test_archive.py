@@ -0,0 +1,49 @@
+import datetime
+
+import pytest
+
+from airline.archive import archive_departed, archive_flight, flight_crew, get_flight, list_flights, main, user_bookings
+
+PAST = datetime.date(2020, 6, 1)
+
+
+@pytest.fixture
+def schedule(pool, add_user, add_flight, add_crew):
+    user_id = add_user()
+    old = [add_flight(f"OLD{i}", day=PAST + datetime.timedelta(days=i)) for i in range(3)]
+    upcoming = add_flight("NEW1")
+    with pool.transaction() as conn:
+        conn.executemany("INSERT INTO bookings (user_id, flight_id, seat_number) VALUES (?, ?, '2A')",
+                         [(user_id, flight_id) for flight_id in [*old, upcoming]])
+    add_crew(old[0])
+    return user_id, old, upcoming
+
+
+def test_archive_departed_moves_only_landed_flights(pool, schedule):
+    user_id, old, upcoming = schedule
+    result = archive_departed(pool, batch_size=2)
+    assert (result.flights, result.bookings, result.crew) == (3, 3, 1)
+    with pool.connection() as conn:
+        assert [row["flight_id"] for row in list_flights(conn)] == [upcoming]
+        assert [row["flight_id"] for row in list_flights(conn, include_archived=True)] == [*old, upcoming]
+        assert get_flight(conn, old[0]) is None
+        assert get_flight(conn, old[0], include_archived=True)["archived"] == 1
+        assert flight_crew(conn, old[0]) == []
+        assert len(flight_crew(conn, old[0], include_archived=True)) == 1
+        assert len(user_bookings(conn, user_id)) == 1
+        assert len(user_bookings(conn, user_id, include_archived=True)) == 4
+    assert archive_departed(pool).flights == 0
+
+
+def test_archive_one_flight(pool, schedule):
+    _, _, upcoming = schedule
+    assert archive_flight(pool, upcoming).flights == 1
+    with pool.connection() as conn:
+        assert conn.execute("SELECT COUNT(*) FROM bookings WHERE flight_id = ?", (upcoming,)).fetchone()[0] == 0
+        assert get_flight(conn, upcoming, include_archived=True)["archived"] == 1
+
+
+def test_cli_before(pool, schedule, capsys):
+    # Only the first old flight (2020-06-01 04:00 UTC) lands before this
+    assert main([pool.database, "--before", "2020-06-01 12:00:00"]) == 0
+    assert "Archived 1 flight(s)" in capsys.readouterr().out
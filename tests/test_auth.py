@@ -0,0 +1,91 @@
+import pytest
+
+from airline.auth import (ScryptCost, SessionStore, credential_token, hash_password, needs_rehash, rehash_plaintext,
+                          verify_password)
+from airline.models import User
+from airline.services import UserService
+
+CHEAP = ScryptCost(n=2 ** 10)
+
+
+@pytest.fixture
+def users(pool):
+    return UserService(pool, CHEAP)
+
+
+def _stored(pool, username):
+    with pool.connection() as conn:
+        return conn.execute("SELECT password FROM users WHERE username = ?", (username,)).fetchone()[0]
+
+
+def test_hash_format_and_verify():
+    stored = hash_password("secret", CHEAP)
+    assert stored.startswith("scrypt$1024$8$1$")
+    assert verify_password("secret", stored)
+    assert not verify_password("Secret", stored)
+    assert not needs_rehash(stored, CHEAP)
+    assert needs_rehash(stored)
+    # Legacy plaintext rows still verify
+    assert verify_password("secret", "secret")
+    assert needs_rehash("secret", CHEAP)
+
+
+def test_login_rehashes_legacy_and_checks_role(pool, users, add_user):
+    add_user("alice", "secret")
+    assert users.login("alice", "wrong", "passenger") is None
+    assert users.login("alice", "secret", "admin") is None
+    assert users.login("nobody", "secret", "passenger") is None
+    user, token = users.login("alice", "secret", "passenger")
+    assert user.username == "alice"
+    assert _stored(pool, "alice").startswith("scrypt$")
+    assert users.session(token) == user
+    users.logout(token)
+    assert users.session(token) is None
+
+
+def test_sessions_are_shared_and_hashed(pool, users, add_user):
+    add_user("alice", "secret")
+    user, token = users.login("alice", "secret", "passenger")
+    # Another process (or API worker) sees the same session
+    assert UserService(pool, CHEAP).session(token) == user
+    with pool.connection() as conn:
+        [stored] = [row[0] for row in conn.execute("SELECT token_hash FROM sessions")]
+    assert token.encode() not in stored
+
+
+def test_sessions_expire_and_are_swept(pool, add_user):
+    user_id = add_user("alice")
+    store = SessionStore(pool, ttl=-1)
+    expired = store.issue(User(user_id, "alice"))
+    assert store.get(expired) is None
+    assert len(store) == 0
+    SessionStore(pool).issue(User(user_id, "alice"))
+    with pool.connection() as conn:
+        assert conn.execute("SELECT COUNT(*) FROM sessions").fetchone()[0] == 1
+
+
+def test_password_change_signs_out_other_sessions(users, add_user):
+    add_user("alice", "secret")
+    user, kept = users.login("alice", "secret", "passenger")
+    _, other = users.login("alice", "secret", "passenger")
+    assert not users.change_password(user.user_id, "wrong", "new")
+    assert users.change_password(user.user_id, "secret", "new", keep_session=kept)
+    assert users.session(kept) == user
+    assert users.session(other) is None
+    assert users.login("alice", "new", "passenger") is not None
+
+
+def test_basic_credentials_verify_once(users, add_user, monkeypatch):
+    add_user("alice", "secret")
+    assert users.authenticate("alice", "secret", "passenger").username == "alice"
+    monkeypatch.setattr(users, "login", lambda *args: pytest.fail("password verified again"))
+    assert users.authenticate("alice", "secret", "passenger").username == "alice"
+    assert credential_token("alice", "secret", "passenger") != credential_token("alice", "secret", "admin")
+
+
+def test_rehash_plaintext(pool, add_user):
+    add_user("alice", "secret")
+    add_user("bob", hash_password("pw", CHEAP))
+    assert rehash_plaintext(pool, CHEAP) == 1
+    assert verify_password("secret", _stored(pool, "alice"))
+    assert rehash_plaintext(pool, CHEAP) == 0
@@ -0,0 +1,81 @@
+import threading
+
+import pytest
+
+from airline.booking import reserve_seats
+from airline.holds import acquire_holds
+
+
+def _confirmed(pool, flight_id):
+    with pool.connection() as conn:
+        return sorted(row[0] for row in conn.execute(
+            "SELECT seat_number FROM bookings WHERE flight_id = ? AND status = 'Confirmed'", (flight_id,)))
+
+
+def test_books_all_seats(pool, add_user, add_flight):
+    user_id, flight_id = add_user(), add_flight()
+    result = reserve_seats(pool, user_id, flight_id, ["2A", "2F", "2A"])
+    assert result.ok
+    assert result.booked == ("2A", "2F")
+    assert _confirmed(pool, flight_id) == ["2A", "2F"]
+
+
+def test_conflict_books_nothing(pool, add_user, add_flight):
+    alice, bob = add_user("alice"), add_user("bob")
+    flight_id = add_flight()
+    assert reserve_seats(pool, alice, flight_id, ["3A"]).ok
+    result = reserve_seats(pool, bob, flight_id, ["2A", "3A", "3F"])
+    assert not result.ok
+    assert result.conflicts == ("3A",)
+    assert _confirmed(pool, flight_id) == ["3A"]
+
+
+def test_capacity_and_status_errors(pool, add_user, add_flight):
+    user_id = add_user()
+    small = add_flight(capacity=1)
+    assert reserve_seats(pool, user_id, small, ["2A", "2F"]).error == "Only 1 seat(s) left on this flight"
+    assert reserve_seats(pool, user_id, small, []).error == "No seats selected"
+    assert reserve_seats(pool, user_id, 999, ["2A"]).error == "Flight not found"
+    with pool.transaction() as conn:
+        conn.execute("UPDATE flights SET status = 'Cancelled' WHERE flight_id = ?", (small,))
+    assert reserve_seats(pool, user_id, small, ["2A"]).error == "Flight has been cancelled"
+
+
+def test_unknown_user_is_an_error_not_a_conflict(pool, add_flight):
+    flight_id = add_flight()
+    result = reserve_seats(pool, 999, flight_id, ["2A", "2F"])
+    assert (result.ok, result.conflicts, result.error) == (False, (), "User not found")
+    assert _confirmed(pool, flight_id) == []
+
+
+def test_seats_held_by_others_conflict(pool, add_user, add_flight):
+    user_id, flight_id = add_user(), add_flight()
+    acquire_holds(pool, flight_id, ["2A"], "other-session")
+    assert reserve_seats(pool, user_id, flight_id, ["2A"], holder="mine").conflicts == ("2A",)
+    acquire_holds(pool, flight_id, ["2F"], "mine")
+    assert reserve_seats(pool, user_id, flight_id, ["2F"], holder="mine").ok
+
+
+def test_concurrent_bookers_get_each_seat_once(pool, add_user, add_flight):
+    flight_id = add_flight()
+    users = [add_user(f"user{i}") for i in range(4)]
+    results = []
+
+    def book(user_id):
+        results.append(reserve_seats(pool, user_id, flight_id, ["20A", "20B"]))
+
+    threads = [threading.Thread(target=book, args=(user_id,)) for user_id in users]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert sum(result.ok for result in results) == 1
+    assert _confirmed(pool, flight_id) == ["20A", "20B"]
+
+
+def test_unknown_seat_labels_are_rejected(pool, add_user, add_flight):
+    user_id, flight_id = add_user(), add_flight()
+    # Row 1 does not exist in the standard layout
+    with pytest.raises(ValueError, match="1A"):
+        reserve_seats(pool, user_id, flight_id, ["2A", "1A"])
+    assert _confirmed(pool, flight_id) == []
@@ -0,0 +1,79 @@
+import datetime
+
+import pytest
+
+from airline.bookings import (BookingFilter, cancel_bookings, cancel_matching, count_bookings, delete_bookings,
+                              delete_matching, page_bookings, page_cursor)
+
+
+@pytest.fixture
+def bookings(pool, add_user, add_flight):
+    """Ten bookings over two users and flights, one a day from 2030-01-01."""
+    alice, bob = add_user("alice"), add_user("bob")
+    first, second = add_flight(), add_flight("BG202")
+    seats = ["2A", "2F", "3A", "3F", "4A", "4F", "20A", "20B", "20C", "20D"]
+    rows = [(alice if i % 2 else bob, first if i < 6 else second, seat,
+             f"2030-01-{i + 1:02d} 12:00:00", "Cancelled" if i == 3 else "Confirmed")
+            for i, seat in enumerate(seats)]
+    with pool.transaction() as conn:
+        conn.executemany("INSERT INTO bookings (user_id, flight_id, seat_number, booking_date, status) "
+                         "VALUES (?, ?, ?, ?, ?)", rows)
+    return first, second
+
+
+def _all_pages(conn, filters, limit):
+    pages, after = [], None
+    while True:
+        rows = page_bookings(conn, filters, after, limit)
+        if not rows:
+            return pages
+        pages.append([row["booking_id"] for row in rows])
+        after = page_cursor(rows[-1])
+
+
+def test_keyset_pages_cover_everything_newest_first(pool, bookings):
+    with pool.connection() as conn:
+        pages = _all_pages(conn, BookingFilter(), 4)
+        assert count_bookings(conn) == 10
+    assert [len(page) for page in pages] == [4, 4, 2]
+    assert sum(pages, []) == list(range(10, 0, -1))
+
+
+def test_filters(pool, bookings):
+    first, _ = bookings
+    with pool.connection() as conn:
+        assert count_bookings(conn, BookingFilter(flight_id=first)) == 6
+        assert count_bookings(conn, BookingFilter(username="alice")) == 5
+        assert count_bookings(conn, BookingFilter(status="Cancelled")) == 1
+        dated = BookingFilter(date_from=datetime.date(2030, 1, 3), date_to=datetime.date(2030, 1, 5))
+        assert count_bookings(conn, dated) == 3
+        assert sum(_all_pages(conn, dated, 2), []) == [5, 4, 3]
+        assert count_bookings(conn, BookingFilter(username="nobody")) == 0
+
+
+def _statuses(pool):
+    with pool.connection() as conn:
+        return dict(conn.execute("SELECT booking_id, status FROM bookings"))
+
+
+def test_cancel_and_delete_by_ids(pool, bookings):
+    result = cancel_bookings(pool, [1, 2, 3, 4, 1])
+    # Booking 4 was already cancelled
+    assert (result.matched, result.changed) == (4, 3)
+    assert "3 of 4" in result.summary()
+    assert delete_bookings(pool, [5, 6, 99]).changed == 2
+    statuses = _statuses(pool)
+    assert 5 not in statuses and 6 not in statuses
+    assert [statuses[i] for i in (1, 2, 3, 4, 7)] == ["Cancelled"] * 4 + ["Confirmed"]
+    assert cancel_bookings(pool, []).changed == 0
+
+
+def test_cancel_and_delete_matching(pool, bookings):
+    first, second = bookings
+    result = cancel_matching(pool, BookingFilter(flight_id=first))
+    assert (result.matched, result.changed) == (6, 5)
+    with pool.connection() as conn:
+        assert conn.execute("SELECT booked_count FROM flights WHERE flight_id = ?", (first,)).fetchone()[0] == 0
+    result = delete_matching(pool, BookingFilter(flight_id=second, username="alice"))
+    assert result.changed == 2
+    assert len(_statuses(pool)) == 8
@@ -0,0 +1,115 @@
+import datetime
+
+import pytest
+
+from airline.crew import CrewFilter, CrewSchedule, DutyRules, Sector
+from airline.services import CrewService
+
+H = 3600
+DAY = datetime.date(2030, 3, 1)
+
+
+def _kinds(violations):
+    return sorted(v.kind for v in violations)
+
+
+def test_check_overlap_duty_and_rest():
+    schedule = CrewSchedule(DutyRules())
+    schedule.add(1, Sector(1, "DAC", "CGP", 8 * H, 9 * H))
+    # Too close to the previous landing
+    assert _kinds(schedule.check(1, Sector(2, "CGP", "DAC", 9 * H + 600, 10 * H))) == ["overlap"]
+    assert schedule.check(1, Sector(1, "DAC", "CGP", 8 * H, 9 * H))[0].detail == "already assigned to this flight"
+    assert schedule.check(1, Sector(2, "CGP", "DAC", 10 * H, 11 * H)) == []
+    # Joins the same duty and stretches it past 13 h
+    assert _kinds(schedule.check(1, Sector(3, "CGP", "DXB", 12 * H, 20 * H))) == ["duty"]
+    # A new duty that starts after too little rest
+    assert _kinds(schedule.check(1, Sector(4, "CGP", "DAC", 15 * H, 16 * H))) == ["rest"]
+    assert schedule.check(2, Sector(4, "CGP", "DAC", 15 * H, 16 * H)) == []
+
+
+def test_violations_sweep():
+    schedule = CrewSchedule(DutyRules())
+    for sector in (Sector(1, "DAC", "CGP", 0, H), Sector(2, "CGP", "DAC", H + 600, 2 * H),
+                   Sector(3, "DAC", "CXB", 8 * H, 9 * H)):
+        schedule.add(7, sector)
+    assert [(v.kind, v.flight_ids) for v in schedule.violations()] == [("overlap", (1, 2)), ("rest", (2, 3))]
+    assert schedule.location(7, 5 * H) == "DAC"
+    assert schedule.block_time(7) == 3 * H - 600
+
+
+@pytest.fixture
+def crew(pool):
+    return CrewService(pool)
+
+
+def test_assign_refuses_rule_breaks_unless_forced(crew, add_flight):
+    first = add_flight("BG1", "DAC", "CGP", dep_time="09:00", arr_time="10:00")
+    clash = add_flight("BG2", "CGP", "DAC", dep_time="10:10", arr_time="11:00")
+    member_id = crew.add_member("Rahim", "Pilot", home_base="DAC")
+    assert crew.assign(first, member_id).ok
+    result = crew.assign(clash, member_id)
+    assert not result.ok
+    assert _kinds(result.violations) == ["overlap"]
+    assert crew.assign(clash, member_id, force=True).ok
+    assert _kinds(crew.conflicts(DAY)) == ["overlap"]
+
+
+def test_update_moves_an_assignment_to_another_member(crew, add_flight):
+    flight_id = add_flight()
+    pilot = crew.add_member("Rahim", "Pilot", home_base="DAC")
+    co_pilot = crew.add_member("Anika", "Co-Pilot", home_base="DAC")
+    crew_id = crew.assign(flight_id, pilot).crew_id
+    assert crew.update(crew_id, flight_id, co_pilot).ok
+    assert [(a.crew_name, a.role) for a in crew.for_flight(flight_id)] == [("Anika", "Co-Pilot")]
+    with pytest.raises(ValueError, match="not found"):
+        crew.update(999, flight_id, pilot)
+
+
+def test_save_flight_replaces_the_crew_in_one_go(crew, add_flight):
+    flight_id = add_flight()
+    pilot = crew.add_member("Rahim", "Pilot", home_base="DAC")
+    attendant = crew.add_member("Anika", "Flight Attendant", home_base="DAC")
+    result = crew.save_flight(flight_id, [(None, pilot, None), (None, attendant, None)])
+    assert (result.saved, result.added) == (True, 2)
+    [kept] = [a.crew_id for a in crew.for_flight(flight_id) if a.member_id == pilot]
+    result = crew.save_flight(flight_id, [(kept, pilot, "Co-Pilot")])
+    assert (result.updated, result.removed) == (1, 1)
+    assert [(a.crew_name, a.role) for a in crew.for_flight(flight_id)] == [("Rahim", "Co-Pilot")]
+
+
+def test_auto_assign_staffs_from_the_departure_airport(crew, add_flight):
+    outbound = add_flight("BG1", "DAC", "CGP", dep_time="09:00", arr_time="10:00")
+    add_flight("BG2", "CGP", "DAC", dep_time="12:00", arr_time="13:00")
+    for name, role in [("P", "Pilot"), ("C", "Co-Pilot"), ("A1", "Flight Attendant"), ("A2", "Flight Attendant")]:
+        crew.add_member(name, role, home_base="DAC")
+    crew.add_member("Far", "Pilot", home_base="DXB")
+
+    assert crew.auto_assign(DAY, dry_run=True).assignments
+    assert crew.page() == []
+    plan = crew.auto_assign(DAY)
+    # The DAC crew fly out and back; the DXB pilot is never used
+    assert len(plan.assignments) == 8
+    assert plan.unfilled == ()
+    assert {a.crew_name for a in crew.for_flight(outbound)} == {"P", "C", "A1", "A2"}
+    assert crew.conflicts(DAY) == []
+
+
+def test_keyset_pages_and_separate_count(crew, add_flight):
+    flights = [add_flight(f"BG{i}", dep_time=f"{8 + 2 * i:02d}:00", arr_time=f"{9 + 2 * i:02d}:00") for i in range(3)]
+    members = [crew.add_member(f"M{i}", "Flight Attendant", home_base="DAC") for i in range(2)]
+    for flight_id in flights:
+        crew.save_flight(flight_id, [(None, member_id, None) for member_id in members], force=True)
+
+    pages, after = [], None
+    while True:
+        page = crew.page(after=after, limit=4)
+        if not page:
+            break
+        pages.append([(a.flight_id, a.crew_name) for a in page])
+        after = page[-1].cursor
+    assert [len(page) for page in pages] == [4, 2]
+    assert [flight_id for page in pages for flight_id, _ in page] == sorted(flights * 2)
+    assert crew.count() == 6
+    assert crew.count(CrewFilter(flight_id=flights[0])) == 2
+    assert crew.count(CrewFilter(member_id=members[0], day=DAY)) == 3
+    assert crew.count(CrewFilter(day=DAY + datetime.timedelta(days=1))) == 0
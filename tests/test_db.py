@@ -0,0 +1,80 @@
+import sqlite3
+import threading
+
+import pytest
+
+from airline.db import ConnectionPool, PoolTimeout
+
+
+@pytest.fixture
+def small_pool(tmp_path):
+    pool = ConnectionPool(str(tmp_path / "pool.db"), max_size=2, timeout=0.2)
+    yield pool
+    pool.close()
+
+
+def test_connections_are_reused_and_configured(small_pool):
+    with small_pool.connection() as conn:
+        first = conn
+        assert conn.execute("PRAGMA foreign_keys").fetchone()[0] == 1
+        assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    with small_pool.connection() as conn:
+        assert conn is first
+    metrics = small_pool.metrics()
+    assert metrics.checkouts == 2
+    assert metrics.open_connections == 1
+    assert metrics.in_use == 0
+
+
+def test_transaction_commits_and_rolls_back(small_pool):
+    with small_pool.transaction() as conn:
+        conn.execute("CREATE TABLE t (x INTEGER)")
+        conn.execute("INSERT INTO t VALUES (1)")
+    with pytest.raises(RuntimeError):
+        with small_pool.transaction() as conn:
+            conn.execute("INSERT INTO t VALUES (2)")
+            raise RuntimeError("boom")
+    with small_pool.connection() as conn:
+        assert [row[0] for row in conn.execute("SELECT x FROM t")] == [1]
+
+
+def test_dirty_connection_is_rolled_back_on_release(small_pool):
+    with small_pool.transaction() as conn:
+        conn.execute("CREATE TABLE t (x INTEGER)")
+    with small_pool.connection() as conn:
+        conn.execute("BEGIN")
+        conn.execute("INSERT INTO t VALUES (1)")
+    with small_pool.connection() as conn:
+        assert not conn.in_transaction
+        assert conn.execute("SELECT COUNT(*) FROM t").fetchone()[0] == 0
+
+
+def test_exhausted_pool_times_out(small_pool):
+    release = threading.Event()
+    held = threading.Barrier(3)
+
+    def hold():
+        with small_pool.connection():
+            held.wait()
+            release.wait()
+
+    threads = [threading.Thread(target=hold) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    held.wait()
+    try:
+        with pytest.raises(PoolTimeout):
+            with small_pool.connection():
+                pass
+    finally:
+        release.set()
+        for thread in threads:
+            thread.join()
+    assert small_pool.metrics().open_connections == 2
+
+
+def test_closed_pool_refuses_checkouts(small_pool):
+    small_pool.close()
+    with pytest.raises(sqlite3.ProgrammingError):
+        with small_pool.connection():
+            pass
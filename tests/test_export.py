@@ -0,0 +1,78 @@
+import csv
+import datetime
+import io
+import json
+
+import pytest
+
+from airline.archive import archive_flight
+from airline.bookings import BookingFilter
+from airline.export import (ExportError, bookings_query, export, export_bytes, main, manifest_query,
+                            roster_query)
+
+
+@pytest.fixture
+def flights(pool, add_user, add_flight, add_crew):
+    user_id = add_user()
+    past = add_flight("OLD1", day=datetime.date(2020, 6, 1))
+    upcoming = add_flight("NEW1")
+    with pool.transaction() as conn:
+        conn.executemany("INSERT INTO bookings (user_id, flight_id, seat_number, status) VALUES (?, ?, ?, ?)", [
+            (user_id, upcoming, "3A", "Confirmed"),
+            (user_id, upcoming, "2F", "Confirmed"),
+            (user_id, upcoming, "4A", "Cancelled"),
+            (user_id, past, "2A", "Confirmed"),
+        ])
+    add_crew(upcoming, "Karim")
+    add_crew(past, "Rahim")
+    archive_flight(pool, past)
+    return past, upcoming
+
+
+def _csv(data):
+    return list(csv.DictReader(io.StringIO(data.decode("utf-8"))))
+
+
+def test_manifest_lists_confirmed_seats_in_order(pool, flights):
+    past, upcoming = flights
+    rows = _csv(export_bytes(pool, manifest_query(upcoming), "csv", batch_size=1))
+    assert [row["seat_number"] for row in rows] == ["2F", "3A"]
+    assert _csv(export_bytes(pool, manifest_query(past), "csv")) == []
+    assert [row["seat_number"] for row in _csv(export_bytes(pool, manifest_query(past, True), "csv"))] == ["2A"]
+
+
+def test_archived_roster_is_sorted_by_departure(pool, flights):
+    rows = _csv(export_bytes(pool, roster_query(include_archived=True), "csv"))
+    assert [row["crew_name"] for row in rows] == ["Rahim", "Karim"]
+    assert int(rows[0]["departure_ts"]) < int(rows[1]["departure_ts"])
+    assert [row["crew_name"] for row in _csv(export_bytes(pool, roster_query(), "csv"))] == ["Karim"]
+
+
+def test_jsonl_and_row_count(pool, flights):
+    out = io.StringIO()
+    assert export(pool, bookings_query(BookingFilter(status="Confirmed")), "jsonl", out, batch_size=1) == 2
+    records = [json.loads(line) for line in out.getvalue().splitlines()]
+    assert {record["seat_number"] for record in records} == {"2F", "3A"}
+
+
+def test_empty_csv_still_has_a_header(pool):
+    assert export_bytes(pool, manifest_query(999), "csv").decode().strip() == \
+        "seat_number,username,email,booking_id,booking_date"
+
+
+def test_unknown_format(pool):
+    with pytest.raises(ExportError):
+        export(pool, manifest_query(1), "xlsx", io.StringIO())
+
+
+def test_parquet_round_trip(pool, flights, tmp_path):
+    pq = pytest.importorskip("pyarrow.parquet")
+    path = tmp_path / "bookings.parquet"
+    export(pool, bookings_query(), "parquet", str(path))
+    assert pq.read_table(path).num_rows == 3
+
+
+def test_cli(pool, flights, capsys):
+    _, upcoming = flights
+    assert main([pool.database, "manifest", "--flight", str(upcoming)]) == 0
+    assert capsys.readouterr().out.count("\n") == 3
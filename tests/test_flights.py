@@ -0,0 +1,58 @@
+import sqlite3
+
+import pytest
+
+from airline.flights import cancel_flight, delete_flight, find_orphans, main, purge_orphans
+from airline.holds import acquire_holds
+
+
+@pytest.fixture
+def busy_flight(pool, add_user, add_flight, add_crew):
+    flight_id = add_flight()
+    user_id = add_user()
+    with pool.transaction() as conn:
+        conn.executemany("INSERT INTO bookings (user_id, flight_id, seat_number) VALUES (?, ?, ?)",
+                         [(user_id, flight_id, "2A"), (user_id, flight_id, "2F")])
+    add_crew(flight_id)
+    acquire_holds(pool, flight_id, ["3A"], "someone")
+    return flight_id
+
+
+def _count(pool, table, flight_id, extra=""):
+    with pool.connection() as conn:
+        return conn.execute(f"SELECT COUNT(*) FROM {table} WHERE flight_id = ? {extra}", (flight_id,)).fetchone()[0]
+
+
+def test_cancel_cancels_bookings_and_drops_holds(pool, busy_flight):
+    result = cancel_flight(pool, busy_flight)
+    assert (result.action, result.bookings, result.crew) == ("Cancelled", 2, 0)
+    assert _count(pool, "bookings", busy_flight, "AND status = 'Confirmed'") == 0
+    assert _count(pool, "seat_holds", busy_flight) == 0
+    assert _count(pool, "flights", busy_flight, "AND status = 'Cancelled'") == 1
+
+
+def test_delete_removes_children(pool, busy_flight):
+    result = delete_flight(pool, busy_flight)
+    assert (result.bookings, result.crew) == (2, 1)
+    for table in ("flights", "bookings", "crew", "seat_holds"):
+        assert _count(pool, table, busy_flight) == 0
+    assert delete_flight(pool, busy_flight) is None
+
+
+def test_foreign_keys_block_plain_deletes(pool, busy_flight):
+    with pytest.raises(sqlite3.IntegrityError):
+        with pool.transaction() as conn:
+            conn.execute("DELETE FROM flights WHERE flight_id = ?", (busy_flight,))
+
+
+def test_purge_orphans(pool, busy_flight, capsys):
+    with pool.connection() as conn:
+        conn.execute("PRAGMA foreign_keys = OFF")
+        conn.execute("DELETE FROM flights WHERE flight_id = ?", (busy_flight,))
+        conn.execute("PRAGMA foreign_keys = ON")
+        assert find_orphans(conn) == {"bookings": 2, "crew": 1, "seat_holds": 1}
+    assert main(["purge-orphans", pool.database, "--dry-run"]) == 0
+    assert "bookings: 2 orphan row(s) found" in capsys.readouterr().out
+    assert purge_orphans(pool) == {"bookings": 2, "crew": 1, "seat_holds": 1}
+    with pool.connection() as conn:
+        assert find_orphans(conn) == {"bookings": 0, "crew": 0, "seat_holds": 0}
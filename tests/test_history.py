@@ -0,0 +1,57 @@
+import datetime
+
+import pytest
+
+from airline.history import booking_stats, history_page
+
+
+@pytest.fixture
+def trips(pool, add_user, add_flight):
+    """A past one-way trip and an upcoming two-leg trip for one user."""
+    user_id = add_user()
+    past = add_flight("OLD1", day=datetime.date(2020, 6, 1))
+    first = add_flight("BG1", "DAC", "CGP", dep_time="09:00", arr_time="10:00")
+    second = add_flight("BG2", "CGP", "CXB", dep_time="11:30", arr_time="12:30")
+    with pool.transaction() as conn:
+        conn.executemany("INSERT INTO bookings (user_id, flight_id, seat_number) VALUES (?, ?, ?)", [
+            (user_id, past, "2A"), (user_id, first, "2A"), (user_id, first, "2F"), (user_id, second, "3A"),
+        ])
+    return user_id, first, second
+
+
+def _route(trip):
+    return [leg.flight_number for leg in trip.legs]
+
+
+def test_connecting_legs_form_one_trip_upcoming_first(pool, trips):
+    user_id, _, _ = trips
+    page, stats = history_page(pool, user_id)
+    assert [_route(trip) for trip in page] == [["BG1", "BG2"], ["OLD1"]]
+    assert [trip.upcoming for trip in page] == [True, False]
+    assert page[0].legs[0].seats == ("2A", "2F")
+    assert (stats.trips, stats.upcoming_trips, stats.segments, stats.seats) == (2, 1, 3, 4)
+    assert stats.next_departure_ts == page[0].departure_ts
+
+    page, _ = history_page(pool, user_id, page=1, page_size=1)
+    assert [_route(trip) for trip in page] == [["OLD1"]]
+
+
+def test_booking_writes_mark_the_summary_dirty(pool, trips):
+    user_id, first, second = trips
+    booking_stats(pool, user_id)
+    with pool.transaction() as conn:
+        conn.execute("UPDATE bookings SET status = 'Cancelled' WHERE flight_id = ?", (second,))
+    page, stats = history_page(pool, user_id)
+    # The cancelled leg no longer connects to the confirmed one
+    assert [_route(trip) for trip in page] == [["BG1"], ["BG2"], ["OLD1"]]
+    assert [trip.status for trip in page] == ["Confirmed", "Cancelled", "Confirmed"]
+    assert page[1].legs[0].cancelled_seats == ("3A",)
+    assert stats.seats == 3
+
+
+def test_summary_goes_stale_when_a_trip_lands(pool, trips):
+    user_id, _, second = trips
+    with pool.connection() as conn:
+        landed = conn.execute("SELECT arrival_ts FROM flights WHERE flight_id = ?", (second,)).fetchone()[0]
+    assert booking_stats(pool, user_id).upcoming_trips == 1
+    assert booking_stats(pool, user_id, now=landed + 1).upcoming_trips == 0
@@ -0,0 +1,41 @@
+import time
+
+from airline.holds import acquire_holds, held_seats, purge_expired, release_holds
+
+
+def _book(pool, user_id, flight_id, seat):
+    with pool.transaction() as conn:
+        conn.execute("INSERT INTO bookings (user_id, flight_id, seat_number) VALUES (?, ?, ?)",
+                     (user_id, flight_id, seat))
+
+
+def test_holds_exclude_other_holders(pool, add_user, add_flight):
+    flight_id = add_flight()
+    _book(pool, add_user(), flight_id, "2F")
+    assert acquire_holds(pool, flight_id, ["2A", "2F"], "a") == (("2A",), ("2F",))
+    assert acquire_holds(pool, flight_id, ["2A", "3A"], "b") == (("3A",), ("2A",))
+    # Renewing your own lease succeeds
+    assert acquire_holds(pool, flight_id, ["2A"], "a") == (("2A",), ())
+    with pool.connection() as conn:
+        assert held_seats(conn, flight_id) == {"2A", "3A"}
+        assert held_seats(conn, flight_id, exclude_holder="a") == {"3A"}
+
+
+def test_expired_holds_are_ignored_and_swept(pool, add_flight):
+    flight_id = add_flight()
+    acquire_holds(pool, flight_id, ["2A"], "a", ttl=60)
+    later = time.time() + 120
+    with pool.connection() as conn:
+        assert held_seats(conn, flight_id, now=later) == set()
+    with pool.transaction() as conn:
+        assert purge_expired(conn, later) == 1
+
+
+def test_release_holds(pool, add_flight):
+    first, second = add_flight(), add_flight("BG202")
+    acquire_holds(pool, first, ["2A", "2F"], "a")
+    acquire_holds(pool, second, ["2A"], "a")
+    assert release_holds(pool, "a", first, []) == 0
+    assert release_holds(pool, "a", first, ["2A"]) == 1
+    assert release_holds(pool, "a", first) == 1
+    assert release_holds(pool, "a") == 1
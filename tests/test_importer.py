@@ -0,0 +1,81 @@
+import io
+
+import pytest
+
+from airline.importer import ImportFormatError, import_flights, restore_deferred
+from airline.search import search_flights
+
+HEADER = "flight_number,departure_airport,arrival_airport,departure_time,arrival_time,capacity,layout,status\n"
+GOOD = [
+    "BG101,DAC,CGP,2030-03-01 09:00,2030-03-01 10:00,80,,\n",
+    "BG102,cgp,dac,2030-03-01T12:00:00,2030-03-01T13:00:00,70,regional,Delayed\n",
+    "EK583,DAC,DXB,2030-03-01T03:00:00+00:00,2030-03-01 11:00,300,widebody,\n",
+]
+BAD = [
+    ",DAC,CGP,2030-03-01 09:00,2030-03-01 10:00,80,,\n",
+    "BG1,DAC,XXX,2030-03-01 09:00,2030-03-01 10:00,80,,\n",
+    "BG2,DAC,DAC,2030-03-01 09:00,2030-03-01 10:00,80,,\n",
+    "BG3,DAC,CGP,2030-03-01 10:00,2030-03-01 09:00,80,,\n",
+    "BG4,DAC,CGP,2030-03-01 09:00,2030-03-01 10:00,500,,\n",
+    "BG5,DAC,CGP,2030-03-01 09:00,2030-03-01 10:00,80,jumbo,\n",
+    "BG6,DAC,CGP,2030-03-01 09:00,2030-03-01 10:00,80,,Lost\n",
+    "BG7,DAC,CGP,soon,2030-03-01 10:00,80,,\n",
+]
+
+
+def _flights(pool):
+    with pool.connection() as conn:
+        return {row["flight_number"]: row for row in conn.execute("SELECT * FROM flights")}
+
+
+def test_imports_valid_rows_and_reports_rejects(pool):
+    rejects = io.StringIO()
+    source = io.BytesIO((HEADER + "".join(GOOD + BAD)).encode("utf-8"))
+    result = import_flights(pool, source, fmt="csv", chunk_size=4, reject_file=rejects)
+    assert (result.read, result.inserted, result.rejected) == (11, 3, 8)
+    assert [sample.line for sample in result.samples] == list(range(5, 13))
+    assert "unknown airport 'XXX'" in result.samples[1].reason
+    assert len(rejects.getvalue().splitlines()) == 9
+
+    flights = _flights(pool)
+    assert flights["BG102"]["departure_airport"] == "CGP"
+    assert flights["BG102"]["status"] == "Delayed"
+    # The explicit UTC offset is stored as Dhaka wall-clock time
+    assert flights["EK583"]["departure_time"] == "2030-03-01 09:00:00"
+    assert flights["EK583"]["arrival_ts"] - flights["EK583"]["departure_ts"] == 4 * 3600
+
+
+def test_missing_columns_and_formats(pool):
+    with pytest.raises(ImportFormatError, match="capacity"):
+        import_flights(pool, io.StringIO("flight_number,departure_airport\n"), fmt="csv")
+    with pytest.raises(ImportFormatError):
+        import_flights(pool, io.StringIO(HEADER), fmt="xlsx")
+
+
+def test_deferred_indexes_are_restored(pool):
+    with pool.connection() as conn:
+        schema = set(conn.execute("SELECT name FROM sqlite_master WHERE tbl_name = 'flights'"))
+    result = import_flights(pool, io.StringIO(HEADER + "".join(GOOD)), fmt="csv", defer_indexes=True)
+    assert result.inserted == 3
+    with pool.connection() as conn:
+        assert set(conn.execute("SELECT name FROM sqlite_master WHERE tbl_name = 'flights'")) == schema
+        assert conn.execute("SELECT COUNT(*) FROM deferred_schema").fetchone()[0] == 0
+        assert [row["flight_number"] for row in search_flights(conn, "ek583")] == ["EK583"]
+
+
+def test_interrupted_deferred_import_is_repaired(pool):
+    def crash(result):
+        raise KeyboardInterrupt
+
+    with pool.connection() as conn:
+        schema = set(conn.execute("SELECT name FROM sqlite_master WHERE tbl_name = 'flights'"))
+    # Simulate a process killed mid-import: the finally block never runs
+    with pool.transaction() as conn:
+        conn.execute("INSERT INTO deferred_schema (name, type, sql, last_id) "
+                     "SELECT name, type, sql, 0 FROM sqlite_master WHERE name = 'idx_flights_departure'")
+        conn.execute("DROP INDEX idx_flights_departure")
+    with pytest.raises(KeyboardInterrupt):
+        import_flights(pool, io.StringIO(HEADER + "".join(GOOD)), fmt="csv", progress=crash)
+    assert restore_deferred(pool) == 0
+    with pool.connection() as conn:
+        assert set(conn.execute("SELECT name FROM sqlite_master WHERE tbl_name = 'flights'")) == schema
@@ -0,0 +1,51 @@
+from airline import inventory
+from airline.inventory import flight_availability
+
+
+def _book(pool, user_id, flight_id, *seats):
+    with pool.transaction() as conn:
+        conn.executemany("INSERT INTO bookings (user_id, flight_id, seat_number) VALUES (?, ?, ?)",
+                         [(user_id, flight_id, seat) for seat in seats])
+
+
+def test_availability_is_batched(pool, add_user, add_flight, monkeypatch):
+    user_id = add_user()
+    ids = [add_flight(f"BG{n}", capacity=10) for n in range(5)]
+    _book(pool, user_id, ids[0], "2A", "2F")
+    monkeypatch.setattr(inventory, "BATCH_SIZE", 2)
+    with pool.connection() as conn:
+        found = flight_availability(conn, [*ids, ids[0], 999])
+    assert sorted(found) == ids
+    assert found[ids[0]].booked == 2
+    assert found[ids[0]].remaining == 8
+    assert found[ids[1]].remaining == 10
+
+
+def _booked_count(pool, flight_id):
+    with pool.connection() as conn:
+        return conn.execute("SELECT booked_count FROM flights WHERE flight_id = ?", (flight_id,)).fetchone()[0]
+
+
+def test_booked_count_follows_booking_writes(pool, add_user, add_flight):
+    user_id = add_user()
+    flight_id, other_id = add_flight(), add_flight("BG202")
+    _book(pool, user_id, flight_id, "2A", "2F", "3A")
+    assert _booked_count(pool, flight_id) == 3
+    with pool.transaction() as conn:
+        conn.execute("UPDATE bookings SET status = 'Cancelled' WHERE seat_number = '2A'")
+        conn.execute("DELETE FROM bookings WHERE seat_number = '2F'")
+        conn.execute("UPDATE bookings SET flight_id = ? WHERE seat_number = '3A'", (other_id,))
+    assert _booked_count(pool, flight_id) == 0
+    assert _booked_count(pool, other_id) == 1
+
+
+def test_reconcile_reports_and_fixes_drift(pool, add_user, add_flight):
+    user_id = add_user()
+    flight_id = add_flight()
+    _book(pool, user_id, flight_id, "2A")
+    with pool.transaction() as conn:
+        conn.execute("UPDATE flights SET booked_count = 5 WHERE flight_id = ?", (flight_id,))
+        assert inventory.reconcile_inventory(conn) == [inventory.CounterDrift(flight_id, 5, 1)]
+        inventory.reconcile_inventory(conn, fix=True)
+        assert inventory.reconcile_inventory(conn) == []
+    assert _booked_count(pool, flight_id) == 1
@@ -0,0 +1,53 @@
+import sqlite3
+
+import pytest
+
+from airline.db import ConnectionPool
+from airline.migrations import MIGRATIONS, current_version, latest_version, migrate, migration
+
+
+def test_migrate_reaches_latest_version_once(pool):
+    with pool.connection() as conn:
+        assert current_version(conn) == latest_version()
+        applied = [row[0] for row in conn.execute("SELECT version FROM schema_version ORDER BY version")]
+    assert applied == [number for number, _, _ in MIGRATIONS]
+    # A second run is a no-op
+    assert migrate(pool) == latest_version()
+
+
+def test_migrate_to_target_then_resume(tmp_path):
+    pool = ConnectionPool(str(tmp_path / "partial.db"), max_size=1)
+    try:
+        assert migrate(pool, target=1) == 1
+        with pool.connection() as conn:
+            tables = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+            assert {"users", "flights", "bookings", "crew"} <= tables
+            assert "seat_holds" not in tables
+        assert migrate(pool) == latest_version()
+        with pool.connection() as conn:
+            assert conn.execute("PRAGMA foreign_keys").fetchone()[0] == 1
+    finally:
+        pool.close()
+
+
+def test_failed_step_leaves_previous_version(pool):
+    number = latest_version() + 1
+
+    @migration(number, "always fails")
+    def _broken(conn):
+        conn.execute("CREATE TABLE half_done (x INTEGER)")
+        raise sqlite3.OperationalError("boom")
+
+    try:
+        with pytest.raises(sqlite3.OperationalError):
+            migrate(pool)
+        with pool.connection() as conn:
+            assert current_version(conn) == number - 1
+            assert conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'half_done'").fetchone() is None
+    finally:
+        MIGRATIONS.remove(next(m for m in MIGRATIONS if m[0] == number))
+
+
+def test_duplicate_version_is_rejected():
+    with pytest.raises(ValueError):
+        migration(1, "again")(lambda conn: None)
@@ -0,0 +1,30 @@
+from airline.queries import HOT_QUERIES
+from airline.queryplan import full_scans, is_full_scan, main, schema_copy
+
+
+def test_hot_queries_use_indexes(pool):
+    with pool.connection() as conn:
+        copy = schema_copy(conn)
+    assert full_scans(copy) == {}
+    assert HOT_QUERIES
+
+
+def test_full_scan_is_reported(pool):
+    with pool.connection() as conn:
+        copy = schema_copy(conn)
+    problems = full_scans(copy, {"by_email": ("SELECT * FROM users WHERE email = ?", ("a@b.c",))})
+    assert problems == {"by_email": ["SCAN users"]}
+
+
+def test_is_full_scan():
+    assert is_full_scan("SCAN flights")
+    assert not is_full_scan("SEARCH flights USING INDEX idx_flights_route_departure (departure_airport=?)")
+    assert not is_full_scan("SCAN CONSTANT ROW")
+    assert not is_full_scan("SCAN s VIRTUAL TABLE INDEX 0:M4")
+    assert is_full_scan("SCAN s VIRTUAL TABLE INDEX 0:")
+    assert not is_full_scan("SCAN legs", materialized={"legs"})
+
+
+def test_cli_exit_status(pool, capsys):
+    assert main([pool.database]) == 0
+    assert "FULL SCAN" not in capsys.readouterr().out
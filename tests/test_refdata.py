@@ -0,0 +1,71 @@
+import threading
+
+from airline.flights import cancel_flight, delete_flight
+from airline.refdata import cached, crew_choices, invalidate
+from airline.services import CrewService, FlightService
+
+
+def test_cached_value_lives_until_invalidated():
+    calls = []
+
+    def load():
+        calls.append(1)
+        return len(calls)
+
+    assert cached("key", load) == 1
+    assert cached("key", load) == 1
+    invalidate("key")
+    assert cached("key", load) == 2
+    assert cached("short", load, ttl=-1) == 3
+    assert cached("short", load, ttl=-1) == 4
+
+
+def test_value_loaded_across_an_invalidate_is_not_kept():
+    started, resume = threading.Event(), threading.Event()
+    values = iter(["stale", "fresh"])
+
+    def slow_load():
+        started.set()
+        resume.wait()
+        return next(values)
+
+    result = []
+    thread = threading.Thread(target=lambda: result.append(cached("race", slow_load)))
+    thread.start()
+    started.wait()
+    invalidate()
+    resume.set()
+    thread.join()
+    assert result == ["stale"]
+    assert cached("race", slow_load) == "fresh"
+
+
+def test_flight_writes_invalidate_crew_listings(pool, add_flight, add_crew):
+    flight_id, other_id = add_flight(), add_flight("BG202")
+    crew_id = add_crew(flight_id)
+    with pool.connection() as conn:
+        assert crew_choices(conn)[crew_id].flight_number == "BG101"
+    with pool.transaction() as conn:
+        conn.execute("UPDATE crew SET flight_id = ? WHERE crew_id = ?", (other_id, crew_id))
+    cancel_flight(pool, other_id)
+    with pool.connection() as conn:
+        assert crew_choices(conn)[crew_id].flight_number == "BG202"
+    # Crew listings vanish with deleted flights
+    delete_flight(pool, other_id)
+    with pool.connection() as conn:
+        assert crew_choices(conn) == {}
+
+
+def test_write_paths_invalidate_crew_listings(pool, add_flight):
+    crew, flights = CrewService(pool), FlightService(pool)
+    flight_id = add_flight()
+    member_id = crew.add_member("Rahim", "Pilot", home_base="DAC")
+    assert crew.members()[member_id].name == "Rahim"
+    crew_id = crew.assign(flight_id, member_id).crew_id
+    assert crew.choices()[crew_id].crew_name == "Rahim"
+    crew.update_member(member_id, "Karim", "Pilot", None, "DAC")
+    assert crew.members()[member_id].name == "Karim"
+    assert crew.choices()[crew_id].crew_name == "Karim"
+    # Flight writes drop crew listings, which show flight numbers
+    flights.delete(flight_id)
+    assert crew.choices() == {}
@@ -0,0 +1,89 @@
+import datetime
+
+from airline.db import ConnectionPool
+from airline.routing import Leg, RouteGraph
+
+H = 3600
+
+
+def _routes(itineraries):
+    return [tuple(leg.flight_id for leg in it.legs) for it in itineraries]
+
+
+def test_direct_and_connecting_itineraries():
+    graph = RouteGraph([
+        Leg(1, "D1", "DAC", "DXB", 0, 5 * H),
+        Leg(2, "C1", "DAC", "CGP", 0, 1 * H),
+        Leg(3, "C2", "CGP", "DXB", 2 * H, 6 * H),
+        Leg(4, "C3", "CGP", "DXB", 1 * H + 10 * 60, 4 * H),   # connection too short
+        Leg(5, "C4", "CGP", "DXB", 8 * H, 12 * H),            # layover too long
+    ])
+    found = graph.search("DAC", "DXB", 0, H)
+    assert _routes(found) == [(1,), (2, 3)]
+    assert found[1].stops == 1
+    assert found[1].layovers == (H,)
+    assert _routes(graph.search("DAC", "DXB", 0, H, max_stops=0)) == [(1,)]
+    assert graph.search("DAC", "DXB", H + 1, 2 * H) == []
+
+
+def test_min_stops_applies_before_the_limit():
+    # Directs arrive first, so a limit on the mixed list would cut the connection
+    graph = RouteGraph([Leg(i, f"D{i}", "DAC", "DXB", 0, H + i) for i in range(1, 4)] + [
+        Leg(10, "C1", "DAC", "CGP", 0, H),
+        Leg(11, "C2", "CGP", "DXB", 2 * H, 6 * H),
+    ])
+    assert _routes(graph.search("DAC", "DXB", 0, 0, limit=2)) == [(1,), (2,)]
+    assert _routes(graph.search("DAC", "DXB", 0, 0, min_stops=1, limit=2)) == [(10, 11)]
+
+
+def test_two_stops_never_revisit_an_airport():
+    graph = RouteGraph([
+        Leg(1, "A", "DAC", "CGP", 0, H),
+        Leg(2, "B", "CGP", "CXB", 2 * H, 3 * H),
+        Leg(3, "C", "CXB", "DXB", 4 * H, 8 * H),
+        Leg(4, "D", "CXB", "DAC", 4 * H, 5 * H),
+    ])
+    assert _routes(graph.search("DAC", "DXB", 0, 0)) == [(1, 2, 3)]
+    assert _routes(graph.search("DAC", "DXB", 0, 0, max_stops=1)) == []
+    graph.remove(2)
+    assert graph.search("DAC", "DXB", 0, 0) == []
+    assert len(graph) == 3
+
+
+def test_sync_applies_writes_from_another_connection(pool, add_flight):
+    first = add_flight("BG1", "DAC", "CGP", dep_time="09:00", arr_time="10:00")
+    with pool.connection() as conn:
+        graph = RouteGraph.from_db(conn)
+    assert len(graph) == 1
+
+    other = ConnectionPool(pool.database, max_size=1)
+    try:
+        with other.transaction() as conn:
+            conn.execute("""
+                INSERT INTO flights (flight_number, departure_airport, arrival_airport, departure_time,
+                                     arrival_time, departure_ts, arrival_ts, capacity)
+                SELECT 'BG2', 'CGP', 'CXB', departure_time, arrival_time, arrival_ts + 3600, arrival_ts + 7200, 10
+                FROM flights WHERE flight_id = ?
+            """, (first,))
+    finally:
+        other.close()
+    with pool.connection() as conn:
+        graph.sync(conn)
+        start = conn.execute("SELECT departure_ts FROM flights WHERE flight_id = ?", (first,)).fetchone()[0]
+    assert [len(it.legs) for it in graph.search("DAC", "CXB", start, start)] == [2]
+
+    with pool.transaction() as conn:
+        conn.execute("UPDATE flights SET status = 'Cancelled' WHERE flight_number = 'BG2'")
+        graph.sync(conn)
+    assert graph.search("DAC", "CXB", start, start) == []
+    assert len(graph) == 1
+    with pool.transaction() as conn:
+        conn.execute("DELETE FROM flights WHERE flight_id = ?", (first,))
+        graph.sync(conn)
+    assert len(graph) == 0
+
+
+def test_itinerary_summary():
+    start = int(datetime.datetime(2030, 3, 1, tzinfo=datetime.timezone.utc).timestamp())
+    graph = RouteGraph([Leg(1, "BG1", "DAC", "CGP", start, start + 5400)])
+    assert graph.search("DAC", "CGP", start, start)[0].summary() == "DAC → CGP (BG1; direct, 1h 30m)"
@@ -0,0 +1,53 @@
+import datetime
+
+from airline.archive import archive_flight
+from airline.search import MAX_RESULTS, fts_query, search_airports, search_flights
+
+
+def _ids(rows):
+    return [row["flight_id"] for row in rows]
+
+
+def test_fts_query_quotes_prefix_tokens():
+    assert fts_query("Dha  BZL") == '"dha"* "bzl"*'
+    assert fts_query('x AND "y') == '"x"* "and"* "y"*'
+    assert fts_query("d") is None
+    assert fts_query("") is None
+
+
+def test_airports_match_code_city_or_name_exact_code_first(pool):
+    with pool.connection() as conn:
+        assert [row["code"] for row in search_airports(conn, "dhaka")] == ["DAC"]
+        codes = [row["code"] for row in search_airports(conn, "CXB")]
+        assert codes[0] == "CXB"
+        assert search_airports(conn, "q") == []
+
+
+def test_flights_match_number_and_places_soonest_first(pool, add_flight):
+    later = add_flight("BG200", "DAC", "CXB", day=datetime.date(2030, 3, 2))
+    sooner = add_flight("BG100", "CGP", "DAC")
+    other = add_flight("EK582", "DXB", "DAC", dep_time="08:00", arr_time="15:00")
+    with pool.connection() as conn:
+        # 09:00 in Chittagong (03:00 UTC) leaves before 08:00 in Dubai (04:00 UTC)
+        assert _ids(search_flights(conn, "dhaka")) == [sooner, other, later]
+        assert _ids(search_flights(conn, "bg")) == [sooner, later]
+        assert _ids(search_flights(conn, "cox")) == [later]
+        assert _ids(search_flights(conn, "bg", limit=1)) == [sooner]
+        assert len(search_flights(conn, "", limit=10_000)) <= MAX_RESULTS
+        # departing_after hides earlier flights
+        cutoff = conn.execute("SELECT departure_ts FROM flights WHERE flight_id = ?", (sooner,)).fetchone()[0]
+        assert _ids(search_flights(conn, "bg", departing_after=cutoff + 1)) == [later]
+
+
+def test_index_follows_flight_updates_and_archive(pool, add_flight):
+    flight_id = add_flight("BG100")
+    with pool.transaction() as conn:
+        conn.execute("UPDATE flights SET flight_number = 'QR640' WHERE flight_id = ?", (flight_id,))
+    with pool.connection() as conn:
+        assert search_flights(conn, "bg100") == []
+        assert _ids(search_flights(conn, "qr640")) == [flight_id]
+    archive_flight(pool, flight_id)
+    with pool.connection() as conn:
+        assert search_flights(conn, "qr640") == []
+        [row] = search_flights(conn, "qr640", include_archived=True)
+        assert (row["flight_id"], row["archived"]) == (flight_id, 1)
@@ -0,0 +1,60 @@
+import pytest
+
+from airline.seatmap import LayoutError, build_layout, default_layout_id, get_layout, list_layouts, render_seat_map
+
+SPEC = {"cabins": [{"name": "Business", "first_row": 1, "last_row": 2, "seats": "AC"},
+                   {"name": "Economy", "first_row": 5, "last_row": 5, "seats": "ABC"}]}
+
+
+def test_layout_orders_seats_by_cabin_row_and_letter():
+    layout = build_layout("tiny", SPEC)
+    assert layout.seats == ("1A", "1C", "2A", "2C", "5A", "5B", "5C")
+    assert layout.seat_count == 7
+    assert layout.index["5B"] == 5
+
+
+def test_masks_round_trip():
+    layout = build_layout("tiny", SPEC)
+    booked = layout.mask(["1C", "5A", "9Z"])
+    assert layout.labels(booked) == ["1C", "5A"]
+    assert layout.labels(~booked & layout.full_mask) == ["1A", "2A", "2C", "5B", "5C"]
+
+
+@pytest.mark.parametrize("spec", [
+    {"cabins": []},
+    {"cabins": [{"name": "X", "first_row": 3, "last_row": 1, "seats": "A"}]},
+    {"cabins": [{"name": "X", "first_row": 1}]},
+    {"cabins": [{"name": "X", "first_row": 1, "last_row": 1, "seats": "AA"}]},
+])
+def test_invalid_specs_raise_layout_error(spec):
+    with pytest.raises(LayoutError):
+        build_layout("bad", spec)
+
+
+def test_render_marks_each_state():
+    layout = build_layout("tiny", SPEC)
+    page = render_seat_map(layout, booked=layout.mask(["1A"]), held=layout.mask(["1C"]),
+                           selected=layout.mask(["2A"]))
+    assert '<span class="seat booked">1A</span>' in page
+    assert '<span class="seat held">1C</span>' in page
+    assert '<span class="seat selected">2A</span>' in page
+    assert '<span class="seat free">5C</span>' in page
+
+
+def test_layouts_are_loaded_from_the_database(pool):
+    with pool.connection() as conn:
+        default = get_layout(conn)
+        assert default.key == "standard"
+        assert default.layout_id == default_layout_id(conn)
+        assert get_layout(conn, default.layout_id) is default
+        layouts = {row["code"]: row for row in list_layouts(conn)}
+        with pytest.raises(LayoutError):
+            get_layout(conn, 999)
+    assert set(layouts) == {"standard", "regional", "widebody"}
+    assert layouts["standard"]["seat_count"] == default.seat_count == 86
+
+
+def test_capacity_issue():
+    layout = build_layout("tiny", SPEC)
+    assert layout.capacity_issue(7) is None
+    assert "exceeds the 7 seats" in layout.capacity_issue(8)
@@ -0,0 +1,72 @@
+import datetime
+
+import pytest
+
+from airline.models import Flight, to_dict
+from airline.services import AirlineServices
+
+
+@pytest.fixture
+def services(pool):
+    return AirlineServices(pool)
+
+
+def _at(hour, day=datetime.date(2030, 3, 1)):
+    return datetime.datetime.combine(day, datetime.time(hour))
+
+
+def test_create_find_and_update_flight(services):
+    flights = services.flights
+    flight_id = flights.create("BG101", "DAC", "CGP", _at(9), _at(10), 80, 1)
+    [found] = flights.find("DAC", "CGP", datetime.date(2030, 3, 1))
+    assert isinstance(found, Flight)
+    assert (found.flight_id, found.remaining) == (flight_id, 80)
+    assert flights.find("DAC", "CGP", datetime.date(2030, 3, 2)) == []
+
+    assert flights.update(flight_id, "BG101", "DAC", "CGP", _at(11), _at(12), 60, 1, "Delayed") == (True, 0)
+    assert flights.get(flight_id).departure_time == "2030-03-01 11:00:00"
+    with pytest.raises(ValueError, match="not found"):
+        flights.update(999, "BG1", "DAC", "CGP", _at(9), _at(10), 60, 1, "Scheduled")
+    with pytest.raises(ValueError):
+        flights.create("BG102", "DAC", "CGP", _at(10), _at(9), 80, 1)
+
+
+def test_capacity_cannot_drop_below_sold_seats(services, add_user):
+    flights, bookings = services.flights, services.bookings
+    flight_id = flights.create("BG101", "DAC", "CGP", _at(9), _at(10), 80, 1)
+    assert bookings.reserve(add_user(), flight_id, ["2A", "2F"]).ok
+    assert flights.update(flight_id, "BG101", "DAC", "CGP", _at(9), _at(10), 1, 1, "Scheduled") == (False, 0)
+    assert flights.update(flight_id, "BG101", "DAC", "CGP", _at(9), _at(10), 80, 1, "Cancelled") == (True, 2)
+    assert services.flights.delete(flight_id).bookings == 2
+    assert services.flights.delete(flight_id) is None
+
+
+def test_admin_search_matches_ids_and_past_flights(services, add_flight):
+    past = add_flight("OLD1", day=datetime.date(2020, 6, 1))
+    upcoming = add_flight("NEW1")
+    assert [f.flight_id for f in services.flights.search("")] == [upcoming]
+    assert services.flights.search("old1") == []
+    assert [f.flight_id for f in services.flights.search("old1", upcoming_only=False)] == [past]
+    assert services.flights.search(str(past), upcoming_only=False)[0].flight_id == past
+
+
+def test_seat_map_and_bookings(services, add_user, add_flight):
+    user_id, flight_id = add_user(), add_flight()
+    bookings = services.bookings
+    bookings.hold(flight_id, ["3A"], "other")
+    assert bookings.reserve(user_id, flight_id, ["2A"]).ok
+    layout, booked, held = bookings.seat_map(flight_id, 1)
+    assert layout.labels(booked) == ["2A"]
+    assert layout.labels(held) == ["3A"]
+    assert layout.labels(bookings.seat_map(flight_id, 1, holder="other")[2]) == []
+    [booking] = bookings.for_user(user_id)
+    assert to_dict(booking)["seat_number"] == "2A"
+
+
+def test_itineraries_follow_new_flights(services, add_flight):
+    add_flight("BG1", "DAC", "CGP", dep_time="09:00", arr_time="10:00")
+    day = datetime.date(2030, 3, 1)
+    assert services.flights.itineraries("DAC", "CXB", day) == []
+    add_flight("BG2", "CGP", "CXB", dep_time="11:00", arr_time="12:00")
+    [itinerary] = services.flights.itineraries("DAC", "CXB", day)
+    assert [leg.flight_number for leg in itinerary.legs] == ["BG1", "BG2"]
@@ -0,0 +1,56 @@
+import datetime
+
+import pytest
+
+from airline.airports import airport_tz, flight_times
+from airline.timeutil import from_epoch, local_day_range, local_text, parse_local, to_epoch
+
+NOON = datetime.datetime(2030, 3, 1, 12, 0)
+
+
+@pytest.mark.parametrize("text", ["2030-03-01 12:00:00", "2030-03-01T12:00", "2030-03-01 12:00",
+                                  " 2030-03-01 12:00:00.000 "])
+def test_parse_local_formats(text):
+    assert parse_local(text) == NOON
+
+
+def test_parse_local_converts_explicit_offsets():
+    assert parse_local("2030-03-01T06:00:00+00:00", "Asia/Dhaka") == NOON
+    with pytest.raises(ValueError, match="UTC offset"):
+        parse_local("2030-03-01T06:00:00+00:00")
+    with pytest.raises(ValueError, match="Unrecognised"):
+        parse_local("01/03/2030 12:00")
+
+
+def test_epoch_round_trip_across_dst():
+    # 2030-03-10 is the US spring-forward day
+    before = datetime.datetime(2030, 3, 10, 1, 0)
+    after = datetime.datetime(2030, 3, 10, 3, 0)
+    assert to_epoch(after, "America/New_York") - to_epoch(before, "America/New_York") == 3600
+    assert from_epoch(to_epoch(NOON, "Asia/Dhaka"), "Asia/Dhaka").replace(tzinfo=None) == NOON
+    assert to_epoch(NOON, "Not/AZone") == to_epoch(NOON, "UTC")
+
+
+def test_local_day_range():
+    start, end = local_day_range(datetime.date(2030, 3, 1), "Asia/Dhaka")
+    assert end - start == 86400
+    assert start == to_epoch(datetime.datetime(2030, 2, 28, 18, 0), "UTC")
+
+
+def test_airport_tz_does_not_cache_unknown_codes(pool):
+    with pool.transaction() as conn:
+        assert airport_tz(conn, "DAC") == "Asia/Dhaka"
+        assert airport_tz(conn, "ZZT") == "UTC"
+        conn.execute("INSERT INTO airports (code, name, city, country, tz) "
+                     "VALUES ('ZZT', 'Test', 'Test', 'Nowhere', 'Asia/Tokyo')")
+        assert airport_tz(conn, "ZZT") == "Asia/Tokyo"
+
+
+def test_flight_times_use_each_airports_zone(pool):
+    with pool.connection() as conn:
+        # DAC is UTC+6, DXB UTC+4: a 4h 10:00 -> 12:00 local flight
+        times = flight_times(conn, "DAC", "DXB", NOON.replace(hour=10), NOON)
+        assert times["arrival_ts"] - times["departure_ts"] == 4 * 3600
+        assert times["departure_time"] == local_text(NOON.replace(hour=10))
+        with pytest.raises(ValueError):
+            flight_times(conn, "DAC", "CGP", NOON, NOON)